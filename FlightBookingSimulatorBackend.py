@@ -9,27 +9,284 @@ Key features implemented here:
 - All important endpoints protected
 """
 
-from typing import List, Optional, Dict, Annotated
+from typing import List, Optional, Dict, Annotated, NamedTuple
 from datetime import datetime, timedelta
+from decimal import Decimal
 import random
 import string
+import hashlib
+import gzip
+import tempfile
 import asyncio
-
-from fastapi import FastAPI, HTTPException, Query, Depends, status
+import os
+import bisect
+import json
+import threading
+import time
+from collections import OrderedDict, deque
+from contextvars import ContextVar
+
+from fastapi import FastAPI, HTTPException, Query, Depends, Request, Response, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, constr
 from passlib.context import CryptContext
-from contextlib import asynccontextmanager
+try:
+    import fcntl
+except ImportError:  # Windows: lock files use msvcrt instead
+    fcntl = None
+    import msvcrt
+try:
+    import numpy as np
+except ImportError:  # batch pricing falls back to the scalar engine
+    np = None
+try:
+    import orjson
+except ImportError:  # fast JSON responses fall back to the stdlib encoder
+    orjson = None
+try:
+    import brotli
+except ImportError:  # large responses are gzip-compressed only
+    brotli = None
+from contextlib import asynccontextmanager, contextmanager, suppress
 
 from sqlalchemy import (
-    create_engine, Column, Integer, String, DateTime, DECIMAL, ForeignKey, func
+    create_engine, Column, Integer, String, DateTime, DECIMAL, ForeignKey, Index, func, case, event,
+    inspect, select, insert, update, exists, text
+)
+from sqlalchemy.orm import (
+    sessionmaker, DeclarativeBase, mapped_column, relationship, Session, joinedload
 )
-from sqlalchemy.orm import sessionmaker, DeclarativeBase, mapped_column, relationship, Session
-from sqlalchemy.exc import IntegrityError
-from sqlalchemy.engine import URL
+from sqlalchemy.exc import DisconnectionError, IntegrityError, OperationalError
+from sqlalchemy.engine import Engine, URL, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+# ---------------------------
+# Settings
+#  - every FLIGHT_* knob is read through setting(): the process environment wins, then the
+#    KEY=VALUE file named by FLIGHT_SETTINGS_FILE (blank lines and # comments ignored), then the default
+# ---------------------------
+def _read_settings_file(path: Optional[str]) -> Dict[str, str]:
+    values: Dict[str, str] = {}
+    if not path:
+        return values
+    with open(path) as fh:
+        for lineno, line in enumerate(fh, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            key, sep, value = line.partition("=")
+            if not sep:
+                raise RuntimeError(f"{path}:{lineno}: expected KEY=VALUE")
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+            values[key.strip()] = value
+    return values
+
+
+SETTINGS_FILE = os.getenv("FLIGHT_SETTINGS_FILE")
+_settings_file_values = _read_settings_file(SETTINGS_FILE)
+
+
+def setting(name: str, default: Optional[str] = None) -> Optional[str]:
+    value = os.environ.get(name)
+    return value if value is not None else _settings_file_values.get(name, default)
+
+
+def setting_bool(name: str, default: bool) -> bool:
+    value = setting(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() not in ("0", "false", "no", "off")
+
+
+def setting_int(name: str, default: int) -> int:
+    value = setting(name)
+    try:
+        return default if value is None else int(value)
+    except ValueError:
+        raise RuntimeError(f"{name} must be an integer, got {value!r}")
+
+
+def setting_float(name: str, default: float) -> float:
+    value = setting(name)
+    try:
+        return default if value is None else float(value)
+    except ValueError:
+        raise RuntimeError(f"{name} must be a number, got {value!r}")
+
+# ---------------------------
+# Metrics
+#  - request latency per route, SQL queries and DB time per request, query latency, pool checkout wait
+#  - the current request's counters live in a ContextVar, which FastAPI copies into the threadpool
+#    (and run_sync into its greenlet), so engine events attribute queries to the right request;
+#    queries outside a request (simulator, reaper, startup) only count towards the global series
+#  - rendered in Prometheus text format at /metrics; FLIGHT_DEBUG_HEADERS=1 also adds
+#    X-Query-Count / X-DB-Time-Ms to every response
+# ---------------------------
+METRICS_DEBUG_HEADERS = setting_bool("FLIGHT_DEBUG_HEADERS", False)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _label_str(names, values) -> str:
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+def _metric_lines(name: str, kind: str, help_text: str, value) -> List[str]:
+    return [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+
+
+def _labeled_metric_lines(name: str, kind: str, help_text: str, label_names, samples) -> List[str]:
+    """One metric family with a sample per (label values, value) pair."""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_label_str(label_names, labels)} {value}")
+    return lines
+
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, buckets, label_names=()):
+        self.name, self.help_text = name, help_text
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._series: Dict[tuple, list] = {}  # label values -> [count per bucket..., +Inf, sum, count]
+
+    def observe(self, value: float, *labels) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 3)
+            series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {k: list(v) for k, v in self._series.items()}
+        for labels, series in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + ("+Inf",), series):
+                cumulative += n
+                le = _label_str(self.label_names + ("le",), labels + (bound,))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            base = _label_str(self.label_names, labels)
+            lines.append(f"{self.name}_sum{base} {series[-2]:.6f}")
+            lines.append(f"{self.name}_count{base} {series[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, label_names=()):
+        self.name, self.help_text = name, help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        self._values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, *labels) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            snapshot = dict(self._values)
+        for labels, value in sorted(snapshot.items()):
+            lines.append(f"{self.name}{_label_str(self.label_names, labels)} {value}")
+        return lines
+
+
+http_request_seconds = Histogram(
+    "http_request_duration_seconds", "Request latency by route template.", LATENCY_BUCKETS,
+    ("method", "route", "status"))
+request_db_queries = Histogram(
+    "http_request_db_queries", "SQL statements executed per request.", QUERY_COUNT_BUCKETS, ("method", "route"))
+request_db_seconds = Histogram(
+    "http_request_db_seconds", "Time spent executing SQL per request.", LATENCY_BUCKETS, ("method", "route"))
+db_query_seconds = Histogram("db_query_duration_seconds", "Latency of individual SQL statements.", LATENCY_BUCKETS)
+db_queries_total = Counter("db_queries_total", "SQL statements executed, inside or outside requests.", ("source",))
+db_pool_wait_seconds = Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool (includes connecting).",
+    POOL_WAIT_BUCKETS, ("engine",))
+
+
+class RequestStats:
+    __slots__ = ("queries", "db_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+
+
+_request_stats: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def instrument_engine(sync_engine) -> None:
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _query_start(conn, cursor, statement, parameters, context, executemany):
+        context._metrics_started = time.perf_counter()
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _query_end(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is None:
+            return
+        elapsed = time.perf_counter() - started
+        db_query_seconds.observe(elapsed)
+        stats = _request_stats.get()
+        if stats is None:
+            db_queries_total.inc(1, "background")
+            return
+        db_queries_total.inc(1, "request")
+        stats.queries += 1
+        stats.db_seconds += elapsed
+
+
+class _TimedCheckout:
+    """Pool mixin: records how long each checkout waits for a free (or new) connection."""
+    metrics_label = "sync"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - started, self.metrics_label)
+
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    metrics_label = "async"
+
+
+class TimedReplicaQueuePool(TimedQueuePool):
+    metrics_label = "sync_replica"
+
+
+class TimedReplicaAsyncAdaptedQueuePool(TimedAsyncAdaptedQueuePool):
+    metrics_label = "async_replica"
 
 # ---------------------------
 # DB CONNECTION (MySQL)
+#  - FLIGHT_DB_URL, or FLIGHT_DB_USER/PASSWORD/HOST/PORT/NAME for the MySQL URL (defaults below)
+#  - pool: FLIGHT_DB_POOL_SIZE, FLIGHT_DB_MAX_OVERFLOW, FLIGHT_DB_POOL_TIMEOUT, FLIGHT_DB_POOL_RECYCLE (-1 = never)
+#  - FLIGHT_DB_PRE_PING: always (ping on every checkout), idle (default: only connections idle for
+#    FLIGHT_DB_PRE_PING_IDLE seconds or more) or never (rely on pool_recycle)
+#  - FLIGHT_DB_STATEMENT_TIMEOUT_MS: per-session SELECT timeout on MySQL/MariaDB (0 = off; ignored elsewhere)
+#  - FLIGHT_DB_REPLICA_URL: optional read replica for the search/pricing endpoints (same pool settings)
 # ---------------------------
 DB_USER = "root"
 DB_PASSWORD = "Sandy@2004"  # placeholder; replace locally
@@ -37,17 +294,183 @@ DB_HOST = "localhost"
 DB_PORT = 3306
 DB_NAME = "FlightBooking"
 
-DATABASE_URL = URL.create(
-"mysql+pymysql",
-username="root",
-password="Sandy@2004",
-host="localhost",
-port=3306,
-database="FlightBooking"
-)
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+
+class DatabaseSettings(BaseModel):
+    url: str
+    replica_url: Optional[str] = None
+    mode: str = Field("sync", pattern="^(sync|async)$")
+    pool_size: int = Field(10, ge=1)
+    max_overflow: int = Field(20, ge=0)
+    pool_timeout: float = Field(30, gt=0)
+    pool_recycle: int = Field(1800, ge=-1)
+    pre_ping: str = Field("idle", pattern="^(always|idle|never)$")
+    pre_ping_idle_seconds: float = Field(30, ge=0)
+    statement_timeout_ms: int = Field(0, ge=0)
+
+    @classmethod
+    def from_settings(cls) -> "DatabaseSettings":
+        mysql_url = URL.create(
+            "mysql+pymysql",
+            username=setting("FLIGHT_DB_USER", DB_USER),
+            password=setting("FLIGHT_DB_PASSWORD", DB_PASSWORD),
+            host=setting("FLIGHT_DB_HOST", DB_HOST),
+            port=setting_int("FLIGHT_DB_PORT", DB_PORT),
+            database=setting("FLIGHT_DB_NAME", DB_NAME),
+        )
+        return cls(
+            # FLIGHT_DB_URL overrides the MySQL URL (e.g. sqlite:///flights.db for local runs)
+            url=setting("FLIGHT_DB_URL") or mysql_url.render_as_string(hide_password=False),
+            replica_url=setting("FLIGHT_DB_REPLICA_URL") or None,
+            mode=setting("FLIGHT_DB_MODE", "sync").lower(),
+            pool_size=setting_int("FLIGHT_DB_POOL_SIZE", 10),
+            max_overflow=setting_int("FLIGHT_DB_MAX_OVERFLOW", 20),
+            pool_timeout=setting_float("FLIGHT_DB_POOL_TIMEOUT", 30),
+            pool_recycle=setting_int("FLIGHT_DB_POOL_RECYCLE", 1800),
+            pre_ping=setting("FLIGHT_DB_PRE_PING", "idle").lower(),
+            pre_ping_idle_seconds=setting_float("FLIGHT_DB_PRE_PING_IDLE", 30),
+            statement_timeout_ms=setting_int("FLIGHT_DB_STATEMENT_TIMEOUT_MS", 0),
+        )
+
+    def public(self) -> dict:
+        """Settings with passwords masked, for /debug/db."""
+        out = self.model_dump()
+        for key in ("url", "replica_url"):
+            if out[key]:
+                out[key] = make_url(out[key]).render_as_string(hide_password=True)
+        return out
+
+
+db_settings = DatabaseSettings.from_settings()
+
+
+def _engine_options(url, poolclass) -> Dict[str, object]:
+    # in-memory SQLite needs its single shared connection (SingletonThreadPool/StaticPool); keep the default
+    url = make_url(url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+    return {
+        "poolclass": poolclass,
+        "pool_size": db_settings.pool_size,
+        "max_overflow": db_settings.max_overflow,
+        "pool_timeout": db_settings.pool_timeout,
+        "pool_recycle": db_settings.pool_recycle,
+        "pool_pre_ping": db_settings.pre_ping == "always",
+    }
+
+
+def configure_engine(sync_engine) -> None:
+    """Metrics, idle pre-ping and statement timeout for an engine (pass async_engine.sync_engine for async)."""
+    instrument_engine(sync_engine)
+
+    if db_settings.pre_ping == "idle":
+        @event.listens_for(sync_engine, "checkin")
+        def _mark_idle(dbapi_conn, record):
+            record.info["checked_in_at"] = time.monotonic()
+
+        @event.listens_for(sync_engine, "checkout")
+        def _ping_if_idle(dbapi_conn, record, proxy):
+            # a connection handed straight back out is almost certainly alive; skip the round trip
+            checked_in_at = record.info.get("checked_in_at")
+            if checked_in_at is None or time.monotonic() - checked_in_at < db_settings.pre_ping_idle_seconds:
+                return
+            try:
+                alive = sync_engine.dialect.do_ping(dbapi_conn)
+            except Exception:
+                alive = False
+            if not alive:
+                # the pool discards this connection and retries the checkout with a fresh one
+                raise DisconnectionError("connection failed idle pre-ping")
+
+    timeout_ms = db_settings.statement_timeout_ms
+    if timeout_ms and sync_engine.dialect.name == "mysql":
+        @event.listens_for(sync_engine, "connect")
+        def _set_statement_timeout(dbapi_conn, record):
+            cur = dbapi_conn.cursor()
+            if getattr(sync_engine.dialect, "is_mariadb", False):
+                cur.execute(f"SET SESSION max_statement_time = {timeout_ms / 1000:.3f}")
+            else:
+                cur.execute(f"SET SESSION max_execution_time = {int(timeout_ms)}")
+            cur.close()
+
+
+DATABASE_URL = db_settings.url
+engine = create_engine(DATABASE_URL, **_engine_options(DATABASE_URL, TimedQueuePool))
+configure_engine(engine)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
 
+# ---------------------------
+# Read replica routing
+#  - search, connections, flight detail and pricing read from the replica when one is configured;
+#    bookings, payments, cancellations, my-bookings and startup loads stay on the primary
+#  - replica sessions carry info["replica"] so seat-count cache misses are filled from the primary
+# ---------------------------
+REPLICA_URL = db_settings.replica_url
+read_engine = engine
+ReadSessionLocal = SessionLocal
+if REPLICA_URL:
+    read_engine = create_engine(REPLICA_URL, **_engine_options(REPLICA_URL, TimedReplicaQueuePool))
+    configure_engine(read_engine)
+    ReadSessionLocal = sessionmaker(bind=read_engine, autoflush=False, autocommit=False, info={"replica": True})
+
+# ---------------------------
+# Async DB mode
+#  - FLIGHT_DB_MODE=sync (default): endpoints run blocking sessions in FastAPI's threadpool
+#  - FLIGHT_DB_MODE=async: search/pricing/booking endpoints use an AsyncSession on an async
+#    engine (aiomysql for MySQL, aiosqlite for SQLite); the same sync business logic runs
+#    through AsyncSession.run_sync, so the event loop never blocks on the database
+# ---------------------------
+DB_MODE = db_settings.mode
+ASYNC_DRIVERS = {"mysql": "mysql+aiomysql", "sqlite": "sqlite+aiosqlite"}
+
+
+def _async_database_url(url):
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise RuntimeError(f"FLIGHT_DB_MODE=async is not supported for '{backend}' databases")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+async_engine = None
+AsyncSessionLocal = None
+async_read_engine = None
+AsyncReadSessionLocal = None
+if DB_MODE == "async":
+    async_engine = create_async_engine(_async_database_url(DATABASE_URL),
+                                       **_engine_options(DATABASE_URL, TimedAsyncAdaptedQueuePool))
+    configure_engine(async_engine.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, autocommit=False)
+    async_read_engine, AsyncReadSessionLocal = async_engine, AsyncSessionLocal
+    if REPLICA_URL:
+        async_read_engine = create_async_engine(_async_database_url(REPLICA_URL),
+                                                **_engine_options(REPLICA_URL, TimedReplicaAsyncAdaptedQueuePool))
+        configure_engine(async_read_engine.sync_engine)
+        AsyncReadSessionLocal = async_sessionmaker(bind=async_read_engine, autoflush=False, autocommit=False,
+                                                   info={"replica": True})
+
+
+def _db_engines() -> Dict[str, Engine]:
+    """Every engine this process opens, keyed by its pool label (async engines as their sync_engine)."""
+    engines = {"sync": engine}
+    if read_engine is not engine:
+        engines["sync_replica"] = read_engine
+    if async_engine is not None:
+        engines["async"] = async_engine.sync_engine
+    if async_read_engine is not None and async_read_engine is not async_engine:
+        engines["async_replica"] = async_read_engine.sync_engine
+    return engines
+
+
+def _primary_bind(db: Session):
+    """
+    The primary engine matching a (replica) session's mode. Inside AsyncSession.run_sync
+    the async primary's sync_engine is used, so queries on it still await the async driver
+    instead of blocking the event loop on a sync connection.
+    """
+    if async_engine is not None and db.get_bind() is async_read_engine.sync_engine:
+        return async_engine.sync_engine
+    return engine
+
 # ---------------------------
 # SQLAlchemy base & models
 # ---------------------------
@@ -60,7 +483,7 @@ class Airline(Base):
     airline_id = mapped_column("airline_id", Integer, primary_key=True)
     airline_name = mapped_column("airline_name", String(255))
     iata_code = mapped_column("iata_code", String(2))
-    flights = relationship("Flight", back_populates="airline", lazy="selectin")
+    flights = relationship("Flight", back_populates="airline", lazy="select")
 
 
 class Flight(Base):
@@ -73,9 +496,14 @@ class Flight(Base):
     departure_time = mapped_column("departure_time", DateTime)
     arrival_time = mapped_column("arrival_time", DateTime)
     base_fare = mapped_column("base_fare", DECIMAL(10, 2))
-    airline = relationship("Airline", back_populates="flights", lazy="joined")
-    seats = relationship("Seat", back_populates="flight", lazy="selectin")
-    bookings = relationship("Booking", back_populates="flight", lazy="selectin")
+    # loaded on access only; queries that need the airline opt in with joinedload/contains_eager
+    airline = relationship("Airline", back_populates="flights", lazy="select")
+    seats = relationship("Seat", back_populates="flight", lazy="select")
+    bookings = relationship("Booking", back_populates="flight", lazy="select")
+    __table_args__ = (
+        # route search: source = ? AND destination = ? AND departure_time in [day, day+1)
+        Index("ix_flights_route_departure", "source", "destination", "departure_time"),
+    )
 
 
 class Seat(Base):
@@ -86,6 +514,10 @@ class Seat(Base):
     seat_class = mapped_column("seat_class", String(20))
     is_booked = mapped_column("is_booked", Integer)  # 0/1
     flight = relationship("Flight", back_populates="seats")
+    __table_args__ = (
+        # seat picking and counting: flight_id = ? AND is_booked = 0/1
+        Index("ix_seats_flight_booked", "flight_id", "is_booked"),
+    )
 
 
 class Passenger(Base):
@@ -94,7 +526,7 @@ class Passenger(Base):
     full_name = mapped_column("full_name", String(100))
     email = mapped_column("email", String(50))
     phone = mapped_column("phone", String(13))
-    bookings = relationship("Booking", back_populates="passenger", lazy="selectin")
+    bookings = relationship("Booking", back_populates="passenger", lazy="select")
 
 
 class Booking(Base):
@@ -107,8 +539,170 @@ class Booking(Base):
     amount_paid = mapped_column("amount_paid", DECIMAL(10,4))
     status = mapped_column("status", String(20))  
     pnr = mapped_column("pnr", String(12), nullable=True, unique = True)  
+    # set while the booking holds its seat unpaid (Pending/PaymentFailed), NULL otherwise
+    hold_expires_at = mapped_column("hold_expires_at", DateTime, nullable=True)
     passenger = relationship("Passenger", back_populates="bookings")
     flight = relationship("Flight", back_populates="bookings")
+    __table_args__ = (
+        # my-bookings pages: passenger_id = ? AND status <> 'Cancelled'
+        Index("ix_bookings_passenger_status", "passenger_id", "status"),
+        # hold reaper: hold_expires_at <= now, oldest first
+        Index("ix_bookings_hold_expiry", "hold_expires_at"),
+        # a seat is rebooked after a cancel/expiry, so seat_id is indexed but not unique
+        Index("ix_bookings_seat", "seat_id"),
+    )
+
+
+class SchemaMigration(Base):
+    __tablename__ = "SchemaMigrations"
+    version = mapped_column("version", Integer, primary_key=True)
+    description = mapped_column("description", String(255))
+    applied_at = mapped_column("applied_at", DateTime)
+
+
+# ---------------------------
+# Schema migrations
+#  - create_all only creates missing tables; changes to existing tables go here
+#  - each step runs once, in version order, and is recorded in SchemaMigrations
+# ---------------------------
+def _create_missing_indexes(conn, indexes) -> List[str]:
+    created = []
+    insp = inspect(conn)
+    for idx in indexes:
+        existing = {i["name"] for i in insp.get_indexes(idx.table.name)}
+        if idx.name not in existing:
+            idx.create(conn)
+            created.append(idx.name)
+    return created
+
+
+def _table_index(model, name: str) -> Index:
+    return next(i for i in model.__table__.indexes if i.name == name)
+
+
+HOT_PATH_INDEXES = [
+    _table_index(Seat, "ix_seats_flight_booked"),
+    _table_index(Flight, "ix_flights_route_departure"),
+    _table_index(Booking, "ix_bookings_passenger_status"),
+]
+
+
+HOLD_INDEXES = [
+    _table_index(Booking, "ix_bookings_hold_expiry"),
+    _table_index(Booking, "ix_bookings_seat"),
+]
+
+EXPECTED_INDEXES = HOT_PATH_INDEXES + HOLD_INDEXES
+
+
+def _migration_001_hot_path_indexes(conn):
+    _create_missing_indexes(conn, HOT_PATH_INDEXES)
+
+
+def _migration_002_booking_holds(conn):
+    insp = inspect(conn)
+    if "hold_expires_at" not in {c["name"] for c in insp.get_columns("Bookings")}:
+        conn.execute(text("ALTER TABLE Bookings ADD COLUMN hold_expires_at DATETIME NULL"))
+    _create_missing_indexes(conn, HOLD_INDEXES)
+    # holds that predate the column start a fresh TTL instead of expiring on the first sweep
+    conn.execute(
+        update(Booking)
+        .where(Booking.status.in_(HOLD_STATUSES), Booking.hold_expires_at.is_(None))
+        .values(hold_expires_at=datetime.utcnow() + timedelta(seconds=HOLD_TTL_SECONDS))
+    )
+    # schema.sql declared seat_id UNIQUE, which rejects rebooking a released seat;
+    # ix_bookings_seat (created above) keeps the foreign key indexed once it is gone
+    for uc in insp.get_unique_constraints("Bookings"):
+        if uc["column_names"] == ["seat_id"]:
+            if conn.dialect.name == "mysql":
+                conn.execute(text(f"ALTER TABLE Bookings DROP INDEX `{uc['name']}`"))
+            else:
+                print("WARNING: unique Bookings.seat_id blocks rebooking released seats; recreate the table without it")
+
+
+MIGRATIONS = [
+    (1, "composite indexes for search, seat-pick and booking-lookup paths", _migration_001_hot_path_indexes),
+    (2, "booking hold expiry column and index; seat_id no longer unique", _migration_002_booking_holds),
+]
+
+
+MIGRATION_LOCK_NAME = "schema_migrations"
+MIGRATION_LOCK_TIMEOUT = setting_int("FLIGHT_MIGRATION_LOCK_TIMEOUT", 120)
+# MySQL: table / column / index name already exists
+MYSQL_ALREADY_EXISTS = {1050, 1060, 1061}
+
+
+@contextmanager
+def _migration_lock(conn):
+    """
+    Serialize migrations across workers starting together. On MySQL DDL auto-commits, so a
+    transaction cannot do it: hold a named advisory lock on this connection instead.
+    """
+    if conn.dialect.name != "mysql":
+        yield
+        return
+    with conn.begin():
+        got = conn.execute(text("SELECT GET_LOCK(:name, :timeout)"),
+                           {"name": MIGRATION_LOCK_NAME, "timeout": MIGRATION_LOCK_TIMEOUT}).scalar()
+    if got != 1:
+        raise RuntimeError(f"Timed out after {MIGRATION_LOCK_TIMEOUT}s waiting for the schema migration lock")
+    try:
+        yield
+    finally:
+        with conn.begin():
+            conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": MIGRATION_LOCK_NAME})
+
+
+def _already_exists(exc: OperationalError) -> bool:
+    orig = exc.orig
+    if orig is not None and orig.args and orig.args[0] in MYSQL_ALREADY_EXISTS:
+        return True
+    message = str(orig).lower()
+    return "already exists" in message or "duplicate column name" in message
+
+
+def _apply_migration(conn, version: int, description: str, step) -> bool:
+    """Run one step and record it; False when another worker recorded this version first."""
+    for attempt in (1, 2):
+        try:
+            with conn.begin():
+                step(conn)
+                conn.execute(insert(SchemaMigration).values(
+                    version=version, description=description, applied_at=datetime.utcnow()
+                ))
+            return True
+        except IntegrityError:
+            return False
+        except OperationalError as e:
+            # the object is already there (another worker, or an earlier run whose auto-committed
+            # DDL outlived its failed transaction); steps skip what exists, so one more pass
+            # finishes the rest and records the version
+            if attempt == 2 or not _already_exists(e):
+                raise
+    return False
+
+
+def run_migrations(bind) -> List[int]:
+    """Apply pending MIGRATIONS in order; returns the versions applied by this call."""
+    newly_applied = []
+    with bind.connect() as conn, _migration_lock(conn):
+        # read under the lock: a worker that held it before us has recorded its versions
+        with conn.begin():
+            applied = {v for (v,) in conn.execute(select(SchemaMigration.version))}
+        for version, description, step in MIGRATIONS:
+            if version not in applied and _apply_migration(conn, version, description, step):
+                newly_applied.append(version)
+    return newly_applied
+
+
+def verify_indexes(bind, indexes=None) -> List[str]:
+    """Names of expected indexes that are missing from the database."""
+    insp = inspect(bind)
+    missing = []
+    for idx in indexes or EXPECTED_INDEXES:
+        if idx.name not in {i["name"] for i in insp.get_indexes(idx.table.name)}:
+            missing.append(f"{idx.table.name}.{idx.name}")
+    return missing
 
 
 # ---------------------------
@@ -119,10 +713,28 @@ async def lifespan(app: FastAPI):
     # Startup: create tables and start background task
     Base.metadata.create_all(bind=engine)
     print("Tables created (if not existing)")
-    asyncio.create_task(market_simulator(20))
-    print("Market simulator started")
+    applied = run_migrations(engine)
+    if applied:
+        print(f"Schema migrations applied: {applied}")
+    missing = verify_indexes(engine)
+    if missing:
+        print(f"WARNING: missing indexes {missing}; hot queries will fall back to full scans")
+    with SessionLocal() as db:
+        cached = seat_inventory.rebuild(db)
+        cities = airport_index.rebuild(db)
+        routes = route_graph.rebuild(db)
+    print(f"Seat inventory cache loaded ({cached} flights), airport index loaded ({cities} cities), "
+          f"route graph loaded ({routes} flights)")
+    if SIMULATOR_ENABLED:
+        simulator_scheduler.start()
+    if REAPER_ENABLED:
+        if not supports_skip_locked(engine.dialect):
+            print("WARNING: server lacks SKIP LOCKED; the hold reaper will wait on rows locked by payments")
+        hold_reaper.start()
     yield  # FastAPI runs here
-    # Shutdown code (optional)
+    # Shutdown: stop the background loops and give up simulator leadership
+    await hold_reaper.stop()
+    await simulator_scheduler.stop()
     print("Application shutdown")
 
 
@@ -141,8 +753,50 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Query-Count", "X-DB-Time-Ms"],
 )
 
+
+class MetricsMiddleware:
+    """Plain ASGI middleware (no per-request task like BaseHTTPMiddleware) feeding the request histograms."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        token = _request_stats.set(stats)
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_metrics(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                if METRICS_DEBUG_HEADERS:
+                    message = {**message, "headers": list(message.get("headers", [])) + [
+                        (b"x-query-count", str(stats.queries).encode()),
+                        (b"x-db-time-ms", f"{stats.db_seconds * 1000:.2f}".encode()),
+                    ]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_metrics)
+        finally:
+            _request_stats.reset(token)
+            # route template, not the raw path, so /flights/{flight_id} stays one series
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            method = scope["method"]
+            http_request_seconds.observe(time.perf_counter() - started, method, route, str(status_code))
+            request_db_queries.observe(stats.queries, method, route)
+            request_db_seconds.observe(stats.db_seconds, method, route)
+
+
+app.add_middleware(MetricsMiddleware)
+
 # DB dependency
 def get_db():
     db = SessionLocal()
@@ -152,6 +806,114 @@ def get_db():
         db.close()
 
 
+def get_read_db():
+    """get_db for read-only endpoints: a replica session when FLIGHT_DB_REPLICA_URL is set."""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+async def get_session():
+    """
+    DB dependency for the endpoints that support both DB modes:
+    an AsyncSession in async mode, otherwise a regular sync Session.
+    """
+    if AsyncSessionLocal is not None:
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def get_read_session():
+    """get_session for read-only endpoints (search, pricing): routed to the replica if configured."""
+    if AsyncReadSessionLocal is not None:
+        async with AsyncReadSessionLocal() as db:
+            yield db
+    else:
+        db = ReadSessionLocal()
+        try:
+            yield db
+        finally:
+            await run_in_threadpool(db.close)
+
+
+async def run_db(db, fn, *args, **kwargs):
+    """
+    Run sync DB logic fn(session, *args, **kwargs) for a get_session() session:
+    through AsyncSession.run_sync in async mode, in the threadpool (as sync endpoints do) otherwise.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+
+# ---------------------------
+# Fast JSON responses
+#  - FLIGHT_FAST_JSON=1: the large listings (/flights, my-bookings) return their dict rows encoded
+#    with orjson (stdlib json without it) instead of validating them again through response_model
+#  - in that mode bodies of FLIGHT_COMPRESS_MIN_BYTES or more are brotli- or gzip-compressed when
+#    the client accepts it (brotli needs the optional brotli package); FLIGHT_COMPRESS=0 turns it off,
+#    FLIGHT_GZIP_LEVEL / FLIGHT_BROTLI_QUALITY trade CPU for bytes
+# ---------------------------
+FAST_JSON = setting_bool("FLIGHT_FAST_JSON", False)
+COMPRESS_RESPONSES = setting_bool("FLIGHT_COMPRESS", True)
+COMPRESS_MIN_BYTES = setting_int("FLIGHT_COMPRESS_MIN_BYTES", 1024)
+# level 1 already shrinks search JSON ~12x; higher levels gain ~10% more bytes for twice the CPU
+GZIP_LEVEL = setting_int("FLIGHT_GZIP_LEVEL", 1)
+BROTLI_QUALITY = setting_int("FLIGHT_BROTLI_QUALITY", 4)
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_json(content) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_json_default)
+    return json.dumps(content, default=_json_default, separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def _accepted_encoding(accept_encoding: str) -> Optional[str]:
+    accepted = set()
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip())
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def fast_json_response(content, accept_encoding: str = "", headers: Optional[Dict[str, str]] = None) -> Response:
+    """Encode already-shaped rows in one pass; compress large bodies the client can decode."""
+    body = encode_json(content)
+    headers = dict(headers or {})
+    if COMPRESS_RESPONSES and len(body) >= COMPRESS_MIN_BYTES:
+        headers["Vary"] = "Accept-Encoding"
+        encoding = _accepted_encoding(accept_encoding)
+        if encoding == "br":
+            body = brotli.compress(body, quality=BROTLI_QUALITY)
+        elif encoding == "gzip":
+            body = gzip.compress(body, compresslevel=GZIP_LEVEL)
+        if encoding:
+            headers["Content-Encoding"] = encoding
+    return Response(body, media_type="application/json", headers=headers)
+
+
 # ---------------------------
 # Pydantic schemas
 # ---------------------------
@@ -206,67 +968,580 @@ class BookingResponse(BaseModel):
     amount_paid: float
     status: str
     booking_date: datetime
+    hold_expires_at: Optional[datetime] = None
 
 
                                 #-------------------------------------
                                 # MILESTONE 1: CORE FLIGHT SEARCH DATA
                                 #-------------------------------------
 
+# ---------------------------
+# Airport / city lookup index
+#  - free-text "from"/"to" input is resolved in memory to the exact city names stored
+#    in Flights, so the SQL filter is an indexed equality/IN instead of ILIKE '%..%'
+# ---------------------------
+# IATA codes for the cities we serve; input may use the code, the name or an alias
+AIRPORT_CODES = {
+    "Ahmedabad": "AMD", "Amritsar": "ATQ", "Bagdogra": "IXB", "Bangalore": "BLR", "Bhopal": "BHO",
+    "Bhubaneswar": "BBI", "Chandigarh": "IXC", "Chennai": "MAA", "Coimbatore": "CJB", "Dehradun": "DED",
+    "Delhi": "DEL", "Goa": "GOI", "Guwahati": "GAU", "Hyderabad": "HYD", "Indore": "IDR", "Jaipur": "JAI",
+    "Kochi": "COK", "Kolkata": "CCU", "Kozhikode": "CCJ", "Lucknow": "LKO", "Madurai": "IXM",
+    "Mangalore": "IXE", "Mumbai": "BOM", "Nagpur": "NAG", "Patna": "PAT", "Port Blair": "IXZ",
+    "Pune": "PNQ", "Raipur": "RPR", "Ranchi": "IXR", "Srinagar": "SXR", "Surat": "STV",
+    "Thiruvananthapuram": "TRV", "Tiruchirappalli": "TRZ", "Udaipur": "UDR", "Vadodara": "BDQ",
+    "Varanasi": "VNS", "Vijayawada": "VGA", "Visakhapatnam": "VTZ",
+}
+AIRPORT_ALIASES = {
+    "Bengaluru": "Bangalore", "New Delhi": "Delhi", "Bombay": "Mumbai", "Calcutta": "Kolkata",
+    "Madras": "Chennai", "Cochin": "Kochi", "Trivandrum": "Thiruvananthapuram", "Calicut": "Kozhikode",
+    "Trichy": "Tiruchirappalli", "Vizag": "Visakhapatnam", "Mangaluru": "Mangalore",
+}
+AIRPORT_INDEX_TTL_SECONDS = 300
+# a lookup that finds nothing rebuilds the index, at most this often (flights for new cities
+# are created by other processes and scripts, so add_cities never hears about them)
+AIRPORT_INDEX_MISS_REFRESH_SECONDS = 5
+
+
+def _normalize_place(text: str) -> str:
+    return " ".join(text.split()).casefold()
+
+
+class AirportIndex:
+    """
+    Sorted prefix index over city names, IATA codes and aliases, built from the cities
+    that actually appear in Flights.source/destination.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._keys: List[str] = []                # sorted normalized keys
+        self._cities_by_key: Dict[str, set] = {}  # key -> canonical city names (as stored)
+        self._cities: List[str] = []
+        self._loaded_at: Optional[datetime] = None
+
+    def rebuild(self, db: Session) -> int:
+        rows = db.query(Flight.source).distinct().union(db.query(Flight.destination).distinct()).all()
+        self._load([r[0] for r in rows if r[0]])
+        return len(self._cities)
+
+    def add_cities(self, cities) -> None:
+        new = set(cities) - set(self._cities)
+        if new:
+            self._load(list(self._cities) + sorted(new))
+
+    def ensure_fresh(self, db: Session, force: bool = False) -> bool:
+        """
+        Rebuild once the index is older than the TTL; force=True (after a miss) rebuilds once it is
+        older than AIRPORT_INDEX_MISS_REFRESH_SECONDS. Returns True if it rebuilt.
+        """
+        loaded_at = self._loaded_at
+        max_age = AIRPORT_INDEX_MISS_REFRESH_SECONDS if force else AIRPORT_INDEX_TTL_SECONDS
+        if loaded_at is None or (datetime.utcnow() - loaded_at).total_seconds() > max_age:
+            self.rebuild(db)
+            return True
+        return False
+
+    def resolve_fresh(self, db: Session, text: str) -> List[str]:
+        """resolve(), rebuilding first when stale and once more on a miss, so new cities are found."""
+        self.ensure_fresh(db)
+        found = self.resolve(text)
+        if not found and _normalize_place(text) and self.ensure_fresh(db, force=True):
+            found = self.resolve(text)
+        return found
+
+    def _load(self, cities: List[str]) -> None:
+        by_norm_name = {_normalize_place(c): c for c in cities}
+        cities_by_key: Dict[str, set] = {}
+        for city in cities:
+            keys = {_normalize_place(city)}
+            code = AIRPORT_CODES.get(city)
+            if code:
+                keys.add(code.casefold())
+            for key in keys:
+                cities_by_key.setdefault(key, set()).add(city)
+        for alias, canonical in AIRPORT_ALIASES.items():
+            city = by_norm_name.get(_normalize_place(canonical))
+            if city:
+                cities_by_key.setdefault(_normalize_place(alias), set()).add(city)
+        with self._lock:
+            self._cities_by_key = cities_by_key
+            self._keys = sorted(cities_by_key)
+            self._cities = sorted(cities)
+            self._loaded_at = datetime.utcnow()
+
+    def _prefix_keys(self, prefix: str) -> List[str]:
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\uffff")
+        return self._keys[lo:hi]
+
+    def resolve(self, text: str) -> List[str]:
+        """
+        Canonical city names matching free-text input: exact name/code/alias first,
+        then every key starting with the input, then (like the old ILIKE '%x%') a
+        substring match over the known city names. Empty list = no such city.
+        """
+        key = _normalize_place(text)
+        if not key:
+            return []
+        with self._lock:
+            exact = self._cities_by_key.get(key)
+            if exact:
+                return sorted(exact)
+            found = set()
+            for k in self._prefix_keys(key):
+                found |= self._cities_by_key[k]
+            if not found:
+                found = {c for c in self._cities if key in _normalize_place(c)}
+        return sorted(found)
+
+    def autocomplete(self, prefix: str, limit: int = 10) -> List[Dict[str, Optional[str]]]:
+        key = _normalize_place(prefix)
+        with self._lock:
+            cities = set()
+            for k in self._prefix_keys(key):
+                cities |= self._cities_by_key[k]
+        # exact-prefix-on-name matches first, then code/alias matches, alphabetical within each
+        ranked = sorted(cities, key=lambda c: (not _normalize_place(c).startswith(key), c))
+        return [{"city": c, "code": AIRPORT_CODES.get(c)} for c in ranked[:limit]]
+
+
+airport_index = AirportIndex()
+
+
+# ---------------------------
+# Search result cache
+#  - bounded LRU with a short TTL in front of list_flights
+#  - key: normalized (origin cities, destination cities, date, max_price, sort_by)
+#  - entries are dropped as soon as a committed booking/cancel/simulator write changes
+#    the seat counts of any flight they contain (see _apply_staged_seat_deltas)
+# ---------------------------
+SEARCH_CACHE_MAX_ENTRIES = 1024
+SEARCH_CACHE_TTL_SECONDS = 5.0
+
+
+class SearchResultCache:
+    def __init__(self, max_entries: int = SEARCH_CACHE_MAX_ENTRIES, ttl_seconds: float = SEARCH_CACHE_TTL_SECONDS):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()  # key -> (expires_at, flight_ids, rows)
+        self._keys_by_flight: Dict[int, set] = {}
+        # bumped on every invalidation; results computed before it changed are not stored
+        self.generation = 0
+        self.hits = self.misses = self.evictions = self.expirations = self.invalidations = 0
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[2]
+
+    def put(self, key: tuple, flight_ids: List[int], rows, generation: int) -> None:
+        with self._lock:
+            if generation != self.generation:
+                return  # seat counts changed while these rows were being computed
+            if key in self._entries:
+                self._drop(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, tuple(flight_ids), rows)
+            for fid in flight_ids:
+                self._keys_by_flight.setdefault(fid, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate_flights(self, flight_ids) -> int:
+        dropped = 0
+        with self._lock:
+            self.generation += 1
+            for fid in flight_ids:
+                for key in self._keys_by_flight.pop(fid, ()):
+                    if key in self._entries:
+                        self._drop(key)
+                        dropped += 1
+            self.invalidations += dropped
+        return dropped
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._keys_by_flight.clear()
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
+
+    def _drop(self, key: tuple) -> None:
+        _, flight_ids, _ = self._entries.pop(key)
+        for fid in flight_ids:
+            keys = self._keys_by_flight.get(fid)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_flight[fid]
+
+
+search_cache = SearchResultCache()
+
+
+# ---------------------------
+# Route graph (1-stop connections)
+#  - departures board built from Flights: per source city and per (source, destination) route,
+#    legs sorted by departure time so a time window is two bisects
+#  - refreshed incrementally from the highest flight_id seen (new flights only, e.g. return flights
+#    added by create_return_flights_with_seats.py); a periodic full rebuild picks up edits and deletes
+#  - lists are rebuilt and swapped per key, so searches never see a half-merged list
+# ---------------------------
+MIN_LAYOVER = timedelta(hours=1)  # same buffer the roundtrip/itinerary booking enforces
+CONNECTION_MAX_LAYOVER_HOURS = 12.0
+ROUTE_GRAPH_REFRESH_SECONDS = 10
+ROUTE_GRAPH_REBUILD_SECONDS = 3600
+
+
+class RouteLeg(NamedTuple):
+    flight_id: int
+    flight_number: str
+    airline: Optional[str]
+    source: str
+    destination: str
+    departure_time: datetime
+    arrival_time: datetime
+    base_fare: object
+
+
+class RouteGraph:
+    def __init__(self):
+        self._lock = threading.Lock()  # serializes writers; readers use whatever lists are published
+        self._by_source: Dict[str, tuple] = {}  # city -> (departure times, legs)
+        self._by_route: Dict[tuple, tuple] = {}  # (source, destination) -> (departure times, legs)
+        self.max_flight_id = 0
+        self.flights = 0
+        self._refreshed_at: Optional[datetime] = None
+        self._rebuilt_at: Optional[datetime] = None
+
+    @staticmethod
+    def _load_legs(db: Session, after_id: int = 0) -> List[RouteLeg]:
+        rows = (
+            db.query(Flight.flight_id, Flight.flight_number, Airline.airline_name, Flight.source,
+                     Flight.destination, Flight.departure_time, Flight.arrival_time, Flight.base_fare)
+            .outerjoin(Airline, Airline.airline_id == Flight.airline_id)
+            .filter(Flight.flight_id > after_id)
+            .order_by(Flight.flight_id)
+            .all()
+        )
+        return [RouteLeg(*r) for r in rows]
+
+    def rebuild(self, db: Session) -> int:
+        legs = self._load_legs(db)
+        by_source: Dict[str, tuple] = {}
+        by_route: Dict[tuple, tuple] = {}
+        added = self._merge(by_source, by_route, legs)
+        with self._lock:
+            self._by_source, self._by_route = by_source, by_route
+            self.flights = added
+            self.max_flight_id = max((l.flight_id for l in legs), default=0)
+            self._rebuilt_at = self._refreshed_at = datetime.utcnow()
+        return added
+
+    def refresh(self, db: Session) -> int:
+        """Add flights created since the last load; returns how many were added."""
+        legs = self._load_legs(db, self.max_flight_id)
+        added = self.add_legs(legs)
+        self._refreshed_at = datetime.utcnow()
+        if added:
+            airport_index.add_cities({l.source for l in legs} | {l.destination for l in legs})
+        return added
+
+    def add_legs(self, legs: List[RouteLeg]) -> int:
+        with self._lock:
+            legs = [l for l in legs if l.flight_id > self.max_flight_id]
+            added = self._merge(self._by_source, self._by_route, legs)
+            self.flights += added
+            self.max_flight_id = max([self.max_flight_id] + [l.flight_id for l in legs])
+        return added
+
+    def ensure_fresh(self, db: Session) -> None:
+        now = datetime.utcnow()
+        if self._rebuilt_at is None or (now - self._rebuilt_at).total_seconds() > ROUTE_GRAPH_REBUILD_SECONDS:
+            self.rebuild(db)
+        elif (now - self._refreshed_at).total_seconds() > ROUTE_GRAPH_REFRESH_SECONDS:
+            self.refresh(db)
+
+    @staticmethod
+    def _merge(by_source: Dict[str, tuple], by_route: Dict[tuple, tuple], legs: List[RouteLeg]) -> int:
+        new_by_source: Dict[str, list] = {}
+        new_by_route: Dict[tuple, list] = {}
+        added = 0
+        for leg in legs:
+            if not leg.source or not leg.destination or leg.departure_time is None or leg.arrival_time is None:
+                continue
+            new_by_source.setdefault(leg.source, []).append(leg)
+            new_by_route.setdefault((leg.source, leg.destination), []).append(leg)
+            added += 1
+        for index, new in ((by_source, new_by_source), (by_route, new_by_route)):
+            for key, fresh in new.items():
+                old = index.get(key)
+                merged = sorted((old[1] if old else []) + fresh, key=lambda l: l.departure_time)
+                index[key] = ([l.departure_time for l in merged], merged)
+        return added
+
+    def find_connections(self, origins, destinations, start: Optional[datetime] = None,
+                         end: Optional[datetime] = None, min_layover: timedelta = MIN_LAYOVER,
+                         max_layover: timedelta = timedelta(hours=CONNECTION_MAX_LAYOVER_HOURS)) -> List[tuple]:
+        """
+        (first leg, second leg) pairs from any origin to any destination through one other city,
+        first leg departing in [start, end), second leg departing more than min_layover and at most
+        max_layover after the first arrives. Direct flights are left to /flights.
+        """
+        by_source, by_route = self._by_source, self._by_route
+        dest_set = set(destinations)
+        out = []
+        for origin in origins:
+            entry = by_source.get(origin)
+            if not entry:
+                continue
+            times, legs = entry
+            lo = bisect.bisect_left(times, start) if start else 0
+            hi = bisect.bisect_left(times, end) if end else len(times)
+            for first in legs[lo:hi]:
+                hub = first.destination
+                if hub in dest_set or hub == origin:
+                    continue
+                earliest, latest = first.arrival_time + min_layover, first.arrival_time + max_layover
+                for dest in dest_set:
+                    route = by_route.get((hub, dest))
+                    if not route or dest == origin:
+                        continue
+                    r_times, r_legs = route
+                    i = bisect.bisect_right(r_times, earliest)
+                    j = bisect.bisect_right(r_times, latest)
+                    out.extend((first, second) for second in r_legs[i:j])
+        return out
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "flights": self.flights,
+            "cities": len(self._by_source),
+            "routes": len(self._by_route),
+            "max_flight_id": self.max_flight_id,
+            "refreshed_at": self._refreshed_at.isoformat() if self._refreshed_at else None,
+            "rebuilt_at": self._rebuilt_at.isoformat() if self._rebuilt_at else None,
+        }
+
+
+route_graph = RouteGraph()
+
+
+class ConnectionResult(BaseModel):
+    legs: List[FlightSearchResult]
+    via: str
+    layover_minutes: int
+    total_duration_minutes: int
+    total_price: float
+
+
 # ---------------------------
 # Flight search endpoints (public)
 # ---------------------------
 
+@app.get("/airports/autocomplete")
+def airport_autocomplete(q: str = Query(..., min_length=1), limit: int = Query(10, ge=1, le=50),
+                         db: Session = Depends(get_read_db)):
+    """City suggestions for the search form; matches city name, IATA code or common alias prefixes."""
+    airport_index.ensure_fresh(db)
+    return airport_index.autocomplete(q, limit)
+
 
 @app.get("/flights", response_model=List[FlightSearchResult])
-def list_flights(origin: Optional[str] = Query(None, alias="from"),
-                 destination: Optional[str] = Query(None, alias="to"),
-                 date: Optional[str] = None,
-                 max_price: Optional[float] = None,
-                 sort_by: Optional[str] = None,
-                 db: Session = Depends(get_db)):
-    q = db.query(Flight).join(Airline)
-    if origin:
-        q = q.filter(Flight.source.ilike(f"%{origin}%"))
-    if destination:
-        q = q.filter(Flight.destination.ilike(f"%{destination}%"))
+async def list_flights(request: Request,
+                       origin: Optional[str] = Query(None, alias="from"),
+                       destination: Optional[str] = Query(None, alias="to"),
+                       date: Optional[str] = None,
+                       max_price: Optional[float] = None,
+                       sort_by: Optional[str] = None,
+                       db=Depends(get_read_session)):
+    rows = await run_db(db, _search_flights, origin, destination, date, max_price, sort_by)
+    if FAST_JSON:
+        return await run_in_threadpool(fast_json_response, rows, request.headers.get("accept-encoding", ""))
+    return rows
+
+
+def _search_flights(db: Session, origin: Optional[str], destination: Optional[str], date: Optional[str],
+                    max_price: Optional[float], sort_by: Optional[str]) -> List[dict]:
+    """FlightSearchResult-shaped dict rows, built straight from the selected columns."""
+    origin_cities = airport_index.resolve_fresh(db, origin) if origin else None
+    destination_cities = airport_index.resolve_fresh(db, destination) if destination else None
+    if origin_cities == [] or destination_cities == []:
+        return []
+    d = None
     if date:
         try:
             d = datetime.fromisoformat(date)
         except Exception:
             raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+
+    cache_key = (
+        tuple(origin_cities) if origin_cities else None,
+        tuple(destination_cities) if destination_cities else None,
+        d.isoformat() if d else None,
+        max_price,
+        sort_by,
+    )
+    cached = search_cache.get(cache_key)
+    if cached is not None:
+        return cached
+    generation = search_cache.generation
+
+    q = db.query(
+        Flight.flight_id, Flight.flight_number, Airline.airline_name, Flight.source, Flight.destination,
+        Flight.departure_time, Flight.arrival_time, Flight.base_fare,
+    ).join(Airline, Airline.airline_id == Flight.airline_id)
+    if origin_cities:
+        q = q.filter(Flight.source.in_(origin_cities))
+    if destination_cities:
+        q = q.filter(Flight.destination.in_(destination_cities))
+    if d:
         q = q.filter(Flight.departure_time >= d, Flight.departure_time < d + timedelta(days=1))
     flights = q.all()
+    # one grouped aggregate for every candidate instead of two COUNTs per flight
+    seat_counts = _count_seats_bulk(db, [f.flight_id for f in flights])
+    counts_list = [seat_counts[f.flight_id] for f in flights]
+    prices = _compute_dynamic_prices(
+        [f.base_fare for f in flights],
+        [c["available"] for c in counts_list],
+        [c["total"] for c in counts_list],
+        [f.departure_time for f in flights],
+    )
     out = []
-    for f in flights:
-        counts = _count_seats(db, f.flight_id)
-        demand_index = 1.0 + (counts["booked"] / max(counts["total"], 1)) * 0.5
-        dyn = _compute_dynamic_price(f.base_fare, seats_available=counts["available"], total_seats=counts["total"],
-                                     departure_dt=f.departure_time, demand_index=demand_index)
+    for f, counts, dyn in zip(flights, counts_list, prices):
         if max_price is not None and dyn > max_price:
             continue
-        out.append(FlightSearchResult(
-            flight_id=f.flight_id,
-            flight_number=f.flight_number,
-            airline=f.airline.airline_name if f.airline else "Unknown",
-            origin=f.source,
-            destination=f.destination,
-            departure_time=f.departure_time,
-            arrival_time=f.arrival_time,
-            base_fare=float(f.base_fare),
-            dynamic_price=dyn,
-            seats_available=counts["available"],
-            total_seats=counts["total"]
-        ))
+        out.append({
+            "flight_id": f.flight_id,
+            "flight_number": f.flight_number,
+            "airline": f.airline_name or "Unknown",
+            "origin": f.source,
+            "destination": f.destination,
+            "departure_time": f.departure_time,
+            "arrival_time": f.arrival_time,
+            "base_fare": float(f.base_fare),
+            "dynamic_price": dyn,
+            "seats_available": counts["available"],
+            "total_seats": counts["total"],
+        })
     if sort_by == "price":
-        out.sort(key=lambda x: x.dynamic_price)
+        out.sort(key=lambda x: x["dynamic_price"])
     elif sort_by == "duration":
-        out.sort(key=lambda x: (x.arrival_time - x.departure_time).total_seconds())
+        out.sort(key=lambda x: x["arrival_time"] - x["departure_time"])
+    # keyed on every candidate (not just the rows kept by max_price): a seat change can move a flight across the limit
+    search_cache.put(cache_key, [f.flight_id for f in flights], out, generation)
+    return out
+
+
+# declared before /flights/{flight_id} so "connections" is not parsed as a flight id
+@app.get("/flights/connections", response_model=List[ConnectionResult])
+async def list_connections(origin: str = Query(..., alias="from"),
+                           destination: str = Query(..., alias="to"),
+                           date: Optional[str] = None,
+                           max_layover_hours: float = Query(CONNECTION_MAX_LAYOVER_HOURS, gt=0, le=48),
+                           limit: int = Query(20, ge=1, le=100),
+                           db=Depends(get_read_session)):
+    """
+    1-stop itineraries from origin to destination (first leg departing on `date` if given),
+    with at least 1 hour and at most max_layover_hours between legs; legs with no free seats are skipped.
+    Sorted by total travel time; each result can be booked through POST /bookings/itinerary.
+    """
+    return await run_db(db, _search_connections, origin, destination, date, max_layover_hours, limit)
+
+
+def _search_connections(db: Session, origin: str, destination: str, date: Optional[str],
+                        max_layover_hours: float, limit: int) -> List[ConnectionResult]:
+    origin_cities = airport_index.resolve_fresh(db, origin)
+    destination_cities = airport_index.resolve_fresh(db, destination)
+    if not origin_cities or not destination_cities:
+        return []
+    start = end = None
+    if date:
+        try:
+            start = datetime.fromisoformat(date)
+        except Exception:
+            raise HTTPException(status_code=400, detail="date must be YYYY-MM-DD")
+        end = start + timedelta(days=1)
+
+    route_graph.ensure_fresh(db)
+    pairs = route_graph.find_connections(origin_cities, destination_cities, start, end,
+                                         max_layover=timedelta(hours=max_layover_hours))
+    if not pairs:
+        return []
+    counts = _count_seats_bulk(db, list({leg.flight_id for pair in pairs for leg in pair}))
+    # flights deleted since the last graph rebuild have no counts and are skipped too
+    pairs = [p for p in pairs if all(leg.flight_id in counts and counts[leg.flight_id]["available"] > 0 for leg in p)]
+    pairs.sort(key=lambda p: (p[1].arrival_time - p[0].departure_time, p[0].departure_time))
+    pairs = pairs[:limit]
+
+    legs = [leg for pair in pairs for leg in pair]
+    prices = _compute_dynamic_prices(
+        [l.base_fare for l in legs],
+        [counts[l.flight_id]["available"] for l in legs],
+        [counts[l.flight_id]["total"] for l in legs],
+        [l.departure_time for l in legs],
+    )
+    results = [
+        FlightSearchResult(
+            flight_id=l.flight_id,
+            flight_number=l.flight_number,
+            airline=l.airline or "Unknown",
+            origin=l.source,
+            destination=l.destination,
+            departure_time=l.departure_time,
+            arrival_time=l.arrival_time,
+            base_fare=float(l.base_fare),
+            dynamic_price=price,
+            seats_available=counts[l.flight_id]["available"],
+            total_seats=counts[l.flight_id]["total"]
+        )
+        for l, price in zip(legs, prices)
+    ]
+    out = []
+    for i, (first, second) in enumerate(pairs):
+        out.append(ConnectionResult(
+            legs=results[2 * i:2 * i + 2],
+            via=first.destination,
+            layover_minutes=int((second.departure_time - first.arrival_time).total_seconds() // 60),
+            total_duration_minutes=int((second.arrival_time - first.departure_time).total_seconds() // 60),
+            total_price=round(results[2 * i].dynamic_price + results[2 * i + 1].dynamic_price, 2),
+        ))
     return out
 
 
 @app.get("/flights/{flight_id}", response_model=FlightSearchResult)
-def flight_detail(flight_id: int, db: Session = Depends(get_db)):
-    f = db.query(Flight).filter(Flight.flight_id == flight_id).first()
+async def flight_detail(flight_id: int, db=Depends(get_read_session)):
+    return await run_db(db, _flight_detail, flight_id)
+
+
+def _flight_detail(db: Session, flight_id: int) -> FlightSearchResult:
+    f = db.query(Flight).options(joinedload(Flight.airline)).filter(Flight.flight_id == flight_id).first()
     if not f:
         raise HTTPException(status_code=404, detail="Flight not found")
     counts = _count_seats(db, flight_id)
@@ -293,42 +1568,371 @@ def flight_detail(flight_id: int, db: Session = Depends(get_db)):
 # ---------------------------
 # Utility functions (pricing & seat counts)
 # ---------------------------
+# flight ids per IN (...) list; keeps the statement size bounded for very large searches
+SEAT_COUNT_BATCH_SIZE = 1000
+
+
+def _query_seat_counts(db: Session, flight_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """
+    Total/booked/available seat counts for many flights in one grouped aggregate query
+    (one query per SEAT_COUNT_BATCH_SIZE ids). Flights without seats get zero counts.
+    Always reads the database; request paths go through _count_seats_bulk instead.
+    """
+    ids = list(dict.fromkeys(flight_ids))
+    out = {fid: {"total": 0, "booked": 0, "available": 0} for fid in ids}
+    for start in range(0, len(ids), SEAT_COUNT_BATCH_SIZE):
+        chunk = ids[start:start + SEAT_COUNT_BATCH_SIZE]
+        rows = (
+            db.query(
+                Seat.flight_id,
+                func.count(Seat.seat_id),
+                func.coalesce(func.sum(case((Seat.is_booked == 1, 1), else_=0)), 0),
+            )
+            .filter(Seat.flight_id.in_(chunk))
+            .group_by(Seat.flight_id)
+            .all()
+        )
+        for fid, total, booked in rows:
+            total, booked = int(total or 0), int(booked or 0)
+            out[fid] = {"total": total, "booked": booked, "available": total - booked}
+    return out
+
+
+class SeatInventoryCache:
+    """
+    Per-process seat counters (total/booked) keyed by flight_id.
+    - rebuilt from the Seats table at startup
+    - misses are loaded from the DB with one grouped query and kept
+    - booking/cancel/simulator writes stage +/- deltas on their session
+      (_stage_seat_delta); the deltas are applied here only after that session commits
+    - every entry expires after ttl_seconds and is reloaded, so writes committed by
+      other worker processes (whose deltas never reach this cache) are picked up
+    """
+
+    def __init__(self, ttl_seconds: float = 30.0):
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._counts: Dict[int, List] = {}  # flight_id -> [total, booked, expires_at]
+        # bumped on every apply/invalidate; _changed[fid] is the version that last touched fid
+        self.version = 0
+        self._changed: Dict[int, int] = {}
+        self._cleared_at = 0  # version of the last full invalidate
+
+    def rebuild(self, db: Session) -> int:
+        with self._lock:
+            since = self.version
+        ids = [fid for (fid,) in db.query(Flight.flight_id).all()]
+        loaded = _query_seat_counts(db, ids)
+        expires_at = time.monotonic() + self.ttl_seconds
+        with self._lock:
+            self._counts = {fid: [c["total"], c["booked"], expires_at] for fid, c in loaded.items()
+                            if self._unchanged_since(fid, since)}
+            return len(self._counts)
+
+    def get_many(self, db: Session, flight_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        out: Dict[int, Dict[str, int]] = {}
+        misses = []
+        now = time.monotonic()
+        with self._lock:
+            # a read may see the DB as of the start of its transaction, so only changes
+            # recorded after that point can be missing from what it loads
+            since = min(db.info.get("seat_cache_version", self.version), self.version)
+            for fid in flight_ids:
+                entry = self._counts.get(fid)
+                if entry is None or entry[2] <= now:
+                    misses.append(fid)
+                else:
+                    out[fid] = {"total": entry[0], "booked": entry[1], "available": entry[0] - entry[1]}
+        if misses:
+            loaded = self._load(db, misses)
+            expires_at = time.monotonic() + self.ttl_seconds
+            with self._lock:
+                for fid, c in loaded.items():
+                    # a delta committed while we were reading may be missing from the result;
+                    # don't cache it (the next read loads again)
+                    if self._unchanged_since(fid, since):
+                        self._counts[fid] = [c["total"], c["booked"], expires_at]
+            out.update(loaded)
+        return out
+
+    @staticmethod
+    def _load(db: Session, flight_ids: List[int]) -> Dict[int, Dict[str, int]]:
+        if db.info.get("replica"):
+            # a lagging replica would seed the cache with counts that later deltas build on;
+            # misses are rare (flights added since startup, expired entries), so read them from the primary
+            with Session(bind=_primary_bind(db), autoflush=False) as primary:
+                return _query_seat_counts(primary, flight_ids)
+        loaded = _query_seat_counts(db, flight_ids)
+        # this session sees its own uncommitted seat changes; take them back out so the
+        # cache holds committed counts (its deltas are applied on commit)
+        for fid, delta in (db.info.get("seat_deltas") or {}).items():
+            c = loaded.get(fid)
+            if c is not None:
+                booked = min(max(c["booked"] - delta, 0), c["total"])
+                loaded[fid] = {"total": c["total"], "booked": booked, "available": c["total"] - booked}
+        return loaded
+
+    def _unchanged_since(self, fid: int, version: int) -> bool:
+        # caller holds the lock; True when nothing touched fid after `version`
+        return max(self._changed.get(fid, 0), self._cleared_at) <= version
+
+    def _touch(self, flight_ids) -> None:
+        # caller holds the lock
+        self.version += 1
+        for fid in flight_ids:
+            self._changed[fid] = self.version
+
+    def apply(self, deltas: Dict[int, int]) -> None:
+        # flights that are not cached are loaded fresh (post-commit) on their next read
+        with self._lock:
+            self._touch(deltas)
+            for fid, delta in deltas.items():
+                entry = self._counts.get(fid)
+                if entry is not None:
+                    entry[1] = min(max(entry[1] + delta, 0), entry[0])
+
+    def invalidate(self, flight_ids: Optional[List[int]] = None) -> None:
+        with self._lock:
+            if flight_ids is None:
+                self.version += 1
+                self._cleared_at = self.version
+                self._counts.clear()
+            else:
+                self._touch(flight_ids)
+                for fid in flight_ids:
+                    self._counts.pop(fid, None)
+
+    def snapshot(self) -> Dict[int, Dict[str, int]]:
+        with self._lock:
+            return {fid: {"total": t, "booked": b, "available": t - b} for fid, (t, b, _) in self._counts.items()}
+
+
+seat_inventory = SeatInventoryCache(ttl_seconds=setting_float("FLIGHT_SEAT_CACHE_TTL", 30))
+
+
+def _stage_seat_delta(db: Session, flight_id: int, delta: int) -> None:
+    """Record a booked-seat change made in this session; applied to the cache on commit."""
+    staged = db.info.setdefault("seat_deltas", {})
+    staged[flight_id] = staged.get(flight_id, 0) + delta
+
+
+@event.listens_for(Session, "after_begin")
+def _note_seat_cache_version(session, transaction, connection):
+    # reads in this transaction may not see deltas applied after this point (see get_many)
+    session.info.setdefault("seat_cache_version", seat_inventory.version)
+
+
+@event.listens_for(Session, "after_commit")
+def _apply_staged_seat_deltas(session):
+    deltas = session.info.pop("seat_deltas", None)
+    if deltas:
+        seat_inventory.apply(deltas)
+        search_cache.invalidate_flights(deltas)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _discard_staged_seat_deltas(session, transaction):
+    # rolled back (or closed without commit): the staged changes never happened
+    if transaction.parent is None:
+        session.info.pop("seat_deltas", None)
+        session.info.pop("seat_cache_version", None)
+
+
+def _count_seats_bulk(db: Session, flight_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    """
+    Seat counts for many flights from the inventory cache, overlaid with the
+    uncommitted changes staged on this session so a transaction sees its own reservations.
+    """
+    counts = seat_inventory.get_many(db, flight_ids)
+    staged = db.info.get("seat_deltas")
+    if staged:
+        for fid, delta in staged.items():
+            c = counts.get(fid)
+            if c is not None:
+                booked = min(max(c["booked"] + delta, 0), c["total"])
+                counts[fid] = {"total": c["total"], "booked": booked, "available": c["total"] - booked}
+    return counts
+
+
 def _count_seats(db: Session, flight_id: int) -> Dict[str, int]:
-    total = db.query(func.count(Seat.seat_id)).filter(Seat.flight_id == flight_id).scalar() or 0
-    booked = db.query(func.count(Seat.seat_id)).filter(Seat.flight_id == flight_id, Seat.is_booked == 1).scalar() or 0
-    available = total - booked
-    return {"total": total, "booked": booked, "available": available}
+    return _count_seats_bulk(db, [flight_id])[flight_id]
+
+
+def _recount_if_short(db: Session, counts: Dict[int, Dict[str, int]], needed: Dict[int, int]) -> Dict[int, Dict[str, int]]:
+    """
+    Before refusing a booking on cached counts, re-read the flights that look short of
+    seats: another worker may have released some since the entry was cached.
+    """
+    short = [fid for fid, n in needed.items() if counts[fid]["available"] < n]
+    if short:
+        seat_inventory.invalidate(short)
+        counts.update(_count_seats_bulk(db, short))
+    return counts
+
+
+# (days-to-departure upper bound, price factor); anything further out gets PRICING_FAR_OUT_FACTOR
+PRICING_TIME_BUCKETS = ((1, 0.6), (7, 0.25), (30, 0.08))
+PRICING_FAR_OUT_FACTOR = -0.05
+PRICING_JITTER = (-0.02, 0.03)
+# FLIGHT_PRICING_SEED=<int> for reproducible jitter in batch pricing (unset = fresh entropy per batch)
+PRICING_SEED: Optional[int] = setting_int("FLIGHT_PRICING_SEED", None)
+
 
 def _compute_dynamic_price(base_fare_dec, seats_available: int, total_seats: int,
-                           departure_dt: datetime, demand_index: float = 1.0) -> float:
+                           departure_dt: datetime, demand_index: float = 1.0,
+                           now: Optional[datetime] = None, rng: Optional[random.Random] = None) -> float:
     base_fare = float(base_fare_dec)
     seats_booked = max(total_seats - seats_available, 0)
     seat_ratio = seats_booked / max(total_seats, 1)
     seat_factor = 0.25 * (seat_ratio ** 2) + 0.12 * seat_ratio
 
-    now = datetime.utcnow()
+    now = now or datetime.utcnow()
     days_to_depart = max((departure_dt - now).total_seconds() / 86400, 0.0)
-    if days_to_depart < 1:
-        time_factor = 0.6
-    elif days_to_depart < 7:
-        time_factor = 0.25
-    elif days_to_depart < 30:
-        time_factor = 0.08
-    else:
-        time_factor = -0.05
+    time_factor = PRICING_FAR_OUT_FACTOR
+    for upper_days, factor in PRICING_TIME_BUCKETS:
+        if days_to_depart < upper_days:
+            time_factor = factor
+            break
 
     demand_factor = (demand_index - 1.0) * 0.6
-    jitter = random.uniform(-0.02, 0.03)
+    jitter = (rng or random).uniform(*PRICING_JITTER)
 
     multiplier = 1 + seat_factor + time_factor + demand_factor + jitter
     price = max(base_fare * multiplier, 0.5 * base_fare)
     return round(price, 2)
 
+
+def _compute_dynamic_prices(base_fares, seats_available, total_seats, departure_dts,
+                            now: Optional[datetime] = None, seed: Optional[int] = None) -> List[float]:
+    """
+    Batch version of _compute_dynamic_price for many flights at once.
+    Uses a single "now" snapshot for the whole batch, derives demand_index from the
+    seat counts like the endpoints do, and draws jitter from one generator seeded with
+    `seed` (default PRICING_SEED), so the same inputs + seed reproduce the same prices.
+    Vectorized with NumPy when available, otherwise a plain loop over the scalar engine.
+    """
+    now = now or datetime.utcnow()
+    seed = PRICING_SEED if seed is None else seed
+    n = len(base_fares)
+    if n == 0:
+        return []
+
+    if np is None:
+        rng = random.Random(seed)
+        out = []
+        for base, avail, total, dep in zip(base_fares, seats_available, total_seats, departure_dts):
+            demand_index = 1.0 + (max(total - avail, 0) / max(total, 1)) * 0.5
+            out.append(_compute_dynamic_price(base, avail, total, dep, demand_index, now=now, rng=rng))
+        return out
+
+    # inputs may already be arrays (callers repricing a whole network keep them as such);
+    # lists of Decimal/datetime are converted with fromiter, much cheaper than asarray on objects
+    if isinstance(base_fares, np.ndarray):
+        base = base_fares.astype(np.float64, copy=False)
+    else:
+        base = np.fromiter((float(b) for b in base_fares), dtype=np.float64, count=n)
+    total = np.asarray(total_seats, dtype=np.float64)
+    avail = np.asarray(seats_available, dtype=np.float64)
+    seat_ratio = np.maximum(total - avail, 0.0) / np.maximum(total, 1.0)
+    seat_factor = 0.25 * seat_ratio ** 2 + 0.12 * seat_ratio
+
+    if isinstance(departure_dts, np.ndarray) and departure_dts.dtype.kind == "M":
+        seconds_to_depart = (departure_dts - np.datetime64(now, "us")) / np.timedelta64(1, "s")
+    else:
+        seconds_to_depart = np.fromiter(((d - now).total_seconds() for d in departure_dts),
+                                        dtype=np.float64, count=n)
+    days_to_depart = np.maximum(seconds_to_depart / 86400, 0.0)
+    time_factor = np.select(
+        [days_to_depart < upper_days for upper_days, _ in PRICING_TIME_BUCKETS],
+        [factor for _, factor in PRICING_TIME_BUCKETS],
+        default=PRICING_FAR_OUT_FACTOR,
+    )
+
+    demand_factor = (seat_ratio * 0.5) * 0.6  # demand_index - 1.0, scaled
+    jitter = np.random.default_rng(seed).uniform(*PRICING_JITTER, size=n)
+
+    multiplier = 1 + seat_factor + time_factor + demand_factor + jitter
+    prices = np.maximum(base * multiplier, 0.5 * base)
+    return np.round(prices, 2).tolist()
+
 # ---------------------------
 # Dynamic pricing endpoints (public)
 # ---------------------------
+# flights per keyset page of the bulk price feed
+PRICE_FEED_PAGE_SIZE = 500
+
+
+def _iter_price_feed(after_id: int, page_size: int, limit: Optional[int]):
+    """
+    Yield NDJSON lines for flights with flight_id > after_id in flight_id order.
+    Pages are fetched with keyset pagination (WHERE flight_id > last ORDER BY flight_id LIMIT n),
+    so memory is bounded by one page and each page costs the same regardless of its position.
+    Uses its own (replica, if configured) session because it keeps running after the endpoint has returned.
+    """
+    db = ReadSessionLocal()
+    try:
+        emitted = 0
+        while limit is None or emitted < limit:
+            size = page_size if limit is None else min(page_size, limit - emitted)
+            rows = (
+                db.query(Flight.flight_id, Flight.flight_number, Flight.source, Flight.destination,
+                         Flight.departure_time, Flight.base_fare)
+                .filter(Flight.flight_id > after_id)
+                .order_by(Flight.flight_id)
+                .limit(size)
+                .all()
+            )
+            if not rows:
+                break
+            seat_counts = _count_seats_bulk(db, [r.flight_id for r in rows])
+            counts_list = [seat_counts[r.flight_id] for r in rows]
+            prices = _compute_dynamic_prices(
+                [r.base_fare for r in rows],
+                [c["available"] for c in counts_list],
+                [c["total"] for c in counts_list],
+                [r.departure_time for r in rows],
+            )
+            yield "".join(
+                json.dumps({
+                    "flight_id": r.flight_id,
+                    "flight_number": r.flight_number,
+                    "origin": r.source,
+                    "destination": r.destination,
+                    "departure_time": r.departure_time.isoformat(),
+                    "base_fare": float(r.base_fare),
+                    "dynamic_price": price,
+                    "seats_available": counts["available"],
+                    "total_seats": counts["total"],
+                }) + "\n"
+                for r, counts, price in zip(rows, counts_list, prices)
+            )
+            after_id = rows[-1].flight_id
+            emitted += len(rows)
+            db.commit()  # end the read transaction between pages
+            if len(rows) < size:
+                break
+    finally:
+        db.close()
+
+
+# declared before /dynamic_price/{flight_id} so "all" is not parsed as a flight id
+@app.get("/dynamic_price/all")
+def dynamic_price_all(after_id: int = Query(0, ge=0, description="Resume after this flight_id (keyset cursor)"),
+                      page_size: int = Query(PRICE_FEED_PAGE_SIZE, ge=1, le=5000),
+                      limit: Optional[int] = Query(None, ge=1, description="Stop after this many flights")):
+    """
+    Stream current dynamic prices for the catalogue as NDJSON (one flight per line), ordered by flight_id.
+    To resume or page through the feed, pass the last flight_id received as after_id.
+    """
+    return StreamingResponse(_iter_price_feed(after_id, page_size, limit), media_type="application/x-ndjson")
+
+
 @app.get("/dynamic_price/{flight_id}")
-def dynamic_price(flight_id: int, db: Session = Depends(get_db)):
+async def dynamic_price(flight_id: int, db=Depends(get_read_session)):
+    return await run_db(db, _dynamic_price, flight_id)
+
+
+def _dynamic_price(db: Session, flight_id: int) -> dict:
     f = db.query(Flight).filter(Flight.flight_id == flight_id).first()
     if not f:
         raise HTTPException(status_code=404, detail="Flight not found")
@@ -349,69 +1953,306 @@ def dynamic_price(flight_id: int, db: Session = Depends(get_db)):
     }
 
 
-@app.get("/dynamic_price/all")
-def dynamic_price_all(db: Session = Depends(get_db)):
-    flights = db.query(Flight).all()
-    out = []
-    for f in flights:
-        counts = _count_seats(db, f.flight_id)
-        demand_index = 1.0 + (counts["booked"] / max(counts["total"], 1)) * 0.5
-        price = _compute_dynamic_price(f.base_fare, seats_available=counts["available"], total_seats=counts["total"],
-                                       departure_dt=f.departure_time, demand_index=demand_index)
-        out.append({
-            "flight_id": f.flight_id,
-            "flight_number": f.flight_number,
-            "origin": f.source,
-            "destination": f.destination,
-            "dynamic_price": price,
-            "seats_available": counts["available"],
-            "total_seats": counts["total"]
-        })
-    return {"count": len(out), "flights": out}
-
-
 # ---------------------------
 # Background market simulator
 # ---------------------------
 
-async def market_simulator(interval_seconds: int = 20):
-    print("Market simulator started")
-    while True:
-        # run blocking DB operations in a thread so the event loop is not blocked
-        def _sync_simulator_step():
-            db = SessionLocal()
-            try:
-                flights = db.query(Flight.flight_id).all()
-                if not flights:
-                    db.close()
-                    return
-                sample = random.sample([f.flight_id for f in flights], k=min(3, len(flights)))
-                for fid in sample:
-                    # small chance to toggle seats to simulate bookings/cancellations
-                    if random.random() < 0.25:
-                        counts = _count_seats(db, fid)
-                        # if available, randomly book one seat (simulate external booking)
-                        if counts["available"] > 0 and random.random() < 0.6:
-                            seat = db.query(Seat).filter(Seat.flight_id == fid, Seat.is_booked == 0).first()
-                            if seat:
-                                seat.is_booked = 1
-                                db.add(seat)
-                        else:
-                            seat = db.query(Seat).filter(Seat.flight_id == fid, Seat.is_booked == 1).first()
-                            if seat and random.random() < 0.5:
-                                seat.is_booked = 0
-                                db.add(seat)
-                        db.commit()
-            except Exception as e:
-                db.rollback()
-                print("Simulator error:", e)
-            finally:
-                db.close()
-
-        await asyncio.to_thread(_sync_simulator_step)
-        await asyncio.sleep(interval_seconds)
-
-
+class SimulatorConfig(BaseModel):
+    # legacy: up to 3 flights per tick, one seat at a time; batched: set-based bulk toggles
+    mode: str = Field(default_factory=lambda: setting("FLIGHT_SIM_MODE", "legacy"), pattern="^(legacy|batched)$")
+    interval_seconds: float = Field(default_factory=lambda: setting_float("FLIGHT_SIM_INTERVAL", 20), gt=0)
+    # batched mode: synthetic seat toggles per second, flights sampled per tick, share of toggles that book
+    rate: float = Field(default_factory=lambda: setting_float("FLIGHT_SIM_RATE", 5), ge=0)
+    sample_size: int = Field(default_factory=lambda: setting_int("FLIGHT_SIM_SAMPLE", 50), ge=1)
+    book_ratio: float = Field(default_factory=lambda: setting_float("FLIGHT_SIM_BOOK_RATIO", 0.6), ge=0, le=1)
+
+
+simulator_config = SimulatorConfig()
+# per-tick timing of the most recent ticks, newest last
+simulator_ticks: deque = deque(maxlen=100)
+
+
+def _legacy_simulator_step(db: Session) -> Dict[str, int]:
+    booked = released = 0
+    flights = db.query(Flight.flight_id).all()
+    if not flights:
+        return {"flights": 0, "booked": 0, "released": 0}
+    sample = random.sample([f.flight_id for f in flights], k=min(3, len(flights)))
+    for fid in sample:
+        # small chance to toggle seats to simulate bookings/cancellations
+        if random.random() < 0.25:
+            counts = _count_seats(db, fid)
+            # if available, randomly book one seat (simulate external booking)
+            if counts["available"] > 0 and random.random() < 0.6:
+                seat = db.query(Seat).filter(Seat.flight_id == fid, Seat.is_booked == 0).first()
+                if seat:
+                    seat.is_booked = 1
+                    db.add(seat)
+                    _stage_seat_delta(db, fid, +1)
+                    booked += 1
+            else:
+                # only seats no live booking owns: releasing a held/confirmed seat lets it be sold twice
+                seat = (
+                    db.query(Seat)
+                    .filter(Seat.flight_id == fid, Seat.is_booked == 1, ~_seat_has_live_booking())
+                    .first()
+                )
+                if seat and random.random() < 0.5:
+                    seat.is_booked = 0
+                    db.add(seat)
+                    _stage_seat_delta(db, fid, -1)
+                    released += 1
+            db.commit()
+    return {"flights": len(sample), "booked": booked, "released": released}
+
+
+def _sample_flight_ids(db: Session, size: int) -> List[int]:
+    """
+    `size` consecutive flight ids starting at a random pivot (wrapping around), read via the
+    primary key, so sampling costs O(size) instead of loading every flight id.
+    """
+    lo, hi = db.query(func.min(Flight.flight_id), func.max(Flight.flight_id)).one()
+    if lo is None:
+        return []
+    pivot = random.randint(lo, hi)
+    ids = [fid for (fid,) in db.query(Flight.flight_id).filter(Flight.flight_id >= pivot)
+           .order_by(Flight.flight_id).limit(size)]
+    if len(ids) < size:
+        ids += [fid for (fid,) in db.query(Flight.flight_id).filter(Flight.flight_id < pivot)
+                .order_by(Flight.flight_id).limit(size - len(ids))]
+    return ids
+
+
+def _bulk_toggle_seats(db: Session, flight_ids: List[int], count: int, book: bool) -> Dict[int, int]:
+    """
+    Flip up to `count` random seats on the given flights with one SELECT and one UPDATE.
+    Releases skip seats held by a live booking (a hold or Confirmed). Returns seats flipped per flight;
+    if a concurrent writer got to a candidate first, the affected flights come back with None
+    so their cached counts can be dropped instead of adjusted.
+    """
+    if count <= 0 or not flight_ids:
+        return {}
+    from_state, to_state = (0, 1) if book else (1, 0)
+    q = db.query(Seat.seat_id, Seat.flight_id).filter(Seat.flight_id.in_(flight_ids), Seat.is_booked == from_state)
+    if not book:
+        q = q.filter(~_seat_has_live_booking())
+    candidates = q.order_by(func.random()).limit(count).all()
+    if not candidates:
+        return {}
+    result = db.execute(
+        update(Seat)
+        .where(Seat.seat_id.in_([c.seat_id for c in candidates]), Seat.is_booked == from_state)
+        .values(is_booked=to_state)
+        .execution_options(synchronize_session=False)
+    )
+    per_flight: Dict[int, int] = {}
+    for c in candidates:
+        per_flight[c.flight_id] = per_flight.get(c.flight_id, 0) + 1
+    if result.rowcount != len(candidates):
+        return {fid: None for fid in per_flight}
+    return per_flight
+
+
+def _batched_simulator_step(db: Session, cfg: SimulatorConfig) -> Dict[str, float]:
+    """
+    One tick in batched mode: sample flights in SQL, then apply all synthetic bookings and
+    cancellations for the tick as two bulk UPDATEs in a single transaction.
+    """
+    t0 = time.perf_counter()
+    ops = int(round(cfg.rate * cfg.interval_seconds))
+    to_book = int(round(ops * cfg.book_ratio))
+    to_release = ops - to_book
+    sample = _sample_flight_ids(db, cfg.sample_size)
+    t_sample = time.perf_counter()
+
+    booked = _bulk_toggle_seats(db, sample, to_book, book=True)
+    released = _bulk_toggle_seats(db, sample, to_release, book=False)
+    stale = set()
+    for per_flight, sign in ((booked, +1), (released, -1)):
+        for fid, n in per_flight.items():
+            if n is None:
+                stale.add(fid)
+            else:
+                _stage_seat_delta(db, fid, sign * n)
+    db.commit()
+    if stale:
+        # lost a race on some seats: reload those flights instead of guessing their counts
+        seat_inventory.invalidate(list(stale))
+        search_cache.invalidate_flights(stale)
+    t_end = time.perf_counter()
+    return {
+        "flights": len(sample),
+        "booked": sum(n or 0 for n in booked.values()),
+        "released": sum(n or 0 for n in released.values()),
+        "sample_ms": round((t_sample - t0) * 1000, 3),
+        "update_ms": round((t_end - t_sample) * 1000, 3),
+    }
+
+
+def _simulator_tick() -> None:
+    cfg = simulator_config
+    db = SessionLocal()
+    t0 = time.perf_counter()
+    try:
+        if cfg.mode == "batched":
+            stats = _batched_simulator_step(db, cfg)
+        else:
+            stats = _legacy_simulator_step(db)
+    except Exception as e:
+        db.rollback()
+        print("Simulator error:", e)
+        stats = {"error": str(e)}
+    finally:
+        db.close()
+    elapsed = time.perf_counter() - t0
+    stats.update({"mode": cfg.mode, "at": datetime.utcnow().isoformat(), "tick_ms": round(elapsed * 1000, 3)})
+    if "booked" in stats and elapsed > 0:
+        stats["ops_per_second"] = round((stats["booked"] + stats["released"]) / elapsed, 1)
+    simulator_ticks.append(stats)
+
+
+# ---------------------------
+# Simulator scheduling across worker processes
+#  - every worker runs a SimulatorScheduler, but only the one holding the leader lock ticks
+#  - MySQL: GET_LOCK() advisory lock held on a dedicated connection (released by the server
+#    if that worker dies); other databases: an exclusive lock on a local lock file
+#  - followers retry the lock every interval, so leadership moves on if the leader exits
+# ---------------------------
+SIMULATOR_ENABLED = setting_bool("FLIGHT_SIM_ENABLED", True)
+SIMULATOR_LOCK_NAME = "flight_booking_market_simulator"
+SIMULATOR_LOCK_FILE = setting(
+    "FLIGHT_SIM_LOCK_FILE", os.path.join(tempfile.gettempdir(), "flight_booking_market_simulator.lock")
+)
+
+
+class SimulatorLeaderLock:
+    def __init__(self, bind, lock_file: str = SIMULATOR_LOCK_FILE):
+        self.bind = bind
+        self.lock_file = lock_file
+        self.backend = "mysql_advisory" if bind.dialect.name == "mysql" else "lock_file"
+        self._conn = None
+        self._fh = None
+
+    def try_acquire(self) -> bool:
+        if self.backend == "mysql_advisory":
+            conn = self.bind.connect()
+            try:
+                got = conn.execute(text("SELECT GET_LOCK(:name, 0)"), {"name": SIMULATOR_LOCK_NAME}).scalar()
+            except Exception:
+                conn.close()
+                raise
+            if got == 1:
+                self._conn = conn
+                return True
+            conn.close()
+            return False
+
+        fh = open(self.lock_file, "a+")
+        try:
+            if fcntl is not None:
+                fcntl.flock(fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                fh.seek(0)
+                msvcrt.locking(fh.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            fh.close()
+            return False
+        fh.seek(0)
+        fh.truncate()
+        fh.write(str(os.getpid()))
+        fh.flush()
+        self._fh = fh
+        return True
+
+    def still_held(self) -> bool:
+        if self.backend == "mysql_advisory":
+            if self._conn is None:
+                return False
+            try:
+                return self._conn.execute(
+                    text("SELECT IS_USED_LOCK(:name) = CONNECTION_ID()"), {"name": SIMULATOR_LOCK_NAME}
+                ).scalar() == 1
+            except Exception:
+                # connection lost: the server has already released the lock
+                self._conn.invalidate()
+                self._conn = None
+                return False
+        return self._fh is not None
+
+    def release(self) -> None:
+        if self._conn is not None:
+            try:
+                self._conn.execute(text("SELECT RELEASE_LOCK(:name)"), {"name": SIMULATOR_LOCK_NAME})
+            finally:
+                self._conn.close()
+                self._conn = None
+        if self._fh is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fh.fileno(), fcntl.LOCK_UN)
+                else:
+                    self._fh.seek(0)
+                    msvcrt.locking(self._fh.fileno(), msvcrt.LK_UNLCK, 1)
+            finally:
+                self._fh.close()
+                self._fh = None
+
+
+class SimulatorScheduler:
+    def __init__(self, bind):
+        self.lock = SimulatorLeaderLock(bind)
+        self.is_leader = False
+        self.leader_since: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        print(f"Market simulator scheduler started (pid {os.getpid()}, {self.lock.backend})")
+        while True:
+            try:
+                if self.is_leader and not await asyncio.to_thread(self.lock.still_held):
+                    print("Market simulator: leadership lost")
+                    self.is_leader, self.leader_since = False, None
+                if not self.is_leader and await asyncio.to_thread(self.lock.try_acquire):
+                    print(f"Market simulator: pid {os.getpid()} is the leader")
+                    self.is_leader, self.leader_since = True, datetime.utcnow()
+                if self.is_leader:
+                    # run blocking DB operations in a thread so the event loop is not blocked
+                    await asyncio.to_thread(_simulator_tick)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print("Simulator scheduler error:", e)
+            await asyncio.sleep(simulator_config.interval_seconds)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await asyncio.to_thread(self.lock.release)
+        self.is_leader, self.leader_since = False, None
+
+    def status(self) -> Dict[str, object]:
+        last = simulator_ticks[-1] if simulator_ticks else None
+        return {
+            "enabled": SIMULATOR_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "pid": os.getpid(),
+            "lock_backend": self.lock.backend,
+            "leader": self.is_leader,
+            "leader_since": self.leader_since.isoformat() if self.leader_since else None,
+            "last_tick_at": last["at"] if last else None,
+            "last_tick_ms": last["tick_ms"] if last else None,
+        }
+
+
+simulator_scheduler = SimulatorScheduler(engine)
+
+
                     #-------------------------------------------------------
                     # MILESTONE 3: BOOKING WORKFLOW & TRANSACTION MANAGEMENT
                     #-------------------------------------------------------
@@ -422,19 +2263,330 @@ async def market_simulator(interval_seconds: int = 20):
 # ---------------------------
 
 
-# Helper: generate PNR
-def generate_pnr(length: int = 8) -> str:
-    chars = string.ascii_uppercase + string.digits
-    return "".join(random.choice(chars) for _ in range(length))
+# ---------------------------
+# Seat reservation
+#  - a seat is claimed with one conditional UPDATE ... WHERE is_booked = 0; rowcount 1 means
+#    this transaction owns it, 0 means someone else got there first
+#  - without a preferred seat, candidates are drawn in random order so concurrent bookers on
+#    the same flight spread over different rows instead of queueing on the first free seat
+# ---------------------------
+SEAT_CLAIM_CANDIDATES = 8
+SEAT_CLAIM_ROUNDS = 3
+
+
+def _try_claim(db: Session, *conditions) -> bool:
+    result = db.execute(
+        update(Seat)
+        .where(*conditions, Seat.is_booked == 0)
+        .values(is_booked=1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _try_claim_all(db: Session, seat_ids: List[int]) -> bool:
+    """Claim every seat in seat_ids or report failure (the caller rolls back a partial claim)."""
+    result = db.execute(
+        update(Seat)
+        .where(Seat.seat_id.in_(seat_ids), Seat.is_booked == 0)
+        .values(is_booked=1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == len(seat_ids)
+
+
+def _claim_seat(db: Session, flight_id: int, seat_number: Optional[str] = None):
+    """
+    Reserve one seat on the flight and stage the +1 inventory delta.
+    Returns (outcome, seat_id, seat_number) with outcome one of
+    "claimed", "not_found" (preferred seat does not exist), "taken" (preferred seat already booked)
+    or "sold_out" (no free seat could be claimed).
+    """
+    if seat_number:
+        seat_id = db.query(Seat.seat_id).filter(Seat.flight_id == flight_id, Seat.seat_number == seat_number).scalar()
+        if seat_id is None:
+            return "not_found", None, None
+        if not _try_claim(db, Seat.seat_id == seat_id):
+            return "taken", None, None
+        _stage_seat_delta(db, flight_id, +1)
+        return "claimed", seat_id, seat_number
+
+    for _ in range(SEAT_CLAIM_ROUNDS):
+        candidates = (
+            db.query(Seat.seat_id, Seat.seat_number)
+            .filter(Seat.flight_id == flight_id, Seat.is_booked == 0)
+            .order_by(func.random())
+            .limit(SEAT_CLAIM_CANDIDATES)
+            .all()
+        )
+        if not candidates:
+            break
+        for cand in candidates:
+            if _try_claim(db, Seat.seat_id == cand.seat_id):
+                _stage_seat_delta(db, flight_id, +1)
+                return "claimed", cand.seat_id, cand.seat_number
+    return "sold_out", None, None
+
+
+def _counts_after_reserve(counts: Dict[str, int], seats: int = 1) -> Dict[str, int]:
+    """Seat counts once `seats` more are booked, derived from a snapshot instead of re-counting."""
+    booked = min(counts["booked"] + seats, counts["total"])
+    return {"total": counts["total"], "booked": booked, "available": counts["total"] - booked}
+
+
+# ---------------------------
+# Booking holds
+#  - an unpaid booking (Pending/PaymentFailed) holds its seat until hold_expires_at
+#  - the reaper expires overdue holds in batches through ix_bookings_hold_expiry and frees their seats;
+#    rows locked by an in-flight payment are skipped (SKIP LOCKED) and picked up next sweep; servers
+#    without SKIP LOCKED (MySQL < 8.0.1, MariaDB < 10.6) wait for the lock with a plain FOR UPDATE
+#  - every worker runs a reaper; the conditional updates make concurrent sweeps safe
+# ---------------------------
+HOLD_STATUSES = ("Pending", "PaymentFailed")
+# bookings that own their seat; a seat with one of these must never be released by anyone else
+LIVE_BOOKING_STATUSES = HOLD_STATUSES + ("Confirmed",)
+HOLD_TTL_SECONDS = setting_int("FLIGHT_HOLD_TTL_SECONDS", 900)
+REAPER_ENABLED = setting_bool("FLIGHT_REAPER_ENABLED", True)
+REAPER_INTERVAL_SECONDS = setting_float("FLIGHT_REAPER_INTERVAL", 30)
+REAPER_BATCH_SIZE = setting_int("FLIGHT_REAPER_BATCH", 500)
+# cap per sweep so a large backlog is worked off over several sweeps without hogging a pool connection
+REAPER_MAX_BATCHES = setting_int("FLIGHT_REAPER_MAX_BATCHES", 20)
+
+
+def _hold_deadline(now: Optional[datetime] = None) -> datetime:
+    return (now or datetime.utcnow()) + timedelta(seconds=HOLD_TTL_SECONDS)
+
+
+def _seat_has_live_booking():
+    """Correlated EXISTS for seat filters: a hold or Confirmed booking still owns Seat.seat_id."""
+    return exists().where(Booking.seat_id == Seat.seat_id, Booking.status.in_(LIVE_BOOKING_STATUSES))
+
+
+def supports_skip_locked(dialect) -> bool:
+    """
+    Whether the connected server accepts FOR UPDATE SKIP LOCKED (MySQL 8.0.1+, MariaDB 10.6+).
+    Other dialects are left to SQLAlchemy: SQLite drops FOR UPDATE altogether.
+    """
+    if dialect.name != "mysql":
+        return True
+    version = dialect.server_version_info or ()
+    return version >= ((10, 6) if dialect.is_mariadb else (8, 0, 1))
+
+
+def _release_booking(db: Session, booking: Booking, new_status: str) -> bool:
+    """
+    Move a booking to new_status (Cancelled/Expired) and free its seat if the booking still held it.
+    Returns True when the seat was freed.
+    """
+    freed = False
+    if booking.status in HOLD_STATUSES or booking.status == "Confirmed":
+        result = db.execute(
+            update(Seat)
+            .where(Seat.seat_id == booking.seat_id, Seat.is_booked == 1)
+            .values(is_booked=0)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            _stage_seat_delta(db, booking.flight_id, -1)
+            freed = True
+    booking.status = new_status
+    booking.hold_expires_at = None
+    db.add(booking)
+    return freed
+
+
+def _reap_expired_holds_batch(db: Session, now: datetime, batch_size: int) -> Optional[int]:
+    """
+    Expire one batch of overdue holds and free their seats; the caller commits.
+    Returns the number of bookings expired, or None if rows changed underneath and the batch was skipped.
+    """
+    # the server version is known once the session's connection is open
+    skip_locked = supports_skip_locked(db.connection().dialect)
+    rows = db.execute(
+        select(Booking.booking_id, Booking.flight_id, Booking.seat_id)
+        .where(Booking.hold_expires_at <= now)
+        .order_by(Booking.hold_expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=skip_locked)
+    ).all()
+    if not rows:
+        return 0
+    expired = db.execute(
+        update(Booking)
+        .where(Booking.booking_id.in_([r.booking_id for r in rows]), Booking.hold_expires_at <= now)
+        .values(status="Expired", hold_expires_at=None)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if expired != len(rows):
+        # a payment or cancel got in between (only possible without row locks); leave it to the next sweep
+        db.rollback()
+        return None
+    seats_by_flight: Dict[int, List[int]] = {}
+    for r in rows:
+        seats_by_flight.setdefault(r.flight_id, []).append(r.seat_id)
+    for fid, seat_ids in seats_by_flight.items():
+        freed = db.execute(
+            update(Seat)
+            # a seat released earlier may have been rebooked since; leave it to its new owner
+            .where(Seat.seat_id.in_(seat_ids), Seat.is_booked == 1, ~_seat_has_live_booking())
+            .values(is_booked=0)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if freed:
+            _stage_seat_delta(db, fid, -freed)
+    return expired
+
+
+def reap_expired_holds(now: Optional[datetime] = None, batch_size: Optional[int] = None,
+                       max_batches: Optional[int] = None) -> Dict[str, object]:
+    """One reaper sweep: expire overdue holds batch by batch, one transaction per batch."""
+    now = now or datetime.utcnow()
+    batch_size = batch_size or REAPER_BATCH_SIZE
+    max_batches = max_batches or REAPER_MAX_BATCHES
+    start = time.perf_counter()
+    reaped = batches = 0
+    for _ in range(max_batches):
+        with SessionLocal() as db:
+            n = _reap_expired_holds_batch(db, now, batch_size)
+            db.commit()
+        batches += 1
+        if n is None:
+            continue
+        reaped += n
+        if n < batch_size:
+            break
+    return {
+        "at": now.isoformat(),
+        "reaped": reaped,
+        "batches": batches,
+        "sweep_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+class HoldReaper:
+    def __init__(self):
+        self.sweeps: deque = deque(maxlen=100)
+        self.total_reaped = 0
+        self.total_sweeps = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                self.record(await asyncio.to_thread(reap_expired_holds))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.errors += 1
+                self.last_error = str(e)
+                print("Hold reaper error:", e)
+            await asyncio.sleep(REAPER_INTERVAL_SECONDS)
+
+    def record(self, sweep: Dict[str, object]) -> None:
+        self.sweeps.append(sweep)
+        self.total_sweeps += 1
+        self.total_reaped += sweep["reaped"]
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    def status(self) -> Dict[str, object]:
+        durations = sorted(s["sweep_ms"] for s in self.sweeps)
+        last = self.sweeps[-1] if self.sweeps else None
+        return {
+            "enabled": REAPER_ENABLED,
+            "running": self._task is not None and not self._task.done(),
+            "hold_ttl_seconds": HOLD_TTL_SECONDS,
+            "interval_seconds": REAPER_INTERVAL_SECONDS,
+            "batch_size": REAPER_BATCH_SIZE,
+            "sweeps": self.total_sweeps,
+            "reaped_total": self.total_reaped,
+            "errors": self.errors,
+            "last_error": self.last_error,
+            "last_sweep": last,
+            "sweep_ms_p50": durations[len(durations) // 2] if durations else None,
+            "sweep_ms_max": durations[-1] if durations else None,
+        }
+
+
+hold_reaper = HoldReaper()
+
+
+# ---------------------------
+# PNR allocation
+#  - the PNR is the booking_id run through a keyed Feistel permutation of [0, 36^8) and written in base 36,
+#    so distinct bookings always get distinct PNRs and no lookup is needed; the unique index is a safety net
+#  - the domain is split into two base-36 halves of 4 digits, so every round stays inside it (no cycle walking)
+#  - FLIGHT_PNR_KEY keeps PNRs unguessable from booking ids; changing it on a live DB can collide with old PNRs
+# ---------------------------
+PNR_ALPHABET = string.digits + string.ascii_uppercase
+PNR_LENGTH = 8
+PNR_ROUNDS = 4
+_PNR_HALF = 36 ** (PNR_LENGTH // 2)
+_PNR_KEY = hashlib.blake2b(
+    setting("FLIGHT_PNR_KEY", "flight-booking-simulator").encode(), digest_size=32
+).digest()
+# keyed hash state per round, copied per call (keying blake2b dominates the cost otherwise)
+_PNR_ROUND_HASHES = [
+    hashlib.blake2b(bytes((rnd,)), key=_PNR_KEY, digest_size=8) for rnd in range(PNR_ROUNDS)
+]
+
+
+def _pnr_round(rnd: int, half: int) -> int:
+    h = _PNR_ROUND_HASHES[rnd].copy()
+    h.update(half.to_bytes(3, "big"))
+    return int.from_bytes(h.digest(), "big") % _PNR_HALF
+
+
+def _pnr_half_digits(value: int) -> str:
+    return (PNR_ALPHABET[value // 46656] + PNR_ALPHABET[value // 1296 % 36]
+            + PNR_ALPHABET[value // 36 % 36] + PNR_ALPHABET[value % 36])
+
+
+def generate_pnr(booking_id: int) -> str:
+    """Deterministic, collision-free 8-char PNR for a booking_id (0 <= booking_id < 36^8)."""
+    if not 0 <= booking_id < _PNR_HALF * _PNR_HALF:
+        raise ValueError(f"booking_id {booking_id} outside the PNR space")
+    left, right = divmod(booking_id, _PNR_HALF)
+    for rnd in range(PNR_ROUNDS):
+        left, right = right, (left + _pnr_round(rnd, right)) % _PNR_HALF
+    value = left * _PNR_HALF + right
+    hi, lo = divmod(value, _PNR_HALF)
+    return _pnr_half_digits(hi) + _pnr_half_digits(lo)
+
+
+def pnr_to_booking_id(pnr: str) -> int:
+    """Inverse of generate_pnr (only meaningful for PNRs issued under the current key)."""
+    value = 0
+    for ch in pnr.upper():
+        value = value * 36 + PNR_ALPHABET.index(ch)
+    left, right = divmod(value, _PNR_HALF)
+    for rnd in reversed(range(PNR_ROUNDS)):
+        left, right = (right - _pnr_round(rnd, left)) % _PNR_HALF, left
+    return left * _PNR_HALF + right
+
 
 @app.post("/bookings", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-def create_booking(req: BookingCreateReq, db: Session = Depends(get_db)):
+async def create_booking(req: BookingCreateReq, db=Depends(get_session)):
     """
     Create a booking:
       - find flight, check seat availability
       - reserve a seat (mark is_booked=1) and insert Booking with status 'Pending' and pnr=NULL
       - return booking details (PNR generated only after payment)
     """
+    return await run_db(db, _create_booking, req)
+
+
+def _create_booking(db: Session, req: BookingCreateReq) -> BookingResponse:
     passenger_id = req.passenger_id  # passenger_id sent in payload
 
     passenger = db.query(Passenger).filter(Passenger.passenger_id == passenger_id).first()
@@ -451,40 +2603,22 @@ def create_booking(req: BookingCreateReq, db: Session = Depends(get_db)):
             if not flight:
                 raise HTTPException(status_code=404, detail="Flight not found")
             
-            counts = _count_seats(db, flight.flight_id)
+            counts = _recount_if_short(db, {flight.flight_id: _count_seats(db, flight.flight_id)},
+                                       {flight.flight_id: 1})[flight.flight_id]
             if counts["available"] <= 0:
                 raise HTTPException(status_code=400, detail="No seats available")
 
-            # pick seat: preferred or first available
-           
-            if req.seat_number:
-                seat_row = (
-                    db.query(Seat)
-                    .filter(Seat.flight_id == flight.flight_id, Seat.seat_number == req.seat_number)
-                    .with_for_update()
-                    .first()
-                )
-                if not seat_row:
-                    raise HTTPException(status_code=404, detail="Requested seat not found")
-                if seat_row.is_booked == 1:
-                    raise HTTPException(status_code=400, detail="Requested seat already booked")
-            else:
-                seat_row = (
-                    db.query(Seat)
-                    .filter(Seat.flight_id == flight.flight_id, Seat.is_booked == 0)
-                    .with_for_update()
-                    .first()
-                )
-                if not seat_row:
-                    raise HTTPException(status_code=400, detail="No available seats (race)")
-
-            # reserve seat immediately
-            seat_row.is_booked = 1
-            db.add(seat_row)
-            db.flush()  # ensure seat update applied
-
-            # recompute counts after reserve
-            counts_after = _count_seats(db, flight.flight_id)
+            # claim seat: preferred or any available (atomic conditional UPDATE)
+            outcome, seat_id, seat_number = _claim_seat(db, flight.flight_id, req.seat_number)
+            if outcome == "not_found":
+                raise HTTPException(status_code=404, detail="Requested seat not found")
+            if outcome == "taken":
+                raise HTTPException(status_code=400, detail="Requested seat already booked")
+            if outcome == "sold_out":
+                raise HTTPException(status_code=400, detail="No available seats (race)")
+
+            # price from the pre-claim snapshot plus this reservation (no re-count)
+            counts_after = _counts_after_reserve(counts)
             demand_index = 1.0 + (counts_after["booked"] / max(counts_after["total"], 1)) * 0.5
             amount = _compute_dynamic_price(
                 flight.base_fare,
@@ -497,27 +2631,26 @@ def create_booking(req: BookingCreateReq, db: Session = Depends(get_db)):
             booking = Booking(
                 passenger_id=passenger_id,
                 flight_id=flight.flight_id,
-                seat_id=seat_row.seat_id,
+                seat_id=seat_id,
                 booking_date=datetime.utcnow(),
                 amount_paid=amount,
                 status="Pending",
-                pnr=None
+                pnr=None,
+                hold_expires_at=_hold_deadline()
             )
             db.add(booking)
             db.flush()
-            db.refresh(booking)
 
-       
-            passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == passenger_id).scalar()
             response = BookingResponse(
                 booking_id=booking.booking_id,
                 pnr=None,
                 flight_number=flight.flight_number,
-                passenger_name=passenger_name or "",
-                seat_number=seat_row.seat_number,
+                passenger_name=passenger.full_name or "",
+                seat_number=seat_number,
                 amount_paid=float(booking.amount_paid),
                 status=booking.status,
-                booking_date=booking.booking_date or datetime.utcnow()
+                booking_date=booking.booking_date or datetime.utcnow(),
+                hold_expires_at=booking.hold_expires_at
             )
         
         if pre_in_tx:
@@ -535,6 +2668,32 @@ def create_booking(req: BookingCreateReq, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Booking creation failed: {e}")
 
 
+# ---------------------------
+# Itinerary booking (2..N legs, roundtrip is the two-leg case)
+#  - each leg must depart at least ITINERARY_MIN_CONNECTION after the previous leg arrives
+#  - seats are claimed in flight_id order whatever the leg order, so two itineraries over the
+#    same flights always take their row locks in the same order and cannot deadlock each other
+#  - seat counts for every leg come from one batched inventory read and are priced in one batch
+#  - MySQL deadlocks / lock wait timeouts roll back the whole itinerary and retry with backoff
+# ---------------------------
+ITINERARY_MAX_LEGS = 6
+ITINERARY_MIN_CONNECTION = MIN_LAYOVER
+ITINERARY_LOCK_RETRIES = 3
+ITINERARY_RETRY_BACKOFF_SECONDS = 0.05
+# ER_LOCK_DEADLOCK, ER_LOCK_WAIT_TIMEOUT
+MYSQL_RETRYABLE_LOCK_ERRORS = (1213, 1205)
+
+
+class ItineraryLegReq(BaseModel):
+    flight_id: int
+    seat_number: Optional[str] = None  # preferred seat
+
+
+class ItineraryCreateReq(BaseModel):
+    passenger_id: int
+    legs: List[ItineraryLegReq] = Field(..., min_length=2, max_length=ITINERARY_MAX_LEGS)
+
+
 class RoundtripCreateReq(BaseModel):
     outbound_flight_id: int
     outbound_seat_number: Optional[str] = None
@@ -542,8 +2701,41 @@ class RoundtripCreateReq(BaseModel):
     return_seat_number: Optional[str] = None
     passenger_id: int
 
+
+def _is_retryable_lock_error(exc: Exception) -> bool:
+    orig = getattr(exc, "orig", None)
+    return isinstance(exc, OperationalError) and bool(getattr(orig, "args", ())) \
+        and orig.args[0] in MYSQL_RETRYABLE_LOCK_ERRORS
+
+
+async def _run_itinerary(db, req: ItineraryCreateReq) -> List[BookingResponse]:
+    for attempt in range(ITINERARY_LOCK_RETRIES + 1):
+        try:
+            return await run_db(db, _book_itinerary, req)
+        except OperationalError as e:
+            if not _is_retryable_lock_error(e) or attempt == ITINERARY_LOCK_RETRIES:
+                raise HTTPException(status_code=503, detail=f"Itinerary booking failed: {e.orig}")
+            # exponential backoff with jitter so the colliding transactions do not retry in lockstep
+            await asyncio.sleep(ITINERARY_RETRY_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random()))
+
+
+@app.post("/bookings/itinerary", response_model=List[BookingResponse], status_code=status.HTTP_201_CREATED)
+async def create_itinerary(req: ItineraryCreateReq, db=Depends(get_session)):
+    """
+    Book a multi-leg itinerary (2..6 legs) in a single transaction.
+    One seat per leg is reserved and one 'Pending' booking per leg is created.
+    Returns the bookings in leg order.
+
+    Validations:
+      - passenger and every flight must exist, no flight twice
+      - each leg departs at least 1 hour after the previous leg arrives
+      - all legs reserved/created in one transaction (atomic)
+    """
+    return await _run_itinerary(db, req)
+
+
 @app.post("/bookings/roundtrip", response_model=List[BookingResponse], status_code=status.HTTP_201_CREATED)
-def create_roundtrip(req: RoundtripCreateReq, db: Session = Depends(get_db)):
+async def create_roundtrip(req: RoundtripCreateReq, db=Depends(get_session)):
     """
     Create a roundtrip booking (two Booking rows: outbound + return) in a single transaction.
     Seats for both legs are reserved (is_booked=1) and bookings created with status 'Pending'.
@@ -554,106 +2746,95 @@ def create_roundtrip(req: RoundtripCreateReq, db: Session = Depends(get_db)):
       - return flight must depart at least 1 hour after outbound arrival
       - both legs reserved/created in one transaction (atomic)
     """
-    passenger_id = req.passenger_id
-    passenger = db.query(Passenger).filter(Passenger.passenger_id == passenger_id).first()
-    if not passenger:
-        raise HTTPException(status_code=404, detail="Passenger not found")
+    return await _run_itinerary(db, ItineraryCreateReq(
+        passenger_id=req.passenger_id,
+        legs=[
+            ItineraryLegReq(flight_id=req.outbound_flight_id, seat_number=req.outbound_seat_number),
+            ItineraryLegReq(flight_id=req.return_flight_id, seat_number=req.return_seat_number),
+        ],
+    ))
 
-    pre_in_tx = db.in_transaction()
-    tx_ctx = db.begin_nested() if pre_in_tx else db.begin()
 
-    created: List[BookingResponse] = []
+def _book_itinerary(db: Session, req: ItineraryCreateReq) -> List[BookingResponse]:
     try:
-        outbound_arrival: Optional[datetime] = None
-
-        with tx_ctx:
-            for idx, (flight_id, seat_number) in enumerate((
-                (req.outbound_flight_id, req.outbound_seat_number),
-                (req.return_flight_id, req.return_seat_number),
-            )):
-                flight = db.query(Flight).filter(Flight.flight_id == flight_id).first()
-                if not flight:
-                    raise HTTPException(status_code=404, detail=f"Flight {flight_id} not found")
-
-                # for return leg ensure timing after outbound arrival (+1 hour buffer)
-                if idx == 1 and outbound_arrival is not None:
-                    if flight.departure_time <= outbound_arrival + timedelta(hours=1):
-                        raise HTTPException(status_code=400, detail="Return flight must depart at least 1 hour after outbound arrival")
-
-                counts = _count_seats(db, flight_id)
-                if counts["available"] <= 0:
-                    raise HTTPException(status_code=400, detail=f"No seats available for flight {flight_id}")
-
-                if seat_number:
-                    seat_row = (
-                        db.query(Seat)
-                        .filter(Seat.flight_id == flight_id, Seat.seat_number == seat_number)
-                        .with_for_update()
-                        .first()
-                    )
-                    if not seat_row:
-                        raise HTTPException(status_code=404, detail=f"Requested seat {seat_number} not found on flight {flight_id}")
-                    if seat_row.is_booked == 1:
-                        raise HTTPException(status_code=400, detail=f"Requested seat {seat_number} already booked on flight {flight_id}")
-                else:
-                    seat_row = (
-                        db.query(Seat)
-                        .filter(Seat.flight_id == flight_id, Seat.is_booked == 0)
-                        .with_for_update()
-                        .first()
+        with db.begin():
+            passenger = db.query(Passenger).filter(Passenger.passenger_id == req.passenger_id).first()
+            if not passenger:
+                raise HTTPException(status_code=404, detail="Passenger not found")
+
+            flight_ids = [leg.flight_id for leg in req.legs]
+            if len(set(flight_ids)) != len(flight_ids):
+                raise HTTPException(status_code=400, detail="A flight can appear only once in an itinerary")
+            flights = {f.flight_id: f for f in db.query(Flight).filter(Flight.flight_id.in_(flight_ids))}
+            for fid in flight_ids:
+                if fid not in flights:
+                    raise HTTPException(status_code=404, detail=f"Flight {fid} not found")
+
+            for i in range(1, len(flight_ids)):
+                prev, cur = flights[flight_ids[i - 1]], flights[flight_ids[i]]
+                if cur.departure_time <= prev.arrival_time + ITINERARY_MIN_CONNECTION:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Flight {cur.flight_id} must depart at least 1 hour after flight {prev.flight_id} arrives"
                     )
-                    if not seat_row:
-                        raise HTTPException(status_code=400, detail=f"No available seats (race) on flight {flight_id}")
 
-                # reserve seat
-                seat_row.is_booked = 1
-                db.add(seat_row)
-                db.flush()
-
-                counts_after = _count_seats(db, flight_id)
-                demand_index = 1.0 + (counts_after["booked"] / max(counts_after["total"], 1)) * 0.5
-                amount = _compute_dynamic_price(
-                    flight.base_fare,
-                    seats_available=counts_after["available"],
-                    total_seats=counts_after["total"],
-                    departure_dt=flight.departure_time,
-                    demand_index=demand_index
-                )
+            counts = _recount_if_short(db, _count_seats_bulk(db, flight_ids), {fid: 1 for fid in flight_ids})
+            for fid in flight_ids:
+                if counts[fid]["available"] <= 0:
+                    raise HTTPException(status_code=400, detail=f"No seats available for flight {fid}")
+
+            # canonical lock order: ascending flight_id, independent of leg order
+            claimed: Dict[int, tuple] = {}
+            for leg in sorted(req.legs, key=lambda l: l.flight_id):
+                fid, seat_number = leg.flight_id, leg.seat_number
+                outcome, seat_id, claimed_seat_number = _claim_seat(db, fid, seat_number)
+                if outcome == "not_found":
+                    raise HTTPException(status_code=404, detail=f"Requested seat {seat_number} not found on flight {fid}")
+                if outcome == "taken":
+                    raise HTTPException(status_code=400, detail=f"Requested seat {seat_number} already booked on flight {fid}")
+                if outcome == "sold_out":
+                    raise HTTPException(status_code=400, detail=f"No available seats (race) on flight {fid}")
+                claimed[fid] = (seat_id, claimed_seat_number)
+
+            after = [_counts_after_reserve(counts[fid]) for fid in flight_ids]
+            amounts = _compute_dynamic_prices(
+                [flights[fid].base_fare for fid in flight_ids],
+                [c["available"] for c in after],
+                [c["total"] for c in after],
+                [flights[fid].departure_time for fid in flight_ids],
+            )
 
-                booking = Booking(
-                    passenger_id=passenger_id,
-                    flight_id=flight_id,
-                    seat_id=seat_row.seat_id,
-                    booking_date=datetime.utcnow(),
+            now = datetime.utcnow()
+            bookings = [
+                Booking(
+                    passenger_id=passenger.passenger_id,
+                    flight_id=fid,
+                    seat_id=claimed[fid][0],
+                    booking_date=now,
                     amount_paid=amount,
                     status="Pending",
-                    pnr=None
+                    pnr=None,
+                    hold_expires_at=_hold_deadline(now)
                 )
-                db.add(booking)
-                db.flush()
-                db.refresh(booking)
+                for fid, amount in zip(flight_ids, amounts)
+            ]
+            db.add_all(bookings)
+            db.flush()
 
-                passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == passenger_id).scalar()
-                created.append(BookingResponse(
+            return [
+                BookingResponse(
                     booking_id=booking.booking_id,
                     pnr=None,
-                    flight_number=flight.flight_number,
-                    passenger_name=passenger_name or "",
-                    seat_number=seat_row.seat_number,
+                    flight_number=flights[booking.flight_id].flight_number,
+                    passenger_name=passenger.full_name or "",
+                    seat_number=claimed[booking.flight_id][1],
                     amount_paid=float(booking.amount_paid),
                     status=booking.status,
-                    booking_date=booking.booking_date or datetime.utcnow()
-                ))
-
-                # store outbound arrival time after processing first leg
-                if idx == 0:
-                    outbound_arrival = flight.arrival_time
-
-        # commit if we used a nested (outer) transaction
-        if pre_in_tx:
-            db.commit()
-
-        return created
+                    booking_date=booking.booking_date,
+                    hold_expires_at=booking.hold_expires_at
+                )
+                for booking in bookings
+            ]
     except HTTPException:
         raise
     except Exception as e:
@@ -661,12 +2842,241 @@ def create_roundtrip(req: RoundtripCreateReq, db: Session = Depends(get_db)):
             db.rollback()
         except Exception:
             pass
-        raise HTTPException(status_code=500, detail=f"Roundtrip booking failed: {e}")
+        if _is_retryable_lock_error(e):
+            raise
+        raise HTTPException(status_code=500, detail=f"Itinerary booking failed: {e}")
+
+
+# ---------------------------
+# Group booking
+#  - N passengers on one flight, all-or-nothing, in one transaction
+#  - seats are picked from one read of the flight's seat map and claimed with a single conditional
+#    UPDATE ... WHERE seat_id IN (...) AND is_booked = 0; if another booker got any of them first the
+#    whole transaction is rolled back and the pick is retried against a fresh seat map
+#  - every seat is priced from the same inventory snapshot and the Booking rows go in as one bulk insert
+# ---------------------------
+GROUP_BOOKING_MAX_SEATS = 50
+
+
+class GroupBookingReq(BaseModel):
+    flight_id: int
+    passenger_ids: List[int] = Field(..., min_length=1, max_length=GROUP_BOOKING_MAX_SEATS)
+    seat_class: Optional[str] = Field(None, pattern="^(Economy|Business)$")
+    adjacent: bool = False  # one contiguous block of seats, spanning as few rows as possible
+
+
+class _GroupSeatsTaken(Exception):
+    """Some of the picked seats were claimed concurrently; retry the group with a fresh seat map."""
 
 
+def _seat_sort_key(seat_number: str):
+    # "12C" -> (12, "C"); unparseable numbers sort last
+    digits = seat_number.rstrip(string.ascii_uppercase)
+    return (int(digits), seat_number[len(digits):]) if digits.isdigit() else (float("inf"), seat_number)
+
+
+def _pick_group_seats(seat_map, n: int, adjacent: bool) -> Optional[list]:
+    """
+    Choose n free seats from seat_map (rows of seat_id, seat_number, is_booked in seat order).
+    Non-adjacent groups take the first n free seats; adjacent groups take the run of n consecutive
+    free seats spanning the fewest rows. None when no suitable seats exist.
+    """
+    if not adjacent:
+        free = [s for s in seat_map if not s.is_booked]
+        return free[:n] if len(free) >= n else None
+    best, best_rows = None, None
+    run_start = 0
+    for i, seat in enumerate(seat_map):
+        if seat.is_booked:
+            run_start = i + 1
+            continue
+        if i - run_start + 1 >= n:
+            window = seat_map[i - n + 1:i + 1]
+            rows = len({_seat_sort_key(s.seat_number)[0] for s in window})
+            if best_rows is None or rows < best_rows:
+                best, best_rows = window, rows
+                if rows == 1:
+                    break
+    return best
+
+
+@app.post("/bookings/group", response_model=List[BookingResponse], status_code=status.HTTP_201_CREATED)
+async def create_group_booking(req: GroupBookingReq, db=Depends(get_session)):
+    """
+    Book one seat per passenger on a flight in a single all-or-nothing transaction:
+      - optional seat_class filter and adjacent=true for one contiguous block of seats
+      - every booking is 'Pending' with the same price and hold deadline
+    """
+    return await run_db(db, _create_group_booking, req)
+
+
+def _create_group_booking(db: Session, req: GroupBookingReq) -> List[BookingResponse]:
+    n = len(req.passenger_ids)
+    for attempt in range(SEAT_CLAIM_ROUNDS):
+        try:
+            return _try_group_booking(db, req, n)
+        except _GroupSeatsTaken:
+            db.rollback()
+        except HTTPException:
+            db.rollback()
+            raise
+        except Exception as e:
+            db.rollback()
+            raise HTTPException(status_code=500, detail=f"Group booking failed: {e}")
+    raise HTTPException(status_code=409, detail="Seats were taken concurrently; please retry")
+
+
+def _try_group_booking(db: Session, req: GroupBookingReq, n: int) -> List[BookingResponse]:
+    with db.begin():
+        flight = db.query(Flight).filter(Flight.flight_id == req.flight_id).first()
+        if not flight:
+            raise HTTPException(status_code=404, detail="Flight not found")
+        wanted = set(req.passenger_ids)
+        found = {pid for (pid,) in db.query(Passenger.passenger_id).filter(Passenger.passenger_id.in_(wanted))}
+        if found != wanted:
+            raise HTTPException(status_code=404, detail=f"Passengers not found: {sorted(wanted - found)}")
+
+        counts = _recount_if_short(db, {flight.flight_id: _count_seats(db, flight.flight_id)},
+                                   {flight.flight_id: n})[flight.flight_id]
+        if counts["available"] < n:
+            raise HTTPException(status_code=400, detail=f"Only {counts['available']} seats available")
+
+        q = db.query(Seat.seat_id, Seat.seat_number, Seat.is_booked).filter(Seat.flight_id == flight.flight_id)
+        if req.seat_class:
+            q = q.filter(Seat.seat_class == req.seat_class)
+        seat_map = sorted(q.all(), key=lambda s: _seat_sort_key(s.seat_number))
+        seats = _pick_group_seats(seat_map, n, req.adjacent)
+        if seats is None:
+            kind = f"{n} adjacent" if req.adjacent else str(n)
+            cls = f" {req.seat_class}" if req.seat_class else ""
+            raise HTTPException(status_code=400, detail=f"No {kind}{cls} seats available")
+
+        seat_ids = [s.seat_id for s in seats]
+        if not _try_claim_all(db, seat_ids):
+            raise _GroupSeatsTaken()
+        _stage_seat_delta(db, flight.flight_id, +n)
+
+        # one snapshot, one price for the whole group
+        counts_after = _counts_after_reserve(counts, n)
+        demand_index = 1.0 + (counts_after["booked"] / max(counts_after["total"], 1)) * 0.5
+        amount = _compute_dynamic_price(
+            flight.base_fare,
+            seats_available=counts_after["available"],
+            total_seats=counts_after["total"],
+            departure_dt=flight.departure_time,
+            demand_index=demand_index
+        )
+        # whole seconds: MySQL DATETIME drops the fraction, and the fallback lookup below matches on it
+        now = datetime.utcnow().replace(microsecond=0)
+        values = [
+            {
+                "passenger_id": pid,
+                "flight_id": flight.flight_id,
+                "seat_id": seat_id,
+                "booking_date": now,
+                "amount_paid": amount,
+                "status": "Pending",
+                "pnr": None,
+                "hold_expires_at": _hold_deadline(now),
+            }
+            for pid, seat_id in zip(req.passenger_ids, seat_ids)
+        ]
+        # seat_id is not unique, so "Pending on these seats" can also match someone else's booking;
+        # identify exactly the rows inserted here
+        if db.get_bind().dialect.insert_executemany_returning:
+            new_ids = db.execute(insert(Booking).returning(Booking.booking_id), values).scalars().all()
+            inserted = [Booking.booking_id.in_(new_ids)]
+        else:
+            # no RETURNING for executemany (MySQL): these passengers, seats and booking_date
+            db.execute(insert(Booking), values)
+            inserted = [
+                Booking.flight_id == flight.flight_id,
+                Booking.seat_id.in_(seat_ids),
+                Booking.passenger_id.in_(req.passenger_ids),
+                Booking.booking_date == now,
+                Booking.status == "Pending",
+            ]
+        rows = _booking_rows_query(db).filter(*inserted).order_by(Booking.booking_id).all()
+        return [_booking_response(r) for r in rows]
+
+
+
+
+# ---------------------------
+# Booking read helpers: one joined query (Booking + Flight + Seat + Passenger) per lookup
+# ---------------------------
+BOOKINGS_PAGE_SIZE = 50
+BOOKINGS_MAX_PAGE_SIZE = 200
+
+
+def _booking_rows_query(db: Session):
+    return (
+        db.query(
+            Booking.booking_id, Booking.pnr, Booking.amount_paid, Booking.status, Booking.booking_date,
+            Booking.hold_expires_at, Flight.flight_number, Seat.seat_number, Passenger.full_name,
+        )
+        .outerjoin(Flight, Flight.flight_id == Booking.flight_id)
+        .outerjoin(Seat, Seat.seat_id == Booking.seat_id)
+        .outerjoin(Passenger, Passenger.passenger_id == Booking.passenger_id)
+    )
+
+
+def _booking_response(row) -> BookingResponse:
+    return BookingResponse(
+        booking_id=row.booking_id,
+        pnr=row.pnr,
+        flight_number=row.flight_number or "",
+        passenger_name=row.full_name or "",
+        seat_number=row.seat_number or "",
+        amount_paid=float(row.amount_paid),
+        status=row.status,
+        booking_date=row.booking_date or datetime.utcnow(),
+        hold_expires_at=row.hold_expires_at
+    )
+
+
+def _booking_row_dict(row) -> dict:
+    """BookingResponse-shaped dict for the fast JSON path (same defaults as _booking_response)."""
+    return {
+        "booking_id": row.booking_id,
+        "pnr": row.pnr,
+        "flight_number": row.flight_number or "",
+        "passenger_name": row.full_name or "",
+        "seat_number": row.seat_number or "",
+        "amount_paid": float(row.amount_paid),
+        "status": row.status,
+        "booking_date": row.booking_date or datetime.utcnow(),
+        "hold_expires_at": row.hold_expires_at,
+    }
+
+
+def _fetch_booking_response(db: Session, booking_id: int) -> BookingResponse:
+    return _booking_response(_booking_rows_query(db).filter(Booking.booking_id == booking_id).one())
+
+
+def _list_passenger_bookings(db: Session, passenger_id: int, limit: int, cursor: Optional[int],
+                             request: Request, response: Response):
+    """
+    One page of a passenger's non-cancelled bookings ordered by booking_id.
+    When more rows exist, the booking_id to pass as `cursor` for the next page is sent in X-Next-Cursor.
+    """
+    q = _booking_rows_query(db).filter(Booking.passenger_id == passenger_id, Booking.status != "Cancelled")
+    if cursor is not None:
+        q = q.filter(Booking.booking_id > cursor)
+    rows = q.order_by(Booking.booking_id).limit(limit + 1).all()
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        headers["X-Next-Cursor"] = str(rows[-1].booking_id)
+    if FAST_JSON:
+        return fast_json_response([_booking_row_dict(r) for r in rows],
+                                  request.headers.get("accept-encoding", ""), headers)
+    response.headers.update(headers)
+    return [_booking_response(r) for r in rows]
+
 
 @app.post("/bookings/pay/{booking_id}", response_model=BookingResponse)
-def pay_booking(booking_id: int, payload: BookingPayReq, db: Session = Depends(get_db)):
+async def pay_booking(booking_id: int, payload: BookingPayReq, db=Depends(get_session)):
     """
     Simulate payment:
       - passenger_id must be provided in payload
@@ -674,6 +3084,10 @@ def pay_booking(booking_id: int, payload: BookingPayReq, db: Session = Depends(g
       - on success: generate PNR, set status 'Confirmed', persist PNR
       - on failure: leave booking as 'Pending', return failure message
     """
+    return await run_db(db, _pay_booking, booking_id, payload)
+
+
+def _pay_booking(db: Session, booking_id: int, payload: BookingPayReq) -> BookingResponse:
     passenger_id = payload.passenger_id  # passenger_id from payload
 
     try:
@@ -685,47 +3099,28 @@ def pay_booking(booking_id: int, payload: BookingPayReq, db: Session = Depends(g
                 raise HTTPException(status_code=403, detail="Not authorized for this booking")
             if booking.status == "Confirmed":
                 # already paid
-                flight_number = db.query(Flight.flight_number).filter(Flight.flight_id == booking.flight_id).scalar()
-                seat_number = db.query(Seat.seat_number).filter(Seat.seat_id == booking.seat_id).scalar()
-                passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == passenger_id).scalar()
-                return BookingResponse(
-                    booking_id=booking.booking_id,
-                    pnr=booking.pnr,
-                    flight_number=flight_number or "",
-                    passenger_name=passenger_name or "",
-                    seat_number=seat_number or "",
-                    amount_paid=float(booking.amount_paid),
-                    status=booking.status,
-                    booking_date=booking.booking_date or datetime.utcnow()
-                )
+                return _fetch_booking_response(db, booking.booking_id)
+            if booking.status not in HOLD_STATUSES:
+                raise HTTPException(status_code=409, detail=f"Booking is {booking.status}; book again")
+            if booking.hold_expires_at is not None and booking.hold_expires_at <= datetime.utcnow():
+                # overdue but not reaped yet: the seat is about to be released
+                raise HTTPException(status_code=409, detail="Seat hold expired; book again")
 
             # simulate payment outcome (70% chance success)
             success = random.random() < 0.7
             if success:
                 booking.status = "Confirmed"
-                # generate unique PNR
-                pnr = generate_pnr()
-                attempts = 0
-                while db.query(Booking).filter(Booking.pnr == pnr).first() and attempts < 5:
-                    pnr = generate_pnr()
-                    attempts += 1
-                booking.pnr = pnr
+                # PNR derived from booking_id: unique by construction, no collision lookups
+                booking.pnr = generate_pnr(booking.booking_id)
+                booking.hold_expires_at = None
                 db.add(booking)
-                db.flush()
+                try:
+                    db.flush()
+                except IntegrityError:
+                    # only reachable if a legacy random PNR happens to equal this one
+                    raise HTTPException(status_code=409, detail="PNR conflict; payment not recorded")
 
-                flight_number = db.query(Flight.flight_number).filter(Flight.flight_id == booking.flight_id).scalar()
-                seat_number = db.query(Seat.seat_number).filter(Seat.seat_id == booking.seat_id).scalar()
-                passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == passenger_id).scalar()
-                return BookingResponse(
-                    booking_id=booking.booking_id,
-                    pnr=booking.pnr,
-                    flight_number=flight_number or "",
-                    passenger_name=passenger_name or "",
-                    seat_number=seat_number or "",
-                    amount_paid=float(booking.amount_paid),
-                    status=booking.status,
-                    booking_date=booking.booking_date or datetime.utcnow()
-                )
+                return _fetch_booking_response(db, booking.booking_id)
             else:
                 # payment failed
                 booking.status = "PaymentFailed"
@@ -738,41 +3133,38 @@ def pay_booking(booking_id: int, payload: BookingPayReq, db: Session = Depends(g
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Payment processing failed: {e}")
 
-@app.get("/bookings/passenger/{passenger_id}")
-def get_my_bookings(passenger_id: int, db: Session = Depends(get_db)):
-    bookings = db.query(Booking).filter(Booking.passenger_id == passenger_id,
-                                        Booking.status != "Cancelled").all()
-    out = []
-    for b in bookings:
-        flight_number = db.query(Flight.flight_number).filter(Flight.flight_id == b.flight_id).scalar()
-        seat_number = db.query(Seat.seat_number).filter(Seat.seat_id == b.seat_id).scalar()
-        passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == b.passenger_id).scalar()
-        out.append(BookingResponse(
-            booking_id=b.booking_id,
-            pnr=b.pnr,
-            flight_number=flight_number or "",
-            passenger_name=passenger_name or "",
-            seat_number=seat_number or "",
-            amount_paid=float(b.amount_paid),
-            status=b.status,
-            booking_date=b.booking_date or datetime.utcnow()
-        ))
-    return out
+@app.get("/bookings/passenger/{passenger_id}", response_model=List[BookingResponse])
+def get_my_bookings(passenger_id: int, request: Request, response: Response,
+                    limit: int = Query(BOOKINGS_PAGE_SIZE, ge=1, le=BOOKINGS_MAX_PAGE_SIZE),
+                    cursor: Optional[int] = Query(None, description="booking_id from X-Next-Cursor of the previous page"),
+                    db: Session = Depends(get_db)):
+    return _list_passenger_bookings(db, passenger_id, limit, cursor, request, response)
 
 @app.post("/bookings/cancel/{booking_id}")
 def cancel_booking(booking_id: int, db: Session = Depends(get_db)):
-    booking = db.query(Booking).filter(Booking.booking_id == booking_id,
-                                       Booking.status != "Cancelled").first()
+    booking = db.query(Booking).filter(Booking.booking_id == booking_id).with_for_update().first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
     if booking.status == "Cancelled":
         return {"message":f"Booking {booking_id} already cancelled"}
     
-    booking.status = "Cancelled"
+    _release_booking(db, booking, "Cancelled")
     db.commit()
     return {"message": f"Booking {booking_id} cancelled successfully"}
 
+# declared before /bookings/{identifier} so "me" is not looked up as a PNR
+@app.get("/bookings/me", response_model=List[BookingResponse])
+def my_bookings(request: Request, response: Response,
+                passenger_id: int = Query(..., description="ID of the passenger"),
+                limit: int = Query(BOOKINGS_PAGE_SIZE, ge=1, le=BOOKINGS_MAX_PAGE_SIZE),
+                cursor: Optional[int] = Query(None, description="booking_id from X-Next-Cursor of the previous page"),
+                db: Session = Depends(get_db)):
+    """
+    Get all bookings for a given passenger (paginated, see X-Next-Cursor).
+    """
+    return _list_passenger_bookings(db, passenger_id, limit, cursor, request, response)
+
 @app.get("/bookings/{identifier}", response_model=BookingResponse)
 def get_booking(identifier: str, passenger_id: Optional[int] = Query(None, description="Optional passenger id to check ownership"), db: Session = Depends(get_db)):
     """
@@ -780,10 +3172,11 @@ def get_booking(identifier: str, passenger_id: Optional[int] = Query(None, descr
     If passenger_id is provided, enforce ownership (403 otherwise).
     Note: /bookings/me remains a separate explicit route and takes precedence.
     """
+    q = _booking_rows_query(db).add_columns(Booking.passenger_id)
     if identifier.isdigit():
-        b = db.query(Booking).filter(Booking.booking_id == int(identifier)).first()
+        b = q.filter(Booking.booking_id == int(identifier)).first()
     else:
-        b = db.query(Booking).filter(Booking.pnr == identifier).first()
+        b = q.filter(Booking.pnr == identifier).first()
 
     if not b:
         raise HTTPException(status_code=404, detail="Booking not found")
@@ -791,53 +3184,20 @@ def get_booking(identifier: str, passenger_id: Optional[int] = Query(None, descr
     if passenger_id is not None and b.passenger_id != passenger_id:
         raise HTTPException(status_code=403, detail="Not authorized for this booking")
 
-    flight_number = db.query(Flight.flight_number).filter(Flight.flight_id == b.flight_id).scalar()
-    seat_number = db.query(Seat.seat_number).filter(Seat.seat_id == b.seat_id).scalar()
-    passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == b.passenger_id).scalar()
-
-    return BookingResponse(
-        booking_id=b.booking_id,
-        pnr=b.pnr,
-        flight_number=flight_number or "",
-        passenger_name=passenger_name or "",
-        seat_number=seat_number or "",
-        amount_paid=float(b.amount_paid),
-        status=b.status,
-        booking_date=b.booking_date or datetime.utcnow()
-    )
-
-@app.get("/bookings/me", response_model=List[BookingResponse])
-def my_bookings(passenger_id: int = Query(..., description="ID of the passenger"), db: Session = Depends(get_db)):
-    """
-    Get all bookings for a given passenger.
-    """
-    rows = db.query(Booking).filter(Booking.passenger_id == passenger_id,
-                    Booking.status != "Cancelled").all()
-    out = []
-    for b in rows:
-        flight_number = db.query(Flight.flight_number).filter(Flight.flight_id == b.flight_id).scalar()
-        seat_number = db.query(Seat.seat_number).filter(Seat.seat_id == b.seat_id).scalar()
-        passenger_name = db.query(Passenger.full_name).filter(Passenger.passenger_id == b.passenger_id).scalar()
-        out.append(BookingResponse(
-            booking_id=b.booking_id,
-            pnr=b.pnr,
-            flight_number=flight_number or "",
-            passenger_name=passenger_name or "",
-            seat_number=seat_number or "",
-            amount_paid=float(b.amount_paid),
-            status=b.status,
-            booking_date=b.booking_date or datetime.utcnow()
-        ))
-    return out
+    return _booking_response(b)
 
 @app.delete("/bookings/{pnr}")
-def cancel_by_pnr(pnr: str, passenger_id: int = Query(..., description="ID of the passenger"), db: Session = Depends(get_db)):
+async def cancel_by_pnr(pnr: str, passenger_id: int = Query(..., description="ID of the passenger"), db=Depends(get_session)):
     """
     Cancel booking by PNR:
       - passenger_id is required
       - set booking.status = 'Cancelled' and free seat (is_booked=0)
       - keep booking row for history
     """
+    return await run_db(db, _cancel_by_pnr, pnr, passenger_id)
+
+
+def _cancel_by_pnr(db: Session, pnr: str, passenger_id: int) -> dict:
     try:
         with db.begin():
             booking = db.query(Booking).filter(Booking.pnr == pnr).with_for_update().first()
@@ -848,14 +3208,8 @@ def cancel_by_pnr(pnr: str, passenger_id: int = Query(..., description="ID of th
             if booking.status == "Cancelled":
                 return {"message": f"Booking {pnr} already cancelled"}
 
-            # free seat
-            seat = db.query(Seat).filter(Seat.seat_id == booking.seat_id).with_for_update().first()
-            if seat:
-                seat.is_booked = 0
-                db.add(seat)
-
-            booking.status = "Cancelled"
-            db.add(booking)
+            # free seat (unless the hold already expired and released it)
+            _release_booking(db, booking, "Cancelled")
             return {"message": f"Booking {pnr} cancelled successfully", "booking_id": booking.booking_id}
     except HTTPException:
         raise
@@ -865,11 +3219,164 @@ def cancel_by_pnr(pnr: str, passenger_id: int = Query(..., description="ID of th
 
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    """Prometheus text exposition of the request/query/pool metrics plus cache and reaper counters."""
+    lines: List[str] = []
+    for metric in (http_request_seconds, request_db_queries, request_db_seconds,
+                   db_query_seconds, db_queries_total, db_pool_wait_seconds):
+        lines += metric.render()
+    pools = [(label, e.pool) for label, e in _db_engines().items() if isinstance(e.pool, QueuePool)]
+    lines += _labeled_metric_lines("db_pool_checked_out", "gauge", "Connections currently checked out.", ("engine",),
+                                   [((label,), pool.checkedout()) for label, pool in pools])
+    lines += _labeled_metric_lines("db_pool_size", "gauge", "Configured pool size.", ("engine",),
+                                   [((label,), pool.size()) for label, pool in pools])
+    cache = search_cache.stats()
+    lines += _metric_lines("search_cache_hits_total", "counter", "Search cache hits.", cache["hits"])
+    lines += _metric_lines("search_cache_misses_total", "counter", "Search cache misses.", cache["misses"])
+    lines += _metric_lines("search_cache_entries", "gauge", "Search cache entries.", cache["entries"])
+    lines += _metric_lines("hold_reaper_sweeps_total", "counter", "Hold reaper sweeps.", hold_reaper.total_sweeps)
+    lines += _metric_lines("hold_reaper_reaped_total", "counter", "Expired holds released.", hold_reaper.total_reaped)
+    return Response("\n".join(lines) + "\n", media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @app.get("/", include_in_schema=False)
 def _health():
     return {"status": "ok", "time": datetime.utcnow().isoformat()}
 
 
+@app.get("/debug/inventory/consistency")
+def debug_inventory_consistency(repair: bool = False, db: Session = Depends(get_db)):
+    """
+    Compare the in-memory seat inventory against the Seats table.
+    With repair=true, mismatching flights are dropped from the cache (reloaded on next read).
+    """
+    cached = seat_inventory.snapshot()
+    actual = _query_seat_counts(db, list(cached))
+    mismatches = [
+        {"flight_id": fid, "cache": cached[fid], "db": actual[fid]}
+        for fid in cached
+        if cached[fid] != actual[fid]
+    ]
+    if repair and mismatches:
+        seat_inventory.invalidate([m["flight_id"] for m in mismatches])
+    return {
+        "checked": len(cached),
+        "consistent": not mismatches,
+        "mismatches": mismatches,
+        "repaired": repair and bool(mismatches),
+    }
+
+
+@app.post("/debug/inventory/invalidate")
+def debug_inventory_invalidate(flight_id: Optional[int] = None):
+    """Drop one flight (or, without flight_id, every flight) from the seat inventory cache."""
+    seat_inventory.invalidate([flight_id] if flight_id is not None else None)
+    if flight_id is not None:
+        search_cache.invalidate_flights([flight_id])
+    else:
+        search_cache.clear()
+    return {"invalidated": flight_id if flight_id is not None else "all"}
+
+
+@app.get("/debug/explain")
+def debug_explain(db: Session = Depends(get_db)):
+    """
+    Query plans for the hot access paths (seat pick/count, route search, my-bookings),
+    to check that they use the composite indexes rather than full scans.
+    """
+    day = datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0)
+    hot_queries = {
+        "seat_pick": select(Seat.seat_id).where(Seat.flight_id == 1, Seat.is_booked == 0).limit(1),
+        "route_search": select(Flight.flight_id).where(
+            Flight.source == "Chennai", Flight.destination == "Kolkata",
+            Flight.departure_time >= day, Flight.departure_time < day + timedelta(days=1),
+        ),
+        "my_bookings": select(Booking.booking_id).where(Booking.passenger_id == 1, Booking.status != "Cancelled"),
+        "hold_reaper": select(Booking.booking_id).where(Booking.hold_expires_at <= day)
+        .order_by(Booking.hold_expires_at).limit(REAPER_BATCH_SIZE),
+    }
+    dialect = db.get_bind().dialect
+    prefix = "EXPLAIN QUERY PLAN " if dialect.name == "sqlite" else "EXPLAIN "
+    plans = {}
+    for name, stmt in hot_queries.items():
+        sql = str(stmt.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+        plans[name] = [dict(r._mapping) for r in db.execute(text(prefix + sql))]
+    return {"dialect": dialect.name, "missing_indexes": verify_indexes(db.get_bind()), "plans": plans}
+
+
+@app.get("/debug/db")
+def debug_db():
+    """Effective database settings (passwords masked) and current pool usage per engine."""
+    return {
+        "settings": db_settings.public(),
+        "settings_file": SETTINGS_FILE,
+        "pools": {name: e.pool.status() for name, e in _db_engines().items()},
+    }
+
+
+@app.get("/debug/search_cache")
+def debug_search_cache():
+    """Hit/miss/eviction counters of the /flights result cache, for sizing it."""
+    return search_cache.stats()
+
+
+@app.get("/debug/route_graph")
+def debug_route_graph(refresh: bool = False, db: Session = Depends(get_db)):
+    """Route graph size and load times; refresh=true pulls in flights added since the last load first."""
+    added = route_graph.refresh(db) if refresh else 0
+    return {**route_graph.stats(), "added": added}
+
+
+@app.get("/debug/simulator")
+def debug_simulator():
+    """Simulator leader status (this worker), configuration and per-tick timing for the most recent ticks."""
+    ticks = list(simulator_ticks)
+    tick_ms = sorted(t["tick_ms"] for t in ticks)
+    return {
+        "scheduler": simulator_scheduler.status(),
+        "config": simulator_config.model_dump(),
+        "ticks": len(ticks),
+        "tick_ms_p50": tick_ms[len(tick_ms) // 2] if tick_ms else None,
+        "tick_ms_max": tick_ms[-1] if tick_ms else None,
+        "recent": ticks[-10:],
+    }
+
+
+@app.put("/debug/simulator/config")
+def debug_simulator_config(cfg: SimulatorConfig):
+    """Replace the simulator configuration; takes effect from the next tick."""
+    global simulator_config
+    simulator_config = cfg
+    return simulator_config.model_dump()
+
+
+@app.get("/debug/reaper")
+def debug_reaper(db: Session = Depends(get_db)):
+    """
+    Hold reaper status for this worker: sweeps, seats released, sweep latency,
+    plus how many holds are overdue right now and how long the oldest has been waiting.
+    """
+    now = datetime.utcnow()
+    overdue, oldest = db.query(func.count(Booking.booking_id), func.min(Booking.hold_expires_at)).filter(
+        Booking.hold_expires_at <= now
+    ).one()
+    return {
+        **hold_reaper.status(),
+        "overdue_holds": overdue,
+        "oldest_overdue_seconds": (now - oldest).total_seconds() if oldest else None,
+        "recent": list(hold_reaper.sweeps)[-10:],
+    }
+
+
+@app.post("/debug/reaper/sweep")
+def debug_reaper_sweep():
+    """Run one reaper sweep now instead of waiting for the next interval."""
+    sweep = reap_expired_holds()
+    hold_reaper.record(sweep)
+    return sweep
+
+
 @app.get("/debug/bookings/recent")
 def debug_recent_bookings(limit: int = 20, db: Session = Depends(get_db)):
     rows = db.query(Booking).order_by(Booking.booking_date.desc()).limit(limit).all()
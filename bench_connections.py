@@ -0,0 +1,117 @@
+"""
+1-stop connection search benchmark on a synthetic in-memory catalogue (no database needed).
+
+Builds a RouteGraph from N random flights between the cities in AIRPORT_CODES, times
+connection searches for random city pairs and dates, checks a sample of them against a
+brute-force scan, and times an incremental refresh with newly added flights.
+
+Usage:
+  python bench_connections.py --flights 12000 --queries 2000
+  python bench_connections.py --flights 50000 --days 60 --seed 7
+
+Options:
+  --flights N   : flights in the catalogue (default 12,000)
+  --days N      : days the departures are spread over (default 30)
+  --queries N   : searches to time (default 2,000)
+  --verify N    : searches checked against brute force (default 50)
+  --seed N      : random seed (default 42)
+"""
+import argparse
+import os
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+# the graph itself needs no database; keep the import from reaching for MySQL or starting the simulator
+os.environ.setdefault("FLIGHT_DB_URL", "sqlite://")
+os.environ.setdefault("FLIGHT_SIM_ENABLED", "0")
+
+from FlightBookingSimulatorBackend import (
+    AIRPORT_CODES, CONNECTION_MAX_LAYOVER_HOURS, MIN_LAYOVER, RouteGraph, RouteLeg,
+)
+
+EPOCH = datetime(2025, 11, 1)
+
+
+def synthetic_legs(rng: random.Random, n: int, days: int, first_id: int = 1):
+    cities = sorted(AIRPORT_CODES)
+    legs = []
+    for fid in range(first_id, first_id + n):
+        source, destination = rng.sample(cities, 2)
+        departure = EPOCH + timedelta(minutes=rng.randrange(days * 24 * 60 // 5) * 5)
+        duration = timedelta(minutes=rng.randrange(60, 200, 5))
+        legs.append(RouteLeg(fid, f"BX{fid % 10000:04d}", "Bench Air", source, destination,
+                             departure, departure + duration, rng.randrange(2500, 9000)))
+    return legs
+
+
+def brute_force(legs, origin, destination, start, end, max_layover):
+    found = set()
+    for a in legs:
+        if a.source != origin or not (start <= a.departure_time < end):
+            continue
+        if a.destination in (destination, origin):
+            continue
+        for b in legs:
+            if b.source == a.destination and b.destination == destination \
+                    and a.arrival_time + MIN_LAYOVER < b.departure_time <= a.arrival_time + max_layover:
+                found.add((a.flight_id, b.flight_id))
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--flights", type=int, default=12_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--verify", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    legs = synthetic_legs(rng, args.flights, args.days)
+    graph = RouteGraph()
+    t0 = time.perf_counter()
+    graph.add_legs(legs)
+    build_s = time.perf_counter() - t0
+    stats = graph.stats()
+    print(f"graph: {stats['flights']:,} flights, {stats['cities']} cities, {stats['routes']:,} routes "
+          f"built in {build_s * 1000:.1f} ms")
+
+    cities = sorted(AIRPORT_CODES)
+    max_layover = timedelta(hours=CONNECTION_MAX_LAYOVER_HOURS)
+    queries = []
+    for _ in range(args.queries):
+        origin, destination = rng.sample(cities, 2)
+        start = EPOCH + timedelta(days=rng.randrange(args.days))
+        queries.append((origin, destination, start, start + timedelta(days=1)))
+
+    latencies, results = [], 0
+    for origin, destination, start, end in queries:
+        t0 = time.perf_counter()
+        pairs = graph.find_connections([origin], [destination], start, end, max_layover=max_layover)
+        latencies.append(time.perf_counter() - t0)
+        results += len(pairs)
+    latencies.sort()
+    print(f"search: {len(queries):,} queries, p50 {statistics.median(latencies) * 1e6:.0f} us, "
+          f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:.0f} us, "
+          f"max {latencies[-1] * 1e6:.0f} us, {results / len(queries):.1f} connections/query")
+
+    mismatches = 0
+    for origin, destination, start, end in queries[:args.verify]:
+        got = {(a.flight_id, b.flight_id) for a, b in
+               graph.find_connections([origin], [destination], start, end, max_layover=max_layover)}
+        if got != brute_force(legs, origin, destination, start, end, max_layover):
+            mismatches += 1
+    print(f"verify: {min(args.verify, len(queries))} queries against brute force -> "
+          f"{'OK' if not mismatches else f'{mismatches} mismatches'}")
+
+    extra = synthetic_legs(rng, max(args.flights // 100, 1), args.days, first_id=args.flights + 1)
+    t0 = time.perf_counter()
+    added = graph.add_legs(extra)
+    print(f"incremental: {added} new flights merged in {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
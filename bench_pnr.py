@@ -0,0 +1,93 @@
+"""
+PNR allocation benchmark.
+
+Times the keyed-permutation allocator (generate_pnr(booking_id)) over millions of booking ids,
+checks that every PNR is distinct and decodes back to its booking id, and compares with the
+previous scheme: a random 8-char PNR plus a SELECT on Bookings.pnr per attempt.
+
+Usage:
+  python bench_pnr.py --count 2000000
+  python bench_pnr.py --count 5000000 --legacy-rows 200000
+
+Options:
+  --count N         : PNRs to allocate (default 2,000,000)
+  --start N         : first booking_id (default 1)
+  --legacy-rows N   : existing PNRs in the table for the legacy comparison (default 100,000; 0 skips it)
+  --legacy-samples N: legacy allocations to time (default 20,000)
+"""
+import argparse
+import os
+import random
+import string
+import time
+
+# the allocator needs no database; keep the import from reaching for MySQL or starting the simulator
+os.environ.setdefault("FLIGHT_DB_URL", "sqlite://")
+os.environ.setdefault("FLIGHT_SIM_ENABLED", "0")
+
+from sqlalchemy import create_engine, text
+
+from FlightBookingSimulatorBackend import generate_pnr, pnr_to_booking_id, PNR_ALPHABET, PNR_LENGTH
+
+
+def bench_allocator(count: int, start: int) -> None:
+    t0 = time.perf_counter()
+    pnrs = [generate_pnr(i) for i in range(start, start + count)]
+    elapsed = time.perf_counter() - t0
+    print(f"allocator: {count:,} PNRs in {elapsed:.2f}s ({count / elapsed:,.0f}/s, {elapsed / count * 1e6:.2f} us each)")
+
+    distinct = len(set(pnrs))
+    print(f"  distinct: {distinct:,} / {count:,} -> {'OK' if distinct == count else 'COLLISION'}")
+    bad_format = sum(1 for p in pnrs if len(p) != PNR_LENGTH or p.strip(PNR_ALPHABET))
+    print(f"  malformed: {bad_format}")
+
+    sample = random.sample(range(count), k=min(count, 100_000))
+    mismatched = sum(1 for i in sample if pnr_to_booking_id(pnrs[i]) != start + i)
+    print(f"  round trip on {len(sample):,} samples: {'OK' if not mismatched else f'{mismatched} mismatches'}")
+
+
+def bench_legacy(rows: int, samples: int) -> None:
+    chars = string.ascii_uppercase + string.digits
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE Bookings (booking_id INTEGER PRIMARY KEY, pnr VARCHAR(12) UNIQUE)"))
+        conn.execute(
+            text("INSERT INTO Bookings (pnr) VALUES (:pnr)"),
+            [{"pnr": "".join(random.choices(chars, k=PNR_LENGTH))} for _ in range(rows)],
+        )
+
+    with engine.connect() as conn:
+        lookups = 0
+        t0 = time.perf_counter()
+        for _ in range(samples):
+            # what pay_booking used to do inside the locked payment transaction
+            pnr = "".join(random.choice(chars) for _ in range(PNR_LENGTH))
+            attempts = 0
+            lookups += 1
+            while conn.execute(text("SELECT 1 FROM Bookings WHERE pnr = :p"), {"p": pnr}).first() and attempts < 5:
+                pnr = "".join(random.choice(chars) for _ in range(PNR_LENGTH))
+                attempts += 1
+                lookups += 1
+        elapsed = time.perf_counter() - t0
+    print(
+        f"legacy random + SELECT ({rows:,} rows, in-memory SQLite): {samples:,} PNRs in {elapsed:.2f}s "
+        f"({samples / elapsed:,.0f}/s, {elapsed / samples * 1e6:.2f} us each, {lookups / samples:.2f} lookups each)"
+    )
+    print("  (a networked MySQL round trip adds well over 100 us per lookup on top of this)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--count", type=int, default=2_000_000)
+    parser.add_argument("--start", type=int, default=1)
+    parser.add_argument("--legacy-rows", type=int, default=100_000)
+    parser.add_argument("--legacy-samples", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bench_allocator(args.count, args.start)
+    if args.legacy_rows:
+        bench_legacy(args.legacy_rows, args.legacy_samples)
+
+
+if __name__ == "__main__":
+    main()
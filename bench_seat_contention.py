@@ -0,0 +1,207 @@
+"""
+Flash-sale contention benchmark: many concurrent bookers on a single flight.
+
+Compares the conditional-UPDATE seat claim used by the backend ("claim") against the
+previous SELECT ... FOR UPDATE on the first free seat followed by a re-count ("for_update").
+Each strategy gets a fresh flight; all bookers start together behind a barrier.
+SQLite serialises every writer, so the two strategies only separate on MySQL/InnoDB where
+FOR UPDATE queues bookers on one row lock; on SQLite the run still checks for oversell.
+
+Usage:
+  python bench_seat_contention.py --bookers 200 --seats 150
+  python bench_seat_contention.py --db-url mysql+pymysql://user:pw@localhost/FlightBooking --strategy claim
+
+Options:
+  --db-url URL      : database to run against (default: a temporary SQLite file)
+  --bookers N       : concurrent booking threads (default 120)
+  --seats N         : seats on the benchmark flight (default 100)
+  --strategy S      : claim, for_update or both (default both)
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--db-url", default=None)
+parser.add_argument("--bookers", type=int, default=120)
+parser.add_argument("--seats", type=int, default=100)
+parser.add_argument("--strategy", choices=("claim", "for_update", "both"), default="both")
+args = parser.parse_args()
+
+# configure the backend before importing it
+os.environ["FLIGHT_DB_URL"] = args.db_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "contention.db")
+os.environ["FLIGHT_SIM_ENABLED"] = "0"
+
+from fastapi import HTTPException
+from sqlalchemy import event, func
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import (
+    SessionLocal, engine, Base, Airline, Flight, Seat, Passenger, Booking, BookingCreateReq,
+)
+
+if engine.dialect.name == "sqlite":
+    # SQLite has no row locks and fails lock upgrades with SQLITE_BUSY; take the write lock up front
+    # so the run measures the reservation code rather than pysqlite's deferred transactions
+    @event.listens_for(engine, "connect")
+    def _sqlite_connect(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+
+def setup_flight(n_seats: int):
+    db = SessionLocal()
+    try:
+        airline = db.query(Airline).first()
+        if airline is None:
+            airline = Airline(airline_name="Bench Air", iata_code="BA")
+            db.add(airline)
+            db.flush()
+        passenger = Passenger(full_name="Bench Booker", email="bench@example.com", phone="0000000000")
+        departure = datetime.utcnow() + timedelta(days=10)
+        flight = Flight(
+            airline_id=airline.airline_id, flight_number="BN" + str(int(time.time() * 1000) % 10000),
+            source="Delhi", destination="Mumbai", departure_time=departure,
+            arrival_time=departure + timedelta(hours=2), base_fare=5000,
+        )
+        db.add_all([passenger, flight])
+        db.flush()
+        db.add_all([
+            Seat(flight_id=flight.flight_id, seat_number=f"{i // 6 + 1}{'ABCDEF'[i % 6]}",
+                 seat_class="Economy", is_booked=0)
+            for i in range(n_seats)
+        ])
+        db.commit()
+        backend.seat_inventory.rebuild(db)
+        return flight.flight_id, passenger.passenger_id
+    finally:
+        db.close()
+
+
+def book_claim(flight_id: int, passenger_id: int):
+    db = SessionLocal()
+    try:
+        backend._create_booking(db, BookingCreateReq(flight_id=flight_id, passenger_id=passenger_id))
+        db.commit()
+    finally:
+        db.close()
+
+
+def book_for_update(flight_id: int, passenger_id: int):
+    # the reservation path before the conditional UPDATE: count, lock first free seat, flush, re-count
+    db = SessionLocal()
+    try:
+        with db.begin():
+            flight = db.query(Flight).filter(Flight.flight_id == flight_id).first()
+            counts = backend._count_seats(db, flight_id)
+            if counts["available"] <= 0:
+                raise HTTPException(status_code=400, detail="No seats available")
+            seat = (
+                db.query(Seat)
+                .filter(Seat.flight_id == flight_id, Seat.is_booked == 0)
+                .order_by(Seat.seat_id)
+                .with_for_update()
+                .first()
+            )
+            if seat is None:
+                raise HTTPException(status_code=400, detail="No available seats (race)")
+            seat.is_booked = 1
+            db.flush()
+            backend._stage_seat_delta(db, flight_id, +1)
+            counts_after = backend._query_seat_counts(db, [flight_id]).get(flight_id, counts)
+            amount = backend._compute_dynamic_price(
+                flight.base_fare,
+                seats_available=counts_after["available"],
+                total_seats=counts_after["total"],
+                departure_dt=flight.departure_time,
+            )
+            db.add(Booking(
+                passenger_id=passenger_id, flight_id=flight_id, seat_id=seat.seat_id,
+                booking_date=datetime.utcnow(), amount_paid=amount, status="Pending",
+            ))
+    finally:
+        db.close()
+
+
+def run(strategy: str, n_bookers: int, n_seats: int) -> dict:
+    flight_id, passenger_id = setup_flight(n_seats)
+    book = book_claim if strategy == "claim" else book_for_update
+    barrier = threading.Barrier(n_bookers)
+    lock = threading.Lock()
+    latencies, outcomes = [], {"success": 0, "sold_out": 0, "error": 0}
+    errors = []
+
+    def worker():
+        barrier.wait()
+        start = time.perf_counter()
+        try:
+            book(flight_id, passenger_id)
+            outcome = "success"
+        except HTTPException as exc:
+            outcome = "sold_out" if exc.status_code == 400 else "error"
+            if outcome == "error":
+                errors.append(str(exc.detail)[:60])
+        except Exception as exc:
+            outcome = "error"
+            errors.append(type(exc).__name__)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+            outcomes[outcome] += 1
+
+    threads = [threading.Thread(target=worker) for _ in range(n_bookers)]
+    wall = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - wall
+
+    db = SessionLocal()
+    try:
+        booked_seats = db.query(func.count(Seat.seat_id)).filter(Seat.flight_id == flight_id, Seat.is_booked == 1).scalar()
+        bookings = db.query(func.count(Booking.booking_id)).filter(Booking.flight_id == flight_id).scalar()
+        distinct_seats = db.query(func.count(func.distinct(Booking.seat_id))).filter(Booking.flight_id == flight_id).scalar()
+    finally:
+        db.close()
+
+    latencies.sort()
+    return {
+        "strategy": strategy,
+        "wall_s": wall,
+        "throughput": outcomes["success"] / wall if wall else 0.0,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000,
+        **outcomes,
+        "error_kinds": sorted(set(errors)),
+        "booked_seats": booked_seats,
+        "bookings": bookings,
+        # no oversell: every success holds its own seat and nothing else got marked booked
+        "consistent": bookings == distinct_seats == booked_seats == outcomes["success"] <= n_seats,
+    }
+
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    backend.run_migrations(engine)
+    strategies = ("claim", "for_update") if args.strategy == "both" else (args.strategy,)
+    print(f"{args.bookers} bookers, {args.seats} seats, {engine.url.render_as_string(hide_password=True)}")
+    for strategy in strategies:
+        r = run(strategy, args.bookers, args.seats)
+        print(
+            f"{r['strategy']:>10}: {r['wall_s']:.2f}s, {r['throughput']:.1f} bookings/s, "
+            f"p50 {r['p50_ms']:.1f}ms, p99 {r['p99_ms']:.1f}ms, "
+            f"ok {r['success']}, sold out {r['sold_out']}, errors {r['error']} {r['error_kinds'] or ''}, "
+            f"booked seats {r['booked_seats']}, consistent {r['consistent']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
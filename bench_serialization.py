@@ -0,0 +1,112 @@
+"""
+Response serialization benchmark for large /flights results.
+
+Seeds N flights on one route and day into a temporary SQLite database, then requests that search
+in-process (httpx ASGITransport) with the standard response_model path and with FLIGHT_FAST_JSON's
+orjson path, uncompressed and compressed. Reports wall time and process CPU per request (the
+in-process client's share is small: it reads raw bytes without decoding them) and the bytes on
+the wire, relative to the standard path.
+
+By default the search result cache is warm, so the numbers isolate validation and encoding;
+--cold clears it before every request to include the SQL query and row building.
+
+Usage:
+  python bench_serialization.py --flights 1000 --iterations 300
+  python bench_serialization.py --flights 3000 --cold
+
+Options:
+  --flights N     : flights in the search result (default 1,000)
+  --iterations N  : timed requests per variant (default 200)
+  --cold          : clear the search cache before each request
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--flights", type=int, default=1_000)
+parser.add_argument("--iterations", type=int, default=200)
+parser.add_argument("--cold", action="store_true")
+args = parser.parse_args()
+
+# configure the backend before importing it
+os.environ["FLIGHT_DB_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "serialization.db")
+os.environ["FLIGHT_SIM_ENABLED"] = "0"
+os.environ["FLIGHT_REAPER_ENABLED"] = "0"
+
+import httpx
+from sqlalchemy import insert
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import engine, Base, Airline, Flight, Seat, app
+
+DAY = datetime(2030, 1, 15)
+SEARCH = {"from": "Delhi", "to": "Mumbai", "date": DAY.date().isoformat()}
+
+
+def seed(n: int) -> None:
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(Airline), [{"airline_id": 1, "airline_name": "Bench Air", "iata_code": "BZ"}])
+        flights, seats = [], []
+        for fid in range(1, n + 1):
+            departure = DAY + timedelta(minutes=(fid * 7) % (24 * 60))
+            flights.append({"flight_id": fid, "airline_id": 1, "flight_number": f"BZ{fid:04d}"[:6],
+                            "source": "Delhi", "destination": "Mumbai", "departure_time": departure,
+                            "arrival_time": departure + timedelta(minutes=125), "base_fare": 4000 + fid % 900})
+            seats.extend({"flight_id": fid, "seat_number": f"1{c}", "seat_class": "Economy", "is_booked": int(c < "C")}
+                         for c in "ABCDEF")
+        conn.execute(insert(Flight), flights)
+        conn.execute(insert(Seat), seats)
+
+
+async def measure(client: httpx.AsyncClient, fast: bool, accept_encoding: str) -> dict:
+    backend.FAST_JSON = fast
+    headers = {"Accept-Encoding": accept_encoding}
+    for _ in range(5):
+        await client.get("/flights", params=SEARCH, headers=headers)
+    latencies, wire = [], 0
+    cpu = time.process_time()
+    for _ in range(args.iterations):
+        if args.cold:
+            backend.search_cache.clear()
+        started = time.perf_counter()
+        # raw bytes: keep the client's decompression and JSON parsing out of the server's CPU figure
+        async with client.stream("GET", "/flights", params=SEARCH, headers=headers) as response:
+            wire = len(b"".join([chunk async for chunk in response.aiter_raw()]))
+        latencies.append(time.perf_counter() - started)
+    cpu = time.process_time() - cpu
+    response = await client.get("/flights", params=SEARCH, headers=headers)
+    return {
+        "rows": len(response.json()),
+        "p50_ms": statistics.median(latencies) * 1000,
+        "cpu_ms": cpu / args.iterations * 1000,
+        "bytes": wire,
+    }
+
+
+async def main():
+    seed(args.flights)
+    variants = [("standard", False, "identity"), ("fast", True, "identity"), ("fast+gzip", True, "gzip")]
+    if backend.brotli is not None:
+        variants.append(("fast+br", True, "br"))
+    print(f"/flights with {args.flights:,} results, {args.iterations} requests per variant, "
+          f"{'cold' if args.cold else 'warm'} search cache, encoder {'orjson' if backend.orjson else 'json'}"
+          f"{'' if backend.brotli else ' (brotli not installed)'}")
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench") as client:
+            results = [(name, await measure(client, fast, enc)) for name, fast, enc in variants]
+
+    base = results[0][1]
+    print(f"{'variant':<12}{'rows':>7}{'p50 ms':>9}{'cpu ms/req':>12}{'cpu saved':>11}{'bytes':>10}{'bytes saved':>13}")
+    for name, r in results:
+        print(f"{name:<12}{r['rows']:>7}{r['p50_ms']:>9.2f}{r['cpu_ms']:>12.2f}"
+              f"{1 - r['cpu_ms'] / base['cpu_ms']:>11.0%}{r['bytes']:>10,}{1 - r['bytes'] / base['bytes']:>13.0%}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
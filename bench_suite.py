@@ -0,0 +1,337 @@
+"""
+Benchmark suite for the search, pricing, booking and payment paths.
+
+Runs the FastAPI app in-process (httpx ASGITransport, lifespan included, market simulator and hold
+reaper off) against a seeded dataset and reports throughput and p50/p99 latency per scenario:
+
+  list_flights     GET  /flights?from=&to=&date=
+  flight_detail    GET  /flights/{id}
+  dynamic_price    GET  /dynamic_price/{id}
+  create_booking   POST /bookings            (concurrent bookers on a few hot flights)
+  create_roundtrip POST /bookings/roundtrip
+  pay_booking      POST /bookings/pay/{id}   (pays the bookings made above; 402 = simulated decline)
+  my_bookings      GET  /bookings/me?passenger_id=
+
+Results go to a JSON file so runs can be compared across commits; with --baseline the run fails
+(exit code 1) when a scenario's p50/p99 grows, or its throughput drops, by more than --threshold.
+
+Usage:
+  python bench_suite.py --output bench-$(git rev-parse --short HEAD).json
+  python bench_suite.py --baseline bench-main.json --threshold 0.15
+  python bench_suite.py --db-url mysql+pymysql://user:pw@localhost/FlightBench --seed-dataset
+
+Options:
+  --db-url URL      : database to benchmark (default: a fresh SQLite file, always seeded)
+  --seed-dataset    : (re)create the dataset at --db-url with generate_synthetic_network.py (drops tables!)
+  --flights N       : flights in the seeded dataset (default 5,000)
+  --passengers N    : passengers in the seeded dataset (default 2,000)
+  --requests N      : measured requests per scenario (default 400)
+  --warmup N        : unmeasured requests per scenario first (default 20)
+  --concurrency N   : requests in flight at once (default 16)
+  --repeat N        : runs per scenario; latency and throughput are the median over runs (default 3)
+  --scenarios a,b   : subset of scenarios to run (default: all)
+  --seed N          : seed for the dataset and request parameters (default 42)
+  --output FILE     : where to write the JSON results (default bench_results.json)
+  --baseline FILE   : earlier results to compare against
+  --threshold F     : allowed relative regression (default 0.20)
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SCENARIOS = ("list_flights", "flight_detail", "dynamic_price", "create_booking",
+             "create_roundtrip", "pay_booking", "my_bookings")
+WRITE_SCENARIOS = {"create_booking", "create_roundtrip", "pay_booking"}
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument("--db-url", default=None)
+parser.add_argument("--seed-dataset", action="store_true")
+parser.add_argument("--flights", type=int, default=5_000)
+parser.add_argument("--passengers", type=int, default=2_000)
+parser.add_argument("--requests", type=int, default=400)
+parser.add_argument("--warmup", type=int, default=20)
+parser.add_argument("--concurrency", type=int, default=16)
+parser.add_argument("--repeat", type=int, default=3)
+parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+parser.add_argument("--seed", type=int, default=42)
+parser.add_argument("--output", default="bench_results.json")
+parser.add_argument("--baseline", default=None)
+parser.add_argument("--threshold", type=float, default=0.20)
+args = parser.parse_args()
+
+if args.db_url is None:
+    args.db_url = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "bench.db")
+    args.seed_dataset = True
+
+if args.seed_dataset:
+    print(f"Seeding {args.flights:,} flights / {args.passengers:,} passengers (seed {args.seed}) ...")
+    subprocess.run([
+        sys.executable, os.path.join(HERE, "generate_synthetic_network.py"), "--db-url", args.db_url, "--reset",
+        "--flights", str(args.flights), "--passengers", str(args.passengers), "--seed", str(args.seed),
+        "--days", "30", "--routes", "300",
+    ], check=True, stdout=subprocess.DEVNULL)
+
+# configure the backend before importing it
+os.environ["FLIGHT_DB_URL"] = args.db_url
+os.environ["FLIGHT_SIM_ENABLED"] = "0"
+os.environ["FLIGHT_REAPER_ENABLED"] = "0"
+
+import httpx
+from sqlalchemy import event, func, select
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import SessionLocal, Flight, Seat, Passenger, app
+
+sqlite_write_lock = False
+
+if backend.engine.dialect.name == "sqlite":
+    # SQLite fails read-to-write lock upgrades with SQLITE_BUSY instead of waiting; during the write
+    # scenarios take the write lock up front (as bench_seat_contention.py does) so concurrent bookers
+    # queue rather than error out, and leave the read scenarios on plain deferred transactions
+    def _sqlite_connect(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA busy_timeout=30000")
+        cur.close()
+
+    def _sqlite_begin(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE" if sqlite_write_lock else "BEGIN")
+
+    for _engine in filter(None, (backend.engine, backend.async_engine and backend.async_engine.sync_engine)):
+        event.listen(_engine, "connect", _sqlite_connect)
+        event.listen(_engine, "begin", _sqlite_begin)
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Workload:
+    """Request parameters drawn once from the dataset with a fixed seed, so every run sends the same mix."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+        with SessionLocal() as db:
+            flights = db.execute(select(Flight.flight_id, Flight.source, Flight.destination,
+                                        Flight.departure_time, Flight.arrival_time)
+                                 .order_by(Flight.flight_id)).all()
+            free_seats = db.execute(
+                select(Seat.flight_id, func.count(Seat.seat_id).label("free"))
+                .where(Seat.is_booked == 0).group_by(Seat.flight_id)
+                .order_by(func.count(Seat.seat_id).desc(), Seat.flight_id)).all()
+            self.passenger_ids = [pid for (pid,) in db.execute(
+                select(Passenger.passenger_id).order_by(Passenger.passenger_id).limit(5_000))]
+        if not flights or not self.passenger_ids:
+            raise SystemExit("Dataset has no flights or passengers; use --seed-dataset")
+        self.flights = flights
+        self.flight_ids = [f.flight_id for f in flights]
+        # few enough hot flights that concurrent bookers contend, with enough free seats between them
+        # that the measured requests are mostly real bookings rather than sold-out rejections
+        wanted = (args.warmup + args.requests * max(args.repeat, 1)) * 1.2
+        self.hot_flights, free_total = [], 0
+        for fid, free in free_seats:
+            if free_total >= wanted:
+                break
+            self.hot_flights.append(fid)
+            free_total += free
+        # (outbound, return) pairs that pass the 1-hour connection rule
+        by_route = {}
+        for f in flights:
+            by_route.setdefault((f.source, f.destination), []).append(f)
+        self.roundtrips = []
+        for f in rng.sample(flights, k=min(len(flights), 2_000)):
+            back = [r for r in by_route.get((f.destination, f.source), ())
+                    if r.departure_time > f.arrival_time + timedelta(hours=1)]
+            if back:
+                self.roundtrips.append((f.flight_id, rng.choice(back).flight_id))
+        self.pending: list = []  # (booking_id, passenger_id) from create_booking, consumed by pay_booking
+
+    def request(self, scenario: str):
+        rng = self.rng
+        if scenario == "list_flights":
+            f = rng.choice(self.flights)
+            return "GET", "/flights", {"params": {"from": f.source, "to": f.destination,
+                                                  "date": f.departure_time.date().isoformat()}}
+        if scenario == "flight_detail":
+            return "GET", f"/flights/{rng.choice(self.flight_ids)}", {}
+        if scenario == "dynamic_price":
+            return "GET", f"/dynamic_price/{rng.choice(self.flight_ids)}", {}
+        if scenario == "create_booking":
+            return "POST", "/bookings", {"json": {"flight_id": rng.choice(self.hot_flights),
+                                                  "passenger_id": rng.choice(self.passenger_ids)}}
+        if scenario == "create_roundtrip":
+            outbound, back = rng.choice(self.roundtrips)
+            return "POST", "/bookings/roundtrip", {"json": {"outbound_flight_id": outbound, "return_flight_id": back,
+                                                            "passenger_id": rng.choice(self.passenger_ids)}}
+        if scenario == "pay_booking":
+            if not self.pending:
+                return None
+            booking_id, passenger_id = self.pending.pop()
+            return "POST", f"/bookings/pay/{booking_id}", {"json": {"passenger_id": passenger_id}}
+        if scenario == "my_bookings":
+            return "GET", "/bookings/me", {"params": {"passenger_id": rng.choice(self.passenger_ids)}}
+        raise ValueError(scenario)
+
+
+async def run_scenario(client: httpx.AsyncClient, workload: Workload, scenario: str, n: int, concurrency: int,
+                       measure: bool = True):
+    if scenario == "create_roundtrip" and not workload.roundtrips:
+        return None
+    requests = [workload.request(scenario) for _ in range(n)]
+    requests = [r for r in requests if r is not None]
+    if not requests:
+        return None
+    latencies, statuses, errors = [], {}, 0
+    queue = asyncio.Queue()
+    for r in requests:
+        queue.put_nowait(r)
+
+    async def worker():
+        nonlocal errors
+        while not queue.empty():
+            method, url, kwargs = queue.get_nowait()
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+            except Exception:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code >= 500:
+                errors += 1
+            elif scenario == "create_booking" and response.status_code == 201:
+                workload.pending.append((response.json()["booking_id"], kwargs["json"]["passenger_id"]))
+
+    wall = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    wall = time.perf_counter() - wall
+    if not measure:
+        return None
+    latencies.sort()
+    return {
+        "requests": len(requests),
+        "errors": errors,
+        "status_counts": {str(k): v for k, v in sorted(statuses.items())},
+        "throughput_rps": round(len(requests) / wall, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(latencies, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+    }
+
+
+def median_result(runs: list):
+    """Median of each timing over repeated runs; request, error and status totals are summed."""
+    runs = [r for r in runs if r]
+    if not runs:
+        return None
+    merged = {"runs": len(runs), "requests": sum(r["requests"] for r in runs),
+              "errors": sum(r["errors"] for r in runs), "status_counts": {}}
+    for r in runs:
+        for status, n in r["status_counts"].items():
+            merged["status_counts"][status] = merged["status_counts"].get(status, 0) + n
+    for key in ("throughput_rps", "p50_ms", "p90_ms", "p99_ms", "max_ms"):
+        merged[key] = round(statistics.median(r[key] for r in runs), 3)
+    return merged
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    regressions = []
+    for scenario, cur in results.items():
+        base = baseline.get("results", {}).get(scenario)
+        if not base or not cur:
+            continue
+        for key in ("p50_ms", "p99_ms"):
+            if base[key] and cur[key] > base[key] * (1 + threshold):
+                regressions.append(f"{scenario}: {key} {base[key]:.2f} -> {cur[key]:.2f}")
+        if base["throughput_rps"] and cur["throughput_rps"] < base["throughput_rps"] * (1 - threshold):
+            regressions.append(f"{scenario}: throughput {base['throughput_rps']:.1f} -> {cur['throughput_rps']:.1f} rps")
+    return regressions
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+async def main():
+    global sqlite_write_lock
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        raise SystemExit(f"Unknown scenarios: {sorted(unknown)}")
+    # payments need bookings to pay
+    if "pay_booking" in scenarios and "create_booking" not in scenarios:
+        scenarios.insert(scenarios.index("pay_booking"), "create_booking")
+
+    results = {}
+    async with app.router.lifespan_context(app):
+        workload = Workload(random.Random(args.seed))
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for scenario in scenarios:
+                sqlite_write_lock = scenario in WRITE_SCENARIOS
+                if args.warmup and scenario != "pay_booking":
+                    await run_scenario(client, workload, scenario, args.warmup, args.concurrency, measure=False)
+                results[scenario] = median_result([
+                    await run_scenario(client, workload, scenario, args.requests, args.concurrency)
+                    for _ in range(max(args.repeat, 1))
+                ])
+                r = results[scenario]
+                if r is None:
+                    print(f"{scenario:>17}: skipped (no usable requests in this dataset)")
+                    continue
+                print(f"{scenario:>17}: {r['throughput_rps']:8.1f} rps  p50 {r['p50_ms']:7.2f} ms  "
+                      f"p99 {r['p99_ms']:7.2f} ms  errors {r['errors']}  {r['status_counts']}")
+
+    with SessionLocal() as db:
+        flights = db.execute(select(func.count(Flight.flight_id))).scalar()
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.utcnow().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "dialect": backend.engine.dialect.name,
+            "db_mode": backend.DB_MODE,
+            "flights": flights,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "repeat": args.repeat,
+            "seed": args.seed,
+        },
+        "results": results,
+    }
+    with open(args.output, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as fh:
+            baseline = json.load(fh)
+        regressions = compare(results, baseline, args.threshold)
+        print(f"Compared with {args.baseline} (commit {baseline.get('meta', {}).get('commit', '?')}, "
+              f"threshold {args.threshold:.0%}): {'no regressions' if not regressions else 'REGRESSIONS'}")
+        for line in regressions:
+            print(f"  {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -11,13 +11,25 @@ Usage (PowerShell):
   python .\scripts\create_return_flights_with_seats.py --offset-days 1
   python .\scripts\create_return_flights_with_seats.py --flight-ids 1,2 --offset-days 2
 
+Bulk mode (large schedules): preloads existing routes and flight numbers, then inserts flights and
+seats with executemany in chunked transactions. Re-running skips routes that already have a return
+leg, so an interrupted run can simply be started again (or continued with --start-after).
+  python .\scripts\create_return_flights_with_seats.py --bulk --chunk-size 2000
+  python .\scripts\create_return_flights_with_seats.py --bulk --dry-run
+
 Options:
   --offset-days N       : number of days after original arrival to schedule return (default 1)
   --flight-ids id,id..  : optional comma-separated list of flight_ids to mirror (default: all)
+  --bulk                : bulk mode
+  --chunk-size N        : bulk mode: source flights per transaction (default 1000)
+  --dry-run             : bulk mode: report what would be created without writing
+  --start-after ID      : bulk mode: only mirror flights with flight_id > ID (resume point printed per chunk)
 """
 import argparse
-import random
+import string
+import time
 from datetime import timedelta
+from sqlalchemy import insert, select
 from FlightBookingSimulatorBackend import SessionLocal, Flight, Seat
 
 SEAT_PATTERN = []
@@ -31,13 +43,50 @@ for r in (3, 4, 5):
         SEAT_PATTERN.append((f"{r}{c}", "Economy"))
 
 
+FLIGHT_NUMBER_MAX_LEN = 6  # Flights.flight_number VARCHAR(6)
+SUFFIX_CHARS = string.digits + string.ascii_uppercase
+
+
+def return_flight_number_candidates(base):
+    """<base>R when it fits, then <airline code>R + 3 base-36 chars; every candidate fits VARCHAR(6)."""
+    yield (base + "R") if len(base) < FLIGHT_NUMBER_MAX_LEN else base[:FLIGHT_NUMBER_MAX_LEN - 1] + "R"
+    prefix = base[:2] + "R"
+    width = FLIGHT_NUMBER_MAX_LEN - len(prefix)
+    for n in range(len(SUFFIX_CHARS) ** width):
+        suffix = ""
+        for _ in range(width):
+            n, d = divmod(n, len(SUFFIX_CHARS))
+            suffix = SUFFIX_CHARS[d] + suffix
+        yield prefix + suffix
+
+
 def unique_flight_number(db, base):
-    cand = base + "R"
-    tries = 0
-    while db.query(Flight).filter(Flight.flight_number == cand).first() and tries < 50:
-        cand = f"{base}R{random.randint(10,99)}"
-        tries += 1
-    return cand
+    for cand in return_flight_number_candidates(base):
+        if not db.query(Flight).filter(Flight.flight_number == cand).first():
+            return cand
+    raise ValueError(f"no free return flight number for {base}")
+
+
+class FlightNumberAllocator:
+    """Return flight numbers checked against an in-memory set instead of one query per candidate."""
+
+    def __init__(self, taken):
+        self.taken = set(taken)
+        self._next = {}  # airline code -> candidate generator, resumed where the last allocation stopped
+
+    def allocate(self, base):
+        first = next(return_flight_number_candidates(base))
+        if first not in self.taken:
+            self.taken.add(first)
+            return first
+        candidates = self._next.get(base[:2])
+        if candidates is None:
+            candidates = self._next[base[:2]] = return_flight_number_candidates(base[:2])
+        for cand in candidates:
+            if cand not in self.taken:
+                self.taken.add(cand)
+                return cand
+        raise ValueError(f"no free return flight number for {base}")
 
 
 def run(offset_days: int = 1, flight_ids: list[int] | None = None):
@@ -110,14 +159,91 @@ def run(offset_days: int = 1, flight_ids: list[int] | None = None):
     print(f"Done. Created {len(created)} return flights.")
     for fid, fno, seats in created:
         print(f" - {fid} / {fno} (+{seats} seats)")
-# ...existing code...
+
+
+def run_bulk(offset_days: int = 1, flight_ids: list[int] | None = None, chunk_size: int = 1000,
+             dry_run: bool = False, start_after: int = 0):
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        # one pass each over Flights for the skip rule and flight-number uniqueness
+        routes = set(db.execute(select(Flight.airline_id, Flight.source, Flight.destination)).all())
+        numbers = FlightNumberAllocator(n for (n,) in db.execute(select(Flight.flight_number)))
+        q = (
+            select(Flight.flight_id, Flight.airline_id, Flight.flight_number, Flight.source,
+                   Flight.destination, Flight.departure_time, Flight.arrival_time, Flight.base_fare)
+            .where(Flight.flight_id > start_after)
+            .order_by(Flight.flight_id)
+        )
+        if flight_ids:
+            q = q.where(Flight.flight_id.in_(flight_ids))
+        sources = db.execute(q).all()
+    if not sources:
+        print("No flights found to mirror.")
+        return
+    print(f"Loaded {len(sources)} source flights, {len(routes)} routes in {time.perf_counter() - started:.2f}s")
+
+    flights_created = seats_created = skipped = 0
+    write_started = time.perf_counter()
+    for i in range(0, len(sources), chunk_size):
+        chunk = sources[i:i + chunk_size]
+        new_flights = []
+        for f in chunk:
+            # same skip rule as run(): a return leg exists for the airline on the swapped route
+            if (f.airline_id, f.destination, f.source) in routes:
+                skipped += 1
+                continue
+            routes.add((f.airline_id, f.destination, f.source))
+            new_departure = f.arrival_time + timedelta(days=offset_days)
+            new_flights.append({
+                "airline_id": f.airline_id,
+                "flight_number": numbers.allocate(f.flight_number),
+                "source": f.destination,
+                "destination": f.source,
+                "departure_time": new_departure,
+                "arrival_time": new_departure + (f.arrival_time - f.departure_time),
+                "base_fare": f.base_fare,
+            })
+
+        if new_flights and not dry_run:
+            with SessionLocal() as db, db.begin():
+                db.execute(insert(Flight), new_flights)
+                ids = db.execute(
+                    select(Flight.flight_id)
+                    .where(Flight.flight_number.in_([nf["flight_number"] for nf in new_flights]))
+                ).scalars().all()
+                db.execute(insert(Seat), [
+                    {"flight_id": fid, "seat_number": seat_number, "seat_class": seat_class, "is_booked": 0}
+                    for fid in ids
+                    for seat_number, seat_class in SEAT_PATTERN
+                ])
+        flights_created += len(new_flights)
+        seats_created += len(new_flights) * len(SEAT_PATTERN)
+
+        elapsed = time.perf_counter() - write_started
+        rows = flights_created + seats_created
+        print(f"{'[dry-run] ' if dry_run else ''}chunk {i // chunk_size + 1}: +{len(new_flights)} flights, "
+              f"{rows / elapsed if elapsed else 0:,.0f} rows/s, resume with --start-after {chunk[-1].flight_id}")
+
+    elapsed = time.perf_counter() - started
+    verb = "Would create" if dry_run else "Created"
+    print(f"Done. {verb} {flights_created} return flights and {seats_created} seats, skipped {skipped} "
+          f"in {elapsed:.2f}s ({(flights_created + seats_created) / elapsed:,.0f} rows/s).")
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--offset-days", type=int, default=1, help="days after original arrival for return departure")
     parser.add_argument("--flight-ids", type=str, default=None, help="comma-separated flight ids to mirror (optional)")
+    parser.add_argument("--bulk", action="store_true", help="preloaded, chunked executemany inserts")
+    parser.add_argument("--chunk-size", type=int, default=1000, help="bulk: source flights per transaction")
+    parser.add_argument("--dry-run", action="store_true", help="bulk: report without writing")
+    parser.add_argument("--start-after", type=int, default=0, help="bulk: only flights with flight_id > this")
     args = parser.parse_args()
     ids = None
     if args.flight_ids:
         ids = [int(x.strip()) for x in args.flight_ids.split(",") if x.strip().isdigit()]
-    run(offset_days=args.offset_days, flight_ids=ids)
\ No newline at end of file
+    if args.bulk:
+        run_bulk(offset_days=args.offset_days, flight_ids=ids, chunk_size=args.chunk_size,
+                 dry_run=args.dry_run, start_after=args.start_after)
+    else:
+        run(offset_days=args.offset_days, flight_ids=ids)
\ No newline at end of file
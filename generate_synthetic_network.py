@@ -0,0 +1,284 @@
+"""
+Generate a synthetic airline network for scale testing: airlines, routes between the cities in
+AIRPORT_CODES, flights with SEAT_PATTERN seat maps, passengers and historical bookings.
+
+Everything is derived from --seed, with timestamps as offsets from --start-date, so the same arguments
+always produce the same data. Without --start-date the schedule starts tomorrow, so its flights lie
+ahead like a live schedule; pass a date to get the same timestamps on a later day. Rows get explicit
+ids after the current maximum and are written with executemany in chunked transactions, streaming
+flight by flight, so memory stays flat.
+
+Usage:
+  python generate_synthetic_network.py --flights 100000
+  python generate_synthetic_network.py --db-url sqlite:///synthetic.db --flights 20000 --reset
+  python generate_synthetic_network.py --db-url mysql+pymysql://user:pw@localhost/FlightBooking --flights 200000
+
+Then point the backend at the same database:
+  FLIGHT_DB_URL=sqlite:///synthetic.db uvicorn FlightBookingSimulatorBackend:app
+
+Options:
+  --db-url URL        : target database (default sqlite:///synthetic.db)
+  --reset             : drop and recreate all tables first (otherwise rows are appended)
+  --airlines N        : airlines in the network, existing ones included (default 12)
+  --routes N          : distinct city pairs served (default 600)
+  --flights N         : flights to create (default 100,000)
+  --days N            : days the schedule spans from --start-date (default 120)
+  --start-date DATE   : first day of the schedule (default: tomorrow)
+  --passengers N      : passengers to create (default 50,000)
+  --load-factor F     : mean share of seats sold per flight (default 0.45)
+  --cancel-rate F     : share of bookings cancelled, their seats released (default 0.08)
+  --chunk-size N      : flights per transaction (default 2,000)
+  --seed N            : random seed (default 42)
+"""
+import argparse
+import os
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import event, func, insert, select
+
+# the default schedule starts this many days from today, so its flights are still ahead of the
+# pricing clock (a past schedule would price every flight in the day-of-departure bucket)
+DEFAULT_START_OFFSET_DAYS = 1
+
+FIRST_NAMES = ["Aarav", "Vivaan", "Aditya", "Diya", "Ananya", "Ishaan", "Kavya", "Rohan", "Saanvi", "Arjun",
+               "Meera", "Kabir", "Nisha", "Vikram", "Priya", "Rahul", "Sneha", "Karan", "Pooja", "Dev"]
+LAST_NAMES = ["Sharma", "Iyer", "Reddy", "Patel", "Nair", "Gupta", "Singh", "Das", "Menon", "Rao",
+              "Kapoor", "Joshi", "Bose", "Mehta", "Pillai", "Chopra", "Verma", "Kulkarni", "Sen", "Ghosh"]
+CODE_CHARS = string.digits + string.ascii_uppercase
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-url", default="sqlite:///synthetic.db")
+    parser.add_argument("--reset", action="store_true")
+    parser.add_argument("--airlines", type=int, default=12)
+    parser.add_argument("--routes", type=int, default=600)
+    parser.add_argument("--flights", type=int, default=100_000)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--start-date", default=None)
+    parser.add_argument("--passengers", type=int, default=50_000)
+    parser.add_argument("--load-factor", type=float, default=0.45)
+    parser.add_argument("--cancel-rate", type=float, default=0.08)
+    parser.add_argument("--chunk-size", type=int, default=2_000)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args(argv)
+
+
+def schedule_start(start_date):
+    if start_date:
+        return datetime.fromisoformat(start_date)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    return today + timedelta(days=DEFAULT_START_OFFSET_DAYS)
+
+
+def use_bulk_pragmas(engine) -> None:
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _sqlite_bulk_pragmas(dbapi_conn, _):
+        # bulk load into a scratch file: skip fsync per transaction
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=OFF")
+        cur.close()
+
+
+class Progress:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = {}
+
+    def add(self, table: str, n: int) -> None:
+        self.rows[table] = self.rows.get(table, 0) + n
+
+    def line(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        total = sum(self.rows.values())
+        parts = ", ".join(f"{t} {n:,}" for t, n in self.rows.items())
+        return f"{parts} | {total / elapsed if elapsed else 0:,.0f} rows/s"
+
+
+def next_id(conn, column) -> int:
+    return (conn.execute(select(func.max(column))).scalar() or 0) + 1
+
+
+def ensure_airlines(conn, wanted: int, progress: Progress):
+    """Existing airlines plus synthetic ones (codes Z0, Z1, ... Y0, ...) up to `wanted`."""
+    from FlightBookingSimulatorBackend import Airline
+
+    existing = [tuple(r) for r in conn.execute(select(Airline.airline_id, Airline.iata_code).order_by(Airline.airline_id))]
+    codes = {code for _, code in existing}
+    candidates = (a + b for a in reversed(string.ascii_uppercase) for b in CODE_CHARS)
+    rows = []
+    airline_id = next_id(conn, Airline.airline_id)
+    while len(existing) + len(rows) < wanted:
+        code = next(candidates)
+        if code in codes:
+            continue
+        rows.append({"airline_id": airline_id, "airline_name": f"Synthetic Air {code}", "iata_code": code})
+        airline_id += 1
+    if rows:
+        conn.execute(insert(Airline), rows)
+        conn.commit()
+        progress.add("airlines", len(rows))
+    return (existing + [(r["airline_id"], r["iata_code"]) for r in rows])[:wanted]
+
+
+def build_routes(rng: random.Random, airlines, n_routes: int):
+    """(source, destination, airline_id, iata code, block minutes, base fare) for n distinct city pairs."""
+    from FlightBookingSimulatorBackend import AIRPORT_CODES
+
+    cities = sorted(AIRPORT_CODES)
+    pairs = [(a, b) for a in cities for b in cities if a != b]
+    rng.shuffle(pairs)
+    routes = []
+    for source, destination in pairs[:n_routes]:
+        airline_id, code = rng.choice(airlines)
+        minutes = rng.randrange(55, 230, 5)
+        fare = round(1500 + minutes * rng.uniform(25, 45), -1)
+        routes.append((source, destination, airline_id, code, minutes, fare))
+    return routes
+
+
+def insert_passengers(conn, rng: random.Random, n: int, progress: Progress, chunk: int = 10_000):
+    from FlightBookingSimulatorBackend import Passenger
+
+    first_id = next_id(conn, Passenger.passenger_id)
+    for start in range(0, n, chunk):
+        rows = []
+        for pid in range(first_id + start, first_id + min(start + chunk, n)):
+            rows.append({
+                "passenger_id": pid,
+                "full_name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}",
+                "email": f"passenger{pid}@synthetic.example",
+                "phone": f"9{rng.randrange(10 ** 9):09d}",
+            })
+        conn.execute(insert(Passenger), rows)
+        conn.commit()
+        progress.add("passengers", len(rows))
+    return range(first_id, first_id + n)
+
+
+def flight_number_factory(taken):
+    counters = {}
+
+    def allocate(code: str) -> str:
+        n = counters.get(code, 0)
+        while True:
+            digits = ""
+            value = n
+            for _ in range(4):
+                value, d = divmod(value, 36)
+                digits = CODE_CHARS[d] + digits
+            n += 1
+            number = code + digits
+            if number not in taken:
+                counters[code] = n
+                taken.add(number)
+                return number
+
+    return allocate
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    # the backend builds its engine from FLIGHT_DB_URL at import time, so import it only now
+    os.environ["FLIGHT_DB_URL"] = args.db_url
+    os.environ["FLIGHT_SIM_ENABLED"] = "0"
+    from FlightBookingSimulatorBackend import (
+        engine, Base, Flight, Seat, Passenger, Booking, generate_pnr, run_migrations,
+    )
+    from create_return_flights_with_seats import SEAT_PATTERN
+
+    use_bulk_pragmas(engine)
+    rng = random.Random(args.seed)
+    start_date = schedule_start(args.start_date)
+    progress = Progress()
+
+    if args.reset:
+        Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        airlines = ensure_airlines(conn, args.airlines, progress)
+        routes = build_routes(rng, airlines, args.routes)
+        passenger_ids = insert_passengers(conn, rng, args.passengers, progress)
+        if not passenger_ids:
+            passenger_ids = [pid for (pid,) in conn.execute(select(Passenger.passenger_id))]
+        if not passenger_ids:
+            raise SystemExit("No passengers to book for; use --passengers N")
+        flight_number = flight_number_factory({n for (n,) in conn.execute(select(Flight.flight_number))})
+        flight_id = next_id(conn, Flight.flight_id)
+        seat_id = next_id(conn, Seat.seat_id)
+        booking_id = next_id(conn, Booking.booking_id)
+        print(f"{len(airlines)} airlines, {len(routes)} routes, {len(passenger_ids):,} passengers; "
+              f"flights from id {flight_id:,}, departing from {start_date:%Y-%m-%d}")
+
+        for chunk_start in range(0, args.flights, args.chunk_size):
+            flights, seats, bookings = [], [], []
+            for _ in range(min(args.chunk_size, args.flights - chunk_start)):
+                source, destination, airline_id, code, minutes, fare = rng.choice(routes)
+                departure = start_date + timedelta(minutes=rng.randrange(args.days * 24 * 12) * 5)
+                base_fare = round(fare * rng.uniform(0.9, 1.15), 2)
+                flights.append({
+                    "flight_id": flight_id,
+                    "airline_id": airline_id,
+                    "flight_number": flight_number(code),
+                    "source": source,
+                    "destination": destination,
+                    "departure_time": departure,
+                    "arrival_time": departure + timedelta(minutes=minutes),
+                    "base_fare": base_fare,
+                })
+                load = min(max(rng.gauss(args.load_factor, 0.2), 0.0), 1.0)
+                for seat_number, seat_class in SEAT_PATTERN:
+                    sold = rng.random() < load
+                    cancelled = sold and rng.random() < args.cancel_rate
+                    seats.append({
+                        "seat_id": seat_id,
+                        "flight_id": flight_id,
+                        "seat_number": seat_number,
+                        "seat_class": seat_class,
+                        "is_booked": 1 if sold and not cancelled else 0,
+                    })
+                    if sold:
+                        booked_at = departure - timedelta(minutes=rng.randrange(60, 60 * 24 * 60))
+                        # historical bookings: none dated after the schedule (i.e. generation) starts
+                        booked_at = min(booked_at, start_date - timedelta(minutes=1))
+                        price = base_fare * rng.uniform(0.95, 1.6) * (1.5 if seat_class == "Business" else 1.0)
+                        bookings.append({
+                            "booking_id": booking_id,
+                            "passenger_id": rng.choice(passenger_ids),
+                            "flight_id": flight_id,
+                            "seat_id": seat_id,
+                            "booking_date": booked_at,
+                            "amount_paid": round(price, 2),
+                            "status": "Cancelled" if cancelled else "Confirmed",
+                            "pnr": generate_pnr(booking_id),
+                            "hold_expires_at": None,
+                        })
+                        booking_id += 1
+                    seat_id += 1
+                flight_id += 1
+
+            # one transaction per chunk: an interrupted run never leaves flights without their seats
+            conn.execute(insert(Flight), flights)
+            conn.execute(insert(Seat), seats)
+            if bookings:
+                conn.execute(insert(Booking), bookings)
+            conn.commit()
+            progress.add("flights", len(flights))
+            progress.add("seats", len(seats))
+            progress.add("bookings", len(bookings))
+            print(f"  {chunk_start + len(flights):,}/{args.flights:,} flights | {progress.line()}")
+
+    print(f"Done in {time.perf_counter() - progress.started:.1f}s: {progress.line()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+HTTP load generator: replays a mix of user journeys against a running API with Poisson arrivals.
+
+Journeys (picked per arrival by the --mix weights):
+  browse : search /flights for a city pair and day, open one result, fetch its dynamic price
+  book   : book a random flight from the catalogue, then pay (retrying the simulated 402 declines)
+  flash  : the same, but every booker goes for one flash-sale flight
+  cancel : book, pay, then cancel with DELETE /bookings/{pnr}
+
+Arrivals are open-loop: journeys start at exponentially distributed intervals (mean 1/--rate)
+whether or not earlier ones have finished, so a slow server builds a queue instead of quietly
+slowing the generator down. At the end it prints throughput, latency percentiles and status
+rates per endpoint, then re-reads every booking it made and checks that no seat is held by two
+live bookings (exit code 2 if it is).
+
+Usage:
+  uvicorn FlightBookingSimulatorBackend:app --workers 4 &
+  python load_generator.py --rate 50 --duration 60
+  python load_generator.py --mix browse=20,flash=80 --flash-flight 7 --rate 200 --duration 30
+  python load_generator.py --base-url http://staging:8000 --passengers 1-5000 --output run.json
+
+Options:
+  --base-url URL       : API to drive (default http://localhost:8000)
+  --mix SPEC           : journey weights, e.g. browse=70,book=20,flash=5,cancel=5 (the default)
+  --rate R             : mean journey arrivals per second (default 20)
+  --duration S         : seconds to keep generating arrivals (default 30)
+  --max-in-flight N    : journeys running at once; arrivals beyond this are dropped and counted (default 500)
+  --passengers A-B     : passenger_id range to book as (default 1-10, the passengers in data.sql)
+  --flash-flight ID    : flight for flash-sale journeys (default: the catalogue flight with most free seats)
+  --catalogue N        : flights to load from /dynamic_price/all for picking targets (default 5,000)
+  --pay-retries N      : payment attempts per booking before giving up (default 3)
+  --timeout S          : per-request timeout (default 30)
+  --seed N             : random seed (default: none)
+  --output FILE        : also write the report as JSON
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+JOURNEYS = ("browse", "book", "flash", "cancel")
+LIVE_STATUSES = {"Confirmed", "Pending", "PaymentFailed"}
+
+
+def parse_mix(spec: str) -> dict:
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"unknown journey '{name}' (expected one of {', '.join(JOURNEYS)})")
+        mix[name] = float(weight or 1)
+    if not any(mix.values()):
+        raise argparse.ArgumentTypeError("mix needs at least one positive weight")
+    return mix
+
+
+def parse_range(spec: str) -> range:
+    first, _, last = spec.partition("-")
+    first = int(first)
+    return range(first, int(last or first) + 1)
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+class Stats:
+    """Latencies and status codes per endpoint, plus journey outcomes."""
+
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.journeys = Counter()
+        self.outcomes = Counter()
+        self.dropped = 0
+
+    def record(self, endpoint: str, status, seconds: float) -> None:
+        self.latencies[endpoint].append(seconds)
+        self.statuses[endpoint][status] += 1
+
+    def report(self, wall: float) -> dict:
+        endpoints = {}
+        for endpoint in sorted(self.latencies):
+            lat = sorted(self.latencies[endpoint])
+            statuses = self.statuses[endpoint]
+            n = len(lat)
+            endpoints[endpoint] = {
+                "requests": n,
+                "rps": round(n / wall, 2) if wall else 0.0,
+                "p50_ms": round(percentile(lat, 0.50) * 1000, 2),
+                "p90_ms": round(percentile(lat, 0.90) * 1000, 2),
+                "p99_ms": round(percentile(lat, 0.99) * 1000, 2),
+                "status_counts": {str(k): v for k, v in sorted(statuses.items(), key=lambda kv: str(kv[0]))},
+                "rate_402": round(statuses[402] / n, 4) if n else 0.0,
+                "rate_409": round(statuses[409] / n, 4) if n else 0.0,
+                # 5xx responses plus requests that never got one (timeouts, refused connections)
+                "error_rate": round(sum(v for k, v in statuses.items()
+                                        if not isinstance(k, int) or k >= 500) / n, 4) if n else 0.0,
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "wall_s": round(wall, 2),
+            "requests": total,
+            "rps": round(total / wall, 2) if wall else 0.0,
+            "journeys": dict(self.journeys),
+            "outcomes": dict(sorted(self.outcomes.items())),
+            "dropped_arrivals": self.dropped,
+            "endpoints": endpoints,
+        }
+
+
+class LoadGenerator:
+    def __init__(self, client: httpx.AsyncClient, args, rng: random.Random):
+        self.client = client
+        self.args = args
+        self.rng = rng
+        self.stats = Stats()
+        self.passengers = parse_range(args.passengers)
+        self.catalogue = []
+        self.flash_flight = args.flash_flight
+        # booking_id -> what we booked and the last status we saw for it
+        self.ledger = {}
+
+    async def call(self, endpoint: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except httpx.HTTPError as exc:
+            self.stats.record(endpoint, type(exc).__name__, time.perf_counter() - started)
+            return None
+        self.stats.record(endpoint, response.status_code, time.perf_counter() - started)
+        return response
+
+    async def load_catalogue(self) -> None:
+        response = await self.client.get("/dynamic_price/all", params={"limit": self.args.catalogue})
+        response.raise_for_status()
+        self.catalogue = [json.loads(line) for line in response.text.splitlines() if line]
+        if not self.catalogue:
+            raise SystemExit("The API returned no flights; seed the database first")
+        if self.flash_flight is None:
+            self.flash_flight = max(self.catalogue, key=lambda f: (f["seats_available"], -f["flight_id"]))["flight_id"]
+
+    # --- journeys ---
+
+    async def browse(self) -> str:
+        flight = self.rng.choice(self.catalogue)
+        response = await self.call("GET /flights", "GET", "/flights", params={
+            "from": flight["origin"], "to": flight["destination"], "date": flight["departure_time"][:10]})
+        if response is None or response.status_code != 200:
+            return "search_failed"
+        results = response.json()
+        if not results:
+            return "no_results"
+        flight_id = self.rng.choice(results)["flight_id"]
+        await self.call("GET /flights/{id}", "GET", f"/flights/{flight_id}")
+        await self.call("GET /dynamic_price/{id}", "GET", f"/dynamic_price/{flight_id}")
+        return "browsed"
+
+    async def book(self) -> str:
+        flight = self.rng.choice(self.catalogue)
+        return await self._book_and_pay(flight["flight_id"])
+
+    async def flash(self) -> str:
+        return await self._book_and_pay(self.flash_flight)
+
+    async def cancel(self) -> str:
+        flight = self.rng.choice(self.catalogue)
+        outcome = await self._book_and_pay(flight["flight_id"], keep=False)
+        if not outcome.startswith("cancel:"):
+            return outcome
+        booking_id = int(outcome.split(":")[1])
+        entry = self.ledger[booking_id]
+        response = await self.call("DELETE /bookings/{pnr}", "DELETE", f"/bookings/{entry['pnr']}",
+                                   params={"passenger_id": entry["passenger_id"]})
+        if response is None or response.status_code != 200:
+            return "cancel_failed"
+        entry["status"] = "Cancelled"
+        return "cancelled"
+
+    async def _book_and_pay(self, flight_id: int, keep: bool = True) -> str:
+        passenger_id = self.rng.choice(self.passengers)
+        response = await self.call("POST /bookings", "POST", "/bookings",
+                                   json={"flight_id": flight_id, "passenger_id": passenger_id})
+        if response is None or response.status_code >= 500:
+            return "booking_error"
+        if response.status_code != 201:
+            return "sold_out" if response.status_code == 400 else f"booking_{response.status_code}"
+        booking = response.json()
+        booking_id = booking["booking_id"]
+        self.ledger[booking_id] = {"flight_id": flight_id, "flight_number": booking["flight_number"],
+                                   "seat_number": booking["seat_number"], "passenger_id": passenger_id,
+                                   "status": booking["status"], "pnr": booking["pnr"]}
+
+        for attempt in range(self.args.pay_retries):
+            response = await self.call("POST /bookings/pay/{id}", "POST", f"/bookings/pay/{booking_id}",
+                                       json={"passenger_id": passenger_id})
+            if response is None:
+                continue
+            if response.status_code == 200:
+                paid = response.json()
+                self.ledger[booking_id].update(status=paid["status"], pnr=paid["pnr"])
+                if not keep:
+                    return f"cancel:{booking_id}"
+                return "paid" if attempt == 0 else "paid_after_retry"
+            if response.status_code == 402:
+                self.ledger[booking_id]["status"] = "PaymentFailed"
+                await asyncio.sleep(0.05 * (attempt + 1))
+                continue
+            if response.status_code == 409:
+                return "hold_expired"
+            return f"payment_{response.status_code}"
+        return "payment_gave_up"
+
+    # --- driver ---
+
+    async def run_journey(self, name: str) -> None:
+        self.stats.journeys[name] += 1
+        try:
+            outcome = await getattr(self, name)()
+        except Exception as exc:  # a bad response body should not kill the run
+            outcome = f"crashed:{type(exc).__name__}"
+        self.stats.outcomes[f"{name}:{outcome}"] += 1
+
+    async def drive(self) -> float:
+        names = list(self.args.mix)
+        weights = [self.args.mix[n] for n in names]
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        deadline = started + self.args.duration
+        next_arrival = started
+        running = set()
+        while True:
+            next_arrival += self.rng.expovariate(self.args.rate)
+            if next_arrival >= deadline:
+                break
+            # sleep to the scheduled arrival rather than for the interval, so timer lag does not accumulate
+            await asyncio.sleep(max(0.0, next_arrival - loop.time()))
+            if len(running) >= self.args.max_in_flight:
+                self.stats.dropped += 1
+                continue
+            task = asyncio.create_task(self.run_journey(self.rng.choices(names, weights)[0]))
+            running.add(task)
+            task.add_done_callback(running.discard)
+        if running:
+            await asyncio.gather(*running)
+        return loop.time() - started
+
+    async def check_oversell(self) -> dict:
+        """Re-read every booking we made and look for a seat held by two live bookings."""
+        semaphore = asyncio.Semaphore(32)
+        unreadable = 0
+
+        async def refresh(booking_id: int):
+            nonlocal unreadable
+            async with semaphore:
+                try:
+                    response = await self.client.get(f"/bookings/{booking_id}")
+                except httpx.HTTPError:
+                    unreadable += 1
+                    return
+            if response.status_code != 200:
+                unreadable += 1
+                return
+            booking = response.json()
+            self.ledger[booking_id].update(status=booking["status"], seat_number=booking["seat_number"])
+
+        await asyncio.gather(*(refresh(b) for b in list(self.ledger)))
+        holders = defaultdict(list)
+        for booking_id, entry in self.ledger.items():
+            if entry["status"] in LIVE_STATUSES:
+                holders[(entry["flight_id"], entry["seat_number"])].append(booking_id)
+        double_booked = {f"{fid}/{seat}": ids for (fid, seat), ids in holders.items() if len(ids) > 1}
+
+        # the server's own count for the flash flight must cover every live booking we hold on it
+        flash = {}
+        response = await self.client.get(f"/flights/{self.flash_flight}")
+        if response.status_code == 200:
+            detail = response.json()
+            ours = sum(1 for (fid, _), ids in holders.items() if fid == self.flash_flight)
+            flash = {"flight_id": self.flash_flight, "total_seats": detail["total_seats"],
+                     "seats_available": detail["seats_available"], "live_bookings_from_run": ours,
+                     "ok": 0 <= detail["seats_available"] and ours <= detail["total_seats"] - detail["seats_available"]}
+        return {
+            "bookings_made": len(self.ledger),
+            "live_bookings": sum(len(ids) for ids in holders.values()),
+            "unreadable": unreadable,
+            "double_booked_seats": double_booked,
+            "flash_flight": flash,
+            "ok": not double_booked and flash.get("ok", True),
+        }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n{report['requests']:,} requests in {report['wall_s']}s ({report['rps']} req/s), "
+          f"journeys {report['journeys']}, dropped arrivals {report['dropped_arrivals']}")
+    print(f"{'endpoint':<26}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}"
+          f"{'402':>7}{'409':>7}{'err':>7}")
+    for endpoint, r in report["endpoints"].items():
+        print(f"{endpoint:<26}{r['requests']:>7}{r['rps']:>8}{r['p50_ms']:>9}{r['p90_ms']:>9}{r['p99_ms']:>9}"
+              f"{r['rate_402']:>7.1%}{r['rate_409']:>7.1%}{r['error_rate']:>7.1%}")
+    print("outcomes:")
+    for outcome, n in report["outcomes"].items():
+        print(f"  {outcome:<32}{n:>7}")
+    check = report["oversell_check"]
+    flash = check["flash_flight"]
+    flash_line = (f"flash flight {flash['flight_id']}: {flash['total_seats'] - flash['seats_available']}/"
+                  f"{flash['total_seats']} seats taken, {flash['live_bookings_from_run']} by this run"
+                  if flash else "flash flight unreadable")
+    print(f"oversell check: {check['bookings_made']} bookings made, {check['live_bookings']} live, "
+          f"{len(check['double_booked_seats'])} double-booked seats, {check['unreadable']} unreadable; "
+          f"{flash_line} -> {'OK' if check['ok'] else 'FAILED'}")
+
+
+async def main(args) -> int:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=args.timeout, limits=limits) as client:
+        generator = LoadGenerator(client, args, rng)
+        await generator.load_catalogue()
+        print(f"{len(generator.catalogue):,} flights in catalogue, flash flight {generator.flash_flight}, "
+              f"mix {args.mix}, {args.rate}/s for {args.duration}s against {args.base_url}")
+        wall = await generator.drive()
+        report = generator.stats.report(wall)
+        report["oversell_check"] = await generator.check_oversell()
+
+    print_report(report)
+    if args.output:
+        report["config"] = {"base_url": args.base_url, "mix": args.mix, "rate": args.rate,
+                            "duration": args.duration, "seed": args.seed}
+        with open(args.output, "w") as fh:
+            json.dump(report, fh, indent=2)
+        print(f"Report written to {args.output}")
+    return 0 if report["oversell_check"]["ok"] else 2
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("browse=70,book=20,flash=5,cancel=5"))
+    parser.add_argument("--rate", type=float, default=20.0)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--max-in-flight", type=int, default=500)
+    parser.add_argument("--passengers", default="1-10")
+    parser.add_argument("--flash-flight", type=int, default=None)
+    parser.add_argument("--catalogue", type=int, default=5_000)
+    parser.add_argument("--pay-retries", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default=None)
+    sys.exit(asyncio.run(main(parser.parse_args())))
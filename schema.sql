@@ -6,6 +6,7 @@ DROP TABLE IF EXISTS Seats;
 DROP TABLE IF EXISTS Flights;
 DROP TABLE IF EXISTS Passengers;
 DROP TABLE IF EXISTS Airlines;
+DROP TABLE IF EXISTS SchemaMigrations;
 
 SET FOREIGN_KEY_CHECKS = 1;
 
@@ -64,12 +65,23 @@ CREATE TABLE Bookings (
     booking_id INT AUTO_INCREMENT PRIMARY KEY,
     passenger_id INT NOT NULL,
     flight_id INT NOT NULL,
-    seat_id INT NOT NULL UNIQUE,
+    seat_id INT NOT NULL,              -- not unique: released seats are booked again
     pnr VARCHAR(12) NULL UNIQUE,       -- backend-generated
     booking_date DATETIME DEFAULT CURRENT_TIMESTAMP,
     amount_paid DECIMAL(10,4) NOT NULL CHECK(amount_paid > 0),
     status VARCHAR(20) DEFAULT 'Confirmed',
+    hold_expires_at DATETIME NULL,     -- unpaid seat hold deadline, NULL once paid/cancelled/expired
     FOREIGN KEY (passenger_id) REFERENCES Passengers(passenger_id),
     FOREIGN KEY (flight_id) REFERENCES Flights(flight_id),
     FOREIGN KEY (seat_id) REFERENCES Seats(seat_id)
 );
+
+-- ============================================================
+-- Secondary indexes for the hot access paths
+-- (the backend also creates these through schema migrations 1 and 2)
+-- ============================================================
+CREATE INDEX ix_seats_flight_booked ON Seats (flight_id, is_booked);
+CREATE INDEX ix_flights_route_departure ON Flights (source, destination, departure_time);
+CREATE INDEX ix_bookings_passenger_status ON Bookings (passenger_id, status);
+CREATE INDEX ix_bookings_hold_expiry ON Bookings (hold_expires_at);
+CREATE INDEX ix_bookings_seat ON Bookings (seat_id);
@@ -66,6 +66,31 @@ async function fetchAllFlights() {
     }
 }
 
+// ------------------ City Autocomplete ------------------
+const citiesDatalist = document.getElementById("cities");
+let autocompleteTimer = null;
+
+async function refreshCitySuggestions(prefix) {
+    if (!prefix.trim()) return;
+    try {
+        const res = await fetch(`${API_BASE}/airports/autocomplete?q=${encodeURIComponent(prefix)}`);
+        if (!res.ok) return;
+        const suggestions = await res.json();
+        citiesDatalist.innerHTML = suggestions
+            .map(s => `<option value="${s.city}">${s.code || ""}</option>`)
+            .join("");
+    } catch (err) {
+        console.error(err);
+    }
+}
+
+["from-city", "to-city"].forEach(id => {
+    document.getElementById(id).addEventListener("input", (e) => {
+        clearTimeout(autocompleteTimer);
+        autocompleteTimer = setTimeout(() => refreshCitySuggestions(e.target.value), 200);
+    });
+});
+
 // ------------------ Flight Search ------------------
 searchForm.addEventListener("submit", async (e) => {
     e.preventDefault();
@@ -75,7 +100,7 @@ searchForm.addEventListener("submit", async (e) => {
     const to = document.getElementById("to-city").value;
     const date = document.getElementById("date").value;
 
-    let url = `${API_BASE}/flights?from=${from}&to=${to}`;
+    let url = `${API_BASE}/flights?from=${encodeURIComponent(from)}&to=${encodeURIComponent(to)}`;
     if (date) url += `&date=${date}`;
 
     try {
@@ -156,27 +181,40 @@ function displayConfirmation(booking) {
 }
 
 // ------------------ My Bookings ------------------
+const MY_BOOKINGS_PAGE_SIZE = 50;
+
 mybookingsForm.addEventListener("submit", async (e) => {
     e.preventDefault();
     const passengerId = document.getElementById("my-passenger-id").value;
     mybookingsList.innerHTML = "<p>Loading bookings...</p>";
 
     try {
-        const res = await fetch(`${API_BASE}/bookings/passenger/${passengerId}`);
-        const bookings = await res.json();
-        displayMyBookings(bookings);
+        const page = await fetchMyBookings(passengerId, null);
+        mybookingsList.innerHTML = "";
+        displayMyBookings(page.bookings, page.nextCursor, passengerId);
     } catch (err) {
         mybookingsList.innerHTML = "<p>Error fetching bookings</p>";
         console.error(err);
     }
 });
 
-function displayMyBookings(bookings) {
-    if (!bookings.length) {
+// one page of bookings; the API sends the cursor for the next page in X-Next-Cursor
+async function fetchMyBookings(passengerId, cursor) {
+    let url = `${API_BASE}/bookings/passenger/${passengerId}?limit=${MY_BOOKINGS_PAGE_SIZE}`;
+    if (cursor) url += `&cursor=${cursor}`;
+    const res = await fetch(url);
+    const bookings = await res.json();
+    return { bookings, nextCursor: res.headers.get("X-Next-Cursor") };
+}
+
+function displayMyBookings(bookings, nextCursor, passengerId) {
+    const existingMore = mybookingsList.querySelector(".load-more-btn");
+    if (existingMore) existingMore.remove();
+
+    if (!bookings.length && !mybookingsList.children.length) {
         mybookingsList.innerHTML = "<p>No bookings found</p>";
         return;
     }
-    mybookingsList.innerHTML = "";
     bookings.forEach(b => {
         const card = document.createElement("div");
         card.className = "booking-card";
@@ -193,6 +231,23 @@ function displayMyBookings(bookings) {
         card.querySelector(".cancel-btn").addEventListener("click", () => cancelBooking(b.booking_id));
         mybookingsList.appendChild(card);
     });
+
+    if (nextCursor) {
+        const more = document.createElement("button");
+        more.className = "load-more-btn";
+        more.textContent = "Load more";
+        more.addEventListener("click", async () => {
+            more.disabled = true;
+            try {
+                const page = await fetchMyBookings(passengerId, nextCursor);
+                displayMyBookings(page.bookings, page.nextCursor, passengerId);
+            } catch (err) {
+                more.disabled = false;
+                console.error(err);
+            }
+        });
+        mybookingsList.appendChild(more);
+    }
 }
 
 async function cancelBooking(bookingId) {
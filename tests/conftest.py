@@ -0,0 +1,73 @@
+"""
+Shared fixtures: the backend runs against a throwaway SQLite database (FLIGHT_DB_URL is read at
+import time, so it is set here before anything imports the module) and every test starts from
+the same small data set.
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+os.environ["FLIGHT_DB_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "flights_test.db")
+os.environ["FLIGHT_DB_MODE"] = "sync"
+os.environ["FLIGHT_SIM_ENABLED"] = "0"
+os.environ["FLIGHT_REAPER_ENABLED"] = "0"
+os.environ.pop("FLIGHT_DB_REPLICA_URL", None)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import FlightBookingSimulatorBackend as backend  # noqa: E402
+from FlightBookingSimulatorBackend import Airline, Base, Flight, Passenger, Seat  # noqa: E402
+
+DAY = datetime(2030, 1, 10)
+
+# flight_id -> (source, destination, departure hour, arrival hour, seats, booked seats)
+FLIGHTS = {
+    1: ("Delhi", "Mumbai", 8, 10, ["1A", "1B", "1C", "1D"], []),
+    2: ("Mumbai", "Goa", 12, 14, ["1A", "1B", "1C", "1D", "2A", "2B"], []),
+    3: ("Goa", "Delhi", 17, 19, ["1A"], ["1A"]),  # sold out
+}
+
+
+def seat_id(flight_id: int, seat_number: str) -> int:
+    """Seat ids are assigned in FLIGHTS order: flight * 100 + position."""
+    return flight_id * 100 + FLIGHTS[flight_id][4].index(seat_number) + 1
+
+
+@pytest.fixture
+def db():
+    Base.metadata.drop_all(bind=backend.engine)
+    Base.metadata.create_all(bind=backend.engine)
+    with backend.SessionLocal() as s:
+        s.add(Airline(airline_id=1, airline_name="Test Air", iata_code="TA"))
+        s.add_all(Passenger(passenger_id=pid, full_name=f"Passenger {pid}", email=f"p{pid}@example.com")
+                  for pid in range(1, 5))
+        for fid, (src, dst, dep, arr, seats, booked) in FLIGHTS.items():
+            s.add(Flight(flight_id=fid, airline_id=1, flight_number=f"TA{fid:03d}", source=src, destination=dst,
+                         departure_time=DAY.replace(hour=dep), arrival_time=DAY.replace(hour=arr), base_fare=5000))
+            s.add_all(Seat(seat_id=seat_id(fid, n), flight_id=fid, seat_number=n, seat_class="Economy",
+                           is_booked=int(n in booked)) for n in seats)
+        s.commit()
+        backend.seat_inventory.invalidate()
+        backend.seat_inventory.rebuild(s)
+    backend.search_cache.clear()
+    with backend.SessionLocal() as s:
+        yield s
+
+
+@pytest.fixture
+def client(db):
+    """The app with its startup (migrations, cache loads) run against the seeded database."""
+    with TestClient(backend.app) as c:
+        yield c
+
+
+def booked_in_db(flight_id: int) -> int:
+    with backend.SessionLocal() as s:
+        return s.query(Seat).filter(Seat.flight_id == flight_id, Seat.is_booked == 1).count()
+
+
+def cached_booked(flight_id: int) -> int:
+    return backend.seat_inventory.snapshot()[flight_id]["booked"]
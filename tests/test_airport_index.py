@@ -0,0 +1,55 @@
+"""Airport index: free-text city input resolved in memory by name, IATA code, alias or prefix."""
+from datetime import timedelta
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Flight
+from conftest import DAY
+
+
+def _index(db):
+    index = backend.AirportIndex()
+    index.rebuild(db)
+    return index
+
+
+def test_exact_name_code_and_alias(db):
+    index = _index(db)
+    assert index.resolve("mumbai") == ["Mumbai"]
+    assert index.resolve("  BOM ") == ["Mumbai"]
+    assert index.resolve("Bombay") == ["Mumbai"]
+    assert index.resolve("new   delhi") == ["Delhi"]
+
+
+def test_prefix_and_substring_matches(db):
+    index = _index(db)
+    assert index.resolve("Mum") == ["Mumbai"]
+    assert index.resolve("go") == ["Goa"]          # name prefix and GOI code prefix
+    assert index.resolve("umba") == ["Mumbai"]     # substring, like the old ILIKE '%x%'
+    assert index.resolve("Chennai") == []          # a known code, but no flights serve it
+    assert index.resolve("   ") == []
+
+
+def test_autocomplete_ranks_name_prefixes_first(db):
+    index = _index(db)
+    assert index.autocomplete("d") == [{"city": "Delhi", "code": "DEL"}]
+    assert index.autocomplete("bo") == [{"city": "Mumbai", "code": "BOM"}]
+    assert index.autocomplete("zzz") == []
+
+
+def test_miss_rebuilds_to_find_a_city_added_elsewhere(db, monkeypatch):
+    index = _index(db)
+    db.add(Flight(flight_id=4, airline_id=1, flight_number="TA004", source="Delhi", destination="Pune",
+                  departure_time=DAY, arrival_time=DAY + timedelta(hours=2), base_fare=4000))
+    db.commit()
+    monkeypatch.setattr(backend, "AIRPORT_INDEX_MISS_REFRESH_SECONDS", 3600)
+    assert index.resolve_fresh(db, "PNQ") == []    # index too young to rebuild on a miss
+    monkeypatch.setattr(backend, "AIRPORT_INDEX_MISS_REFRESH_SECONDS", 0)
+    assert index.resolve_fresh(db, "PNQ") == ["Pune"]
+    assert index.resolve("Pun") == ["Pune"]
+
+
+def test_search_accepts_aliases_and_codes(client):
+    by_alias = client.get("/flights", params={"from": "Bombay", "to": "GOI"}).json()
+    assert [f["flight_id"] for f in by_alias] == [2]
+    assert client.get("/flights", params={"from": "Madras"}).json() == []
+    assert client.get("/airports/autocomplete", params={"q": "del"}).json() == [{"city": "Delhi", "code": "DEL"}]
@@ -0,0 +1,47 @@
+"""FLIGHT_DB_MODE=async: the dual-mode endpoints run the same logic through AsyncSession.run_sync."""
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.pool import NullPool
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Booking
+from conftest import booked_in_db, cached_booked
+
+pytest.importorskip("aiosqlite")
+
+
+@pytest.fixture
+def async_mode(db, monkeypatch):
+    """Point the async globals at the test database, as FLIGHT_DB_MODE=async would at import."""
+    # NullPool: every checkout opens its connection on the event loop of the request using it
+    async_engine = create_async_engine(backend._async_database_url(backend.DATABASE_URL), poolclass=NullPool)
+    factory = async_sessionmaker(bind=async_engine, autoflush=False, autocommit=False)
+    for name, value in (("async_engine", async_engine), ("AsyncSessionLocal", factory),
+                        ("async_read_engine", async_engine), ("AsyncReadSessionLocal", factory)):
+        monkeypatch.setattr(backend, name, value)
+    calls = []
+    run_sync = AsyncSession.run_sync
+
+    async def counting_run_sync(self, fn, *args, **kwargs):
+        calls.append(fn.__name__)
+        return await run_sync(self, fn, *args, **kwargs)
+
+    monkeypatch.setattr(AsyncSession, "run_sync", counting_run_sync)
+    yield calls
+
+
+def test_booking_in_async_mode(client, async_mode, db):
+    resp = client.post("/bookings", json={"flight_id": 2, "passenger_id": 1, "seat_number": "2B"})
+    assert resp.status_code == 201, resp.text
+    body = resp.json()
+    assert (body["seat_number"], body["status"], body["passenger_name"]) == ("2B", "Pending", "Passenger 1")
+    assert "_create_booking" in async_mode
+    assert db.get(Booking, body["booking_id"]).status == "Pending"
+    # the commit-time seat delta reaches the shared cache from the async session too
+    assert cached_booked(2) == booked_in_db(2) == 1
+
+
+def test_search_and_detail_in_async_mode(client, async_mode):
+    assert [f["flight_id"] for f in client.get("/flights", params={"from": "Delhi"}).json()] == [1]
+    assert client.get("/flights/3").json()["seats_available"] == 0
+    assert {"_search_flights", "_flight_detail"} <= set(async_mode)
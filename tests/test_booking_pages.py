@@ -0,0 +1,43 @@
+"""Passenger booking lists: keyset pages chained through X-Next-Cursor."""
+import pytest
+
+import FlightBookingSimulatorBackend as backend
+
+
+def _book_many(db, count, passenger_id=1):
+    return [backend._create_booking(db, backend.BookingCreateReq(flight_id=2, passenger_id=passenger_id)).booking_id
+            for _ in range(count)]
+
+
+def _walk(client, path, **params):
+    pages, cursor = [], None
+    while True:
+        resp = client.get(path, params=dict(params, **({"cursor": cursor} if cursor else {})))
+        assert resp.status_code == 200
+        pages.append([b["booking_id"] for b in resp.json()])
+        cursor = resp.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return pages
+
+
+@pytest.mark.parametrize("fast_json", [False, True])
+def test_cursor_round_trip_visits_every_booking_once(client, db, monkeypatch, fast_json):
+    monkeypatch.setattr(backend, "FAST_JSON", fast_json)
+    mine = _book_many(db, 5)
+    _book_many(db, 1, passenger_id=2)
+    pages = _walk(client, "/bookings/passenger/1", limit=2)
+    assert pages == [mine[0:2], mine[2:4], mine[4:5]]
+    assert _walk(client, "/bookings/me", passenger_id=1, limit=2) == pages
+
+
+def test_last_full_page_has_no_cursor(client, db):
+    mine = _book_many(db, 2)
+    resp = client.get("/bookings/passenger/1", params={"limit": 2})
+    assert [b["booking_id"] for b in resp.json()] == mine
+    assert "X-Next-Cursor" not in resp.headers
+
+
+def test_cancelled_bookings_are_skipped(client, db):
+    mine = _book_many(db, 3)
+    assert client.post(f"/bookings/cancel/{mine[1]}").status_code == 200
+    assert _walk(client, "/bookings/passenger/1", limit=1) == [[mine[0]], [mine[2]]]
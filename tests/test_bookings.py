@@ -0,0 +1,138 @@
+"""Seat claims and the bookings built on them: all-or-nothing, with the cache kept in step."""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Booking, Seat
+from conftest import booked_in_db, cached_booked, seat_id
+
+
+def _claim_in_new_session(flight_id, seat_number=None):
+    with backend.SessionLocal() as s, s.begin():
+        return backend._claim_seat(s, flight_id, seat_number)
+
+
+# ---------------------------
+# conditional seat claim
+# ---------------------------
+def test_preferred_seat_claimed_once(db):
+    assert _claim_in_new_session(1, "1A") == ("claimed", seat_id(1, "1A"), "1A")
+    assert _claim_in_new_session(1, "1A") == ("taken", None, None)
+    assert _claim_in_new_session(1, "9Z") == ("not_found", None, None)
+    assert cached_booked(1) == booked_in_db(1) == 1
+
+
+def test_any_seat_claims_until_sold_out(db):
+    claimed = {_claim_in_new_session(1)[2] for _ in range(4)}
+    assert claimed == {"1A", "1B", "1C", "1D"}
+    assert _claim_in_new_session(1) == ("sold_out", None, None)
+    assert cached_booked(1) == booked_in_db(1) == 4
+
+
+def test_claim_loses_to_a_concurrent_writer(db):
+    # a candidate booked by someone else after it was read must not be claimed twice
+    with db.begin():
+        assert not backend._try_claim(db, Seat.seat_id == seat_id(3, "1A"))
+        assert backend._try_claim(db, Seat.seat_id == seat_id(1, "1A"))
+        assert not backend._try_claim(db, Seat.seat_id == seat_id(1, "1A"))
+
+
+# ---------------------------
+# group booking
+# ---------------------------
+def test_group_booking_claims_adjacent_block(db):
+    rows = backend._create_group_booking(db, backend.GroupBookingReq(flight_id=2, passenger_ids=[1, 2, 3],
+                                                                     adjacent=True))
+    assert sorted(r.seat_number for r in rows) == ["1A", "1B", "1C"]
+    assert len({r.amount_paid for r in rows}) == 1
+    assert cached_booked(2) == booked_in_db(2) == 3
+
+
+def test_group_booking_with_unknown_passenger_books_nothing(db):
+    with pytest.raises(HTTPException) as exc:
+        backend._create_group_booking(db, backend.GroupBookingReq(flight_id=2, passenger_ids=[1, 99]))
+    assert exc.value.status_code == 404
+    assert booked_in_db(2) == cached_booked(2) == 0
+    assert db.query(Booking).count() == 0
+
+
+def test_group_booking_retries_after_losing_a_seat(db, monkeypatch):
+    claim_all = backend._try_claim_all
+    attempts = []
+
+    def lose_first_pick(session, seat_ids):
+        attempts.append(list(seat_ids))
+        if len(attempts) == 1:
+            _claim_in_new_session(2, "1B")  # another booker takes a picked seat first
+        return claim_all(session, seat_ids)
+
+    monkeypatch.setattr(backend, "_try_claim_all", lose_first_pick)
+    rows = backend._create_group_booking(db, backend.GroupBookingReq(flight_id=2, passenger_ids=[1, 2]))
+    assert len(attempts) == 2
+    # the first attempt's partial claim of 1A was rolled back and picked again
+    assert sorted(r.seat_number for r in rows) == ["1A", "1C"]
+    assert cached_booked(2) == booked_in_db(2) == 3
+    assert db.query(Booking).count() == 2
+
+
+@pytest.mark.parametrize("returning", [True, False], ids=["returning", "lookup"])
+def test_group_booking_returns_only_its_own_rows(db, monkeypatch, returning):
+    monkeypatch.setattr(backend.engine.dialect, "insert_executemany_returning", returning)
+    # someone else's live hold on a seat that is (wrongly) marked free
+    db.add(Booking(passenger_id=4, flight_id=2, seat_id=seat_id(2, "1A"), booking_date=datetime.utcnow(),
+                   amount_paid=5000, status="Pending"))
+    db.commit()
+    rows = backend._create_group_booking(db, backend.GroupBookingReq(flight_id=2, passenger_ids=[1, 2]))
+    assert len(rows) == 2
+    assert sorted(r.passenger_name for r in rows) == ["Passenger 1", "Passenger 2"]
+
+
+# ---------------------------
+# itinerary booking
+# ---------------------------
+def _seat_booked(flight_id, seat_number) -> bool:
+    with backend.SessionLocal() as s:
+        return bool(s.get(Seat, seat_id(flight_id, seat_number)).is_booked)
+
+
+def _itinerary(*legs, passenger_id=1):
+    return backend.ItineraryCreateReq(passenger_id=passenger_id, legs=[
+        backend.ItineraryLegReq(flight_id=fid, seat_number=seat) for fid, seat in legs
+    ])
+
+
+def test_itinerary_books_every_leg(db):
+    rows = backend._book_itinerary(db, _itinerary((1, "1A"), (2, "2B")))
+    assert [r.seat_number for r in rows] == ["1A", "2B"]
+    assert all(r.status == "Pending" and r.hold_expires_at for r in rows)
+    assert (cached_booked(1), cached_booked(2)) == (booked_in_db(1), booked_in_db(2)) == (1, 1)
+
+
+def test_itinerary_rolls_back_when_a_later_leg_is_sold_out(db):
+    # a stale cache lets the pre-check pass, so legs 1 and 2 are claimed before leg 3 fails
+    backend.seat_inventory.apply({3: -1})
+    with pytest.raises(HTTPException) as exc:
+        backend._book_itinerary(db, _itinerary((1, "1A"), (2, None), (3, None)))
+    assert exc.value.status_code == 400 and "flight 3" in exc.value.detail
+    assert not _seat_booked(1, "1A")
+    assert (booked_in_db(1), booked_in_db(2)) == (cached_booked(1), cached_booked(2)) == (0, 0)
+    assert db.query(Booking).count() == 0
+
+
+def test_itinerary_rolls_back_when_a_preferred_seat_is_taken(db):
+    _claim_in_new_session(2, "2A")
+    with pytest.raises(HTTPException) as exc:
+        backend._book_itinerary(db, _itinerary((1, "1A"), (2, "2A")))
+    assert exc.value.status_code == 400
+    assert not _seat_booked(1, "1A")
+    assert (cached_booked(1), cached_booked(2)) == (booked_in_db(1), booked_in_db(2)) == (0, 1)
+    assert db.query(Booking).count() == 0
+
+
+def test_itinerary_rejects_legs_out_of_order(db):
+    with pytest.raises(HTTPException) as exc:
+        backend._book_itinerary(db, _itinerary((2, None), (1, None)))
+    assert exc.value.status_code == 400
+    assert "at least 1 hour" in exc.value.detail
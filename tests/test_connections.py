@@ -0,0 +1,51 @@
+"""1-stop connections: route graph pairs legs whose layover lies within the allowed window."""
+from datetime import datetime, timedelta
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import RouteGraph, RouteLeg
+
+T0 = datetime(2030, 1, 10, 8)
+
+
+def _leg(flight_id, source, destination, departs_after_h, duration_h=2.0):
+    dep = T0 + timedelta(hours=departs_after_h)
+    return RouteLeg(flight_id, f"TA{flight_id:03d}", "Test Air", source, destination, dep,
+                    dep + timedelta(hours=duration_h), 5000)
+
+
+def _graph(*legs):
+    graph = RouteGraph()
+    graph.add_legs(list(legs))
+    return graph
+
+
+def _pairs(graph, **kwargs):
+    return [(a.flight_id, b.flight_id) for a, b in graph.find_connections(["Delhi"], ["Goa"], **kwargs)]
+
+
+def test_layover_must_exceed_the_minimum_and_not_exceed_the_maximum():
+    # first leg lands at T0+2h; second legs leave 1h, 1h01, 12h and 12h01 later
+    graph = _graph(_leg(1, "Delhi", "Mumbai", 0), _leg(2, "Mumbai", "Goa", 3), _leg(3, "Mumbai", "Goa", 3 + 1 / 60),
+                   _leg(4, "Mumbai", "Goa", 14), _leg(5, "Mumbai", "Goa", 14 + 1 / 60))
+    assert _pairs(graph) == [(1, 3), (1, 4)]
+    assert _pairs(graph, max_layover=timedelta(hours=2)) == [(1, 3)]
+    assert _pairs(graph, min_layover=timedelta(0)) == [(1, 2), (1, 3), (1, 4)]
+
+
+def test_first_leg_window_and_excluded_routes():
+    graph = _graph(_leg(1, "Delhi", "Mumbai", 0), _leg(2, "Delhi", "Mumbai", 24), _leg(3, "Mumbai", "Goa", 4),
+                   _leg(4, "Mumbai", "Goa", 28), _leg(5, "Delhi", "Goa", 0), _leg(6, "Goa", "Goa", 5))
+    assert _pairs(graph) == [(1, 3), (2, 4)]
+    assert _pairs(graph, start=T0 + timedelta(hours=12), end=T0 + timedelta(hours=36)) == [(2, 4)]
+    assert _pairs(graph, end=T0) == []
+
+
+def test_connections_endpoint_skips_sold_out_legs_and_honours_max_layover(client):
+    body = client.get("/flights/connections", params={"from": "Delhi", "to": "Goa"}).json()
+    assert [[leg["flight_id"] for leg in c["legs"]] for c in body] == [[1, 2]]
+    assert (body[0]["via"], body[0]["layover_minutes"], body[0]["total_duration_minutes"]) == ("Mumbai", 120, 360)
+    assert client.get("/flights/connections", params={"from": "Delhi", "to": "Goa",
+                                                      "max_layover_hours": 1.5}).json() == []
+    # Mumbai -> Goa -> Delhi leaves Goa three hours after landing, but that flight is sold out
+    assert backend.route_graph.find_connections(["Mumbai"], ["Delhi"])
+    assert client.get("/flights/connections", params={"from": "Mumbai", "to": "Delhi"}).json() == []
@@ -0,0 +1,49 @@
+"""FLIGHT_FAST_JSON: listings encoded in one pass and compressed when the client accepts it."""
+import gzip
+import json
+
+import pytest
+
+import FlightBookingSimulatorBackend as backend
+
+ROWS = [{"flight_id": i, "origin": "Delhi", "destination": "Mumbai", "dynamic_price": 5123.45} for i in range(50)]
+
+
+@pytest.fixture
+def no_brotli(monkeypatch):
+    monkeypatch.setattr(backend, "brotli", None)
+
+
+def test_large_body_is_gzipped_for_clients_that_accept_it(no_brotli):
+    resp = backend.fast_json_response(ROWS, "br, gzip;q=0.8")
+    assert resp.headers["content-encoding"] == "gzip"
+    assert resp.headers["vary"] == "Accept-Encoding"
+    assert len(resp.body) < len(backend.encode_json(ROWS)) // 4
+    assert json.loads(gzip.decompress(resp.body)) == ROWS
+
+
+@pytest.mark.parametrize("accept_encoding", ["", "identity", "gzip;q=0", "br"])
+def test_uncompressed_body_still_varies_on_accept_encoding(no_brotli, accept_encoding):
+    resp = backend.fast_json_response(ROWS, accept_encoding)
+    assert "content-encoding" not in resp.headers
+    assert resp.headers["vary"] == "Accept-Encoding"  # a shared cache must not serve this to gzip clients
+    assert json.loads(resp.body) == ROWS
+
+
+def test_small_body_is_sent_as_is():
+    resp = backend.fast_json_response(ROWS[:1], "gzip", {"X-Next-Cursor": "7"})
+    assert "content-encoding" not in resp.headers and "vary" not in resp.headers
+    assert resp.headers["x-next-cursor"] == "7"
+    assert json.loads(resp.body) == ROWS[:1]
+
+
+def test_search_results_match_the_validated_response(client, no_brotli, monkeypatch):
+    expected = client.get("/flights", params={"sort_by": "price"}).json()
+    monkeypatch.setattr(backend, "FAST_JSON", True)
+    monkeypatch.setattr(backend, "COMPRESS_MIN_BYTES", 64)
+    with client.stream("GET", "/flights", params={"sort_by": "price"}, headers={"Accept-Encoding": "gzip"}) as resp:
+        raw = b"".join(resp.iter_raw())
+    assert resp.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in resp.headers["vary"].split(", ")  # CORS adds Origin
+    assert int(resp.headers["content-length"]) == len(raw)
+    assert json.loads(gzip.decompress(raw)) == expected
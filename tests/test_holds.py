@@ -0,0 +1,128 @@
+"""Booking holds: the reaper expires overdue unpaid bookings and frees their seats."""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.dialects import mysql, sqlite
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Booking, Seat
+from conftest import booked_in_db, cached_booked, seat_id
+
+
+def _book(db, flight_id=2, passenger_id=1, seat_number=None):
+    return backend._create_booking(db, backend.BookingCreateReq(flight_id=flight_id, passenger_id=passenger_id,
+                                                                seat_number=seat_number))
+
+
+def _set_status(db, booking_id, **values):
+    db.execute(update(Booking).where(Booking.booking_id == booking_id).values(**values))
+    db.commit()
+
+
+def test_new_booking_holds_its_seat_until_the_ttl(db):
+    before = datetime.utcnow()
+    resp = _book(db)
+    assert resp.status == "Pending"
+    assert resp.hold_expires_at >= before + timedelta(seconds=backend.HOLD_TTL_SECONDS)
+
+
+def test_reaper_expires_overdue_holds_and_frees_their_seats(db):
+    overdue, fresh, paid = _book(db, seat_number="1A"), _book(db, seat_number="1B"), _book(db, seat_number="1C")
+    past = datetime.utcnow() - timedelta(minutes=1)
+    _set_status(db, overdue.booking_id, hold_expires_at=past)
+    _set_status(db, paid.booking_id, status="Confirmed", hold_expires_at=None)
+    assert cached_booked(2) == 3
+
+    sweep = backend.reap_expired_holds()
+    assert sweep["reaped"] == 1
+    statuses = dict(db.query(Booking.booking_id, Booking.status))
+    assert statuses == {overdue.booking_id: "Expired", fresh.booking_id: "Pending", paid.booking_id: "Confirmed"}
+    assert db.get(Seat, seat_id(2, "1A")).is_booked == 0
+    assert cached_booked(2) == booked_in_db(2) == 2
+    assert backend.reap_expired_holds()["reaped"] == 0
+
+
+def test_reaper_works_through_a_backlog_in_batches(db):
+    past = datetime.utcnow() - timedelta(seconds=1)
+    for seat in ["1A", "1B", "1C", "1D", "2A"]:
+        _set_status(db, _book(db, seat_number=seat).booking_id, hold_expires_at=past)
+    sweep = backend.reap_expired_holds(batch_size=2)
+    assert (sweep["reaped"], sweep["batches"]) == (5, 3)
+    assert cached_booked(2) == booked_in_db(2) == 0
+
+
+def test_expired_hold_cannot_be_paid(db):
+    resp = _book(db)
+    _set_status(db, resp.booking_id, hold_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    with pytest.raises(HTTPException) as exc:
+        backend._pay_booking(db, resp.booking_id, backend.BookingPayReq(passenger_id=1))
+    assert exc.value.status_code == 409
+    backend.reap_expired_holds()
+    with pytest.raises(HTTPException) as exc:
+        backend._pay_booking(db, resp.booking_id, backend.BookingPayReq(passenger_id=1))
+    assert exc.value.status_code == 409 and "Expired" in exc.value.detail
+
+
+def test_released_seat_can_be_booked_again(db):
+    first = _book(db, seat_number="1A")
+    _set_status(db, first.booking_id, hold_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    backend.reap_expired_holds()
+    assert _book(db, passenger_id=2, seat_number="1A").seat_number == "1A"
+
+
+def test_simulator_releases_seats_of_expired_bookings_only(db):
+    expired, confirmed = _book(db, seat_number="1A"), _book(db, seat_number="1B")
+    _set_status(db, expired.booking_id, status="Expired", hold_expires_at=None)  # seat still marked booked
+    _set_status(db, confirmed.booking_id, status="Confirmed", hold_expires_at=None)
+    with db.begin():
+        released = backend._bulk_toggle_seats(db, [2], 6, book=False)
+    assert released == {2: 1}
+    assert db.get(Seat, seat_id(2, "1A")).is_booked == 0
+    assert db.get(Seat, seat_id(2, "1B")).is_booked == 1
+
+
+def test_legacy_simulator_never_releases_a_live_booking_seat(db, monkeypatch):
+    with backend.engine.begin() as conn:  # flight 3's only seat is free again
+        conn.execute(update(Seat).where(Seat.flight_id == 3).values(is_booked=0))
+    backend.seat_inventory.invalidate([3])
+    assert _book(db, flight_id=3).seat_number == "1A"
+    monkeypatch.setattr(backend.random, "random", lambda: 0.0)  # every sampled flight toggles a seat
+    with backend.SessionLocal() as s:
+        backend._legacy_simulator_step(s)
+    assert db.get(Seat, seat_id(3, "1A")).is_booked == 1
+    with pytest.raises(HTTPException) as exc:
+        _book(db, flight_id=3, passenger_id=2)
+    assert exc.value.status_code == 400
+    assert db.query(Booking).filter(Booking.flight_id == 3).count() == 1
+
+
+def test_reaper_leaves_a_seat_rebooked_by_someone_else(db):
+    stale = _book(db, seat_number="1A")
+    _set_status(db, stale.booking_id, hold_expires_at=datetime.utcnow() - timedelta(seconds=1))
+    # the seat was freed under the stale hold and booked again
+    db.execute(update(Seat).where(Seat.seat_id == seat_id(2, "1A")).values(is_booked=0))
+    db.commit()
+    backend.seat_inventory.invalidate([2])
+    fresh = _book(db, passenger_id=2, seat_number="1A")
+
+    assert backend.reap_expired_holds()["reaped"] == 1
+    statuses = dict(db.query(Booking.booking_id, Booking.status))
+    assert statuses == {stale.booking_id: "Expired", fresh.booking_id: "Pending"}
+    assert db.get(Seat, seat_id(2, "1A")).is_booked == 1
+    assert cached_booked(2) == booked_in_db(2) == 1
+
+
+@pytest.mark.parametrize("version, mariadb, expected", [
+    ((5, 7, 44), False, False), ((8, 0, 0), False, False), ((8, 0, 36), False, True),
+    ((10, 5, 22), True, False), ((10, 6, 16), True, True), ((11, 4, 2), True, True),
+])
+def test_skip_locked_only_on_servers_that_support_it(version, mariadb, expected):
+    dialect = mysql.dialect()
+    dialect.server_version_info, dialect.is_mariadb = version, mariadb
+    assert backend.supports_skip_locked(dialect) is expected
+    stmt = select(Booking.booking_id).with_for_update(skip_locked=backend.supports_skip_locked(dialect))
+    sql = str(stmt.compile(dialect=dialect))
+    assert sql.endswith("FOR UPDATE SKIP LOCKED" if expected else "FOR UPDATE")
+    assert backend.supports_skip_locked(sqlite.dialect())
@@ -0,0 +1,81 @@
+"""Request/SQL/pool instrumentation and the /metrics exposition."""
+import re
+
+import FlightBookingSimulatorBackend as backend
+
+
+def sample(client, name: str, **labels) -> float:
+    """Value of one sample in /metrics (0 when the series does not exist yet)."""
+    wanted = "{" + ",".join(f'{k}="{v}"' for k, v in labels.items()) + "}" if labels else ""
+    for line in client.get("/metrics").text.splitlines():
+        if line.startswith(name + wanted + " "):
+            return float(line.rsplit(" ", 1)[1])
+    return 0.0
+
+
+def test_requests_are_labelled_by_route_template(client):
+    labels = dict(method="GET", route="/flights/{flight_id}", status="200")
+    before = sample(client, "http_request_duration_seconds_count", **labels)
+    assert client.get("/flights/1").status_code == 200
+    assert client.get("/flights/2").status_code == 200
+    assert sample(client, "http_request_duration_seconds_count", **labels) == before + 2
+    # raw paths never become series of their own
+    assert 'route="/flights/1"' not in client.get("/metrics").text
+
+
+def test_unrouted_requests_share_one_series(client):
+    labels = dict(method="GET", route="unmatched", status="404")
+    before = sample(client, "http_request_duration_seconds_count", **labels)
+    client.get("/no/such/path")
+    client.get("/another/missing/path")
+    assert sample(client, "http_request_duration_seconds_count", **labels) == before + 2
+
+
+def test_sql_is_attributed_to_the_request(client):
+    labels = dict(method="GET", route="/flights/{flight_id}")
+    count = sample(client, "http_request_db_queries_count", **labels)
+    queries = sample(client, "http_request_db_queries_sum", **labels)
+    client.get("/flights/1")
+    assert sample(client, "http_request_db_queries_count", **labels) == count + 1
+    assert sample(client, "http_request_db_queries_sum", **labels) > queries
+    assert sample(client, "http_request_db_seconds_sum", **labels) > 0
+
+
+def test_queries_outside_requests_count_as_background(client):
+    before = sample(client, "db_queries_total", source="background")
+    with backend.SessionLocal() as s:
+        backend.seat_inventory.rebuild(s)
+    assert sample(client, "db_queries_total", source="background") >= before + 2
+
+
+def test_pool_checkout_wait_is_recorded(client):
+    before = sample(client, "db_pool_checkout_wait_seconds_count", engine="sync")
+    client.get("/flights/1")
+    assert sample(client, "db_pool_checkout_wait_seconds_count", engine="sync") > before
+
+
+def test_debug_headers_report_queries_and_db_time(client, monkeypatch):
+    assert "x-query-count" not in client.get("/flights/1").headers
+    monkeypatch.setattr(backend, "METRICS_DEBUG_HEADERS", True)
+    headers = client.get("/flights/1").headers
+    assert int(headers["x-query-count"]) >= 1
+    assert re.fullmatch(r"\d+\.\d{2}", headers["x-db-time-ms"])
+
+
+def test_metrics_output_is_prometheus_text(client):
+    resp = client.get("/metrics")
+    assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+    types = [line.split()[2] for line in resp.text.splitlines() if line.startswith("# TYPE ")]
+    assert len(types) == len(set(types))  # one TYPE line per metric family
+    for line in resp.text.splitlines():
+        if line and not line.startswith("#"):
+            assert re.fullmatch(r'[a-z_]+(\{([a-z_]+="([^"\\]|\\.)*",?)+\})? -?[0-9.e+-]+', line), line
+
+
+def test_pool_gauges_are_labelled_by_engine(client):
+    text = client.get("/metrics").text
+    assert text.count("# TYPE db_pool_size gauge") == 1
+    assert text.count("# TYPE db_pool_checked_out gauge") == 1
+    assert sample(client, "db_pool_size", engine="sync") == backend.db_settings.pool_size
+    assert sample(client, "db_pool_checked_out", engine="sync") >= 0
+    assert "db_pool_size_sync" not in text
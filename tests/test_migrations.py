@@ -0,0 +1,49 @@
+"""Schema migrations: each version runs once and leaves the hot-path indexes in place."""
+from sqlalchemy import inspect, select, text
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Booking, SchemaMigration
+
+ALL_VERSIONS = [version for version, _, _ in backend.MIGRATIONS]
+
+
+def _recorded():
+    with backend.engine.connect() as conn:
+        return sorted(conn.execute(select(SchemaMigration.version)).scalars())
+
+
+def test_migrations_are_recorded_once(db):
+    assert backend.run_migrations(backend.engine) == ALL_VERSIONS
+    assert backend.run_migrations(backend.engine) == []
+    assert _recorded() == ALL_VERSIONS
+
+
+def test_migrations_upgrade_a_schema_without_indexes_or_hold_column(db):
+    with backend.engine.begin() as conn:
+        for idx in backend.EXPECTED_INDEXES:
+            conn.execute(text(f"DROP INDEX {idx.name}"))
+        conn.execute(text("ALTER TABLE Bookings DROP COLUMN hold_expires_at"))
+        conn.execute(text("INSERT INTO Bookings (flight_id, passenger_id, seat_id, booking_date, status) "
+                          "VALUES (2, 1, 201, '2030-01-01 00:00:00', 'Pending')"))
+    assert len(backend.verify_indexes(backend.engine)) == len(backend.EXPECTED_INDEXES)
+
+    assert backend.run_migrations(backend.engine) == ALL_VERSIONS
+    assert backend.verify_indexes(backend.engine) == []
+    assert "hold_expires_at" in {c["name"] for c in inspect(backend.engine).get_columns("Bookings")}
+    # a hold that predates the column gets a fresh TTL rather than expiring on the next sweep
+    assert db.query(Booking.hold_expires_at).scalar() is not None
+    assert backend.run_migrations(backend.engine) == []
+
+
+def test_verify_indexes_names_what_is_missing(db):
+    assert backend.verify_indexes(backend.engine) == []
+    with backend.engine.begin() as conn:
+        conn.execute(text("DROP INDEX ix_seats_flight_booked"))
+    assert backend.verify_indexes(backend.engine) == ["Seats.ix_seats_flight_booked"]
+
+
+def test_debug_explain_reports_no_missing_indexes(client):
+    body = client.get("/debug/explain").json()
+    assert body["dialect"] == "sqlite"
+    assert body["missing_indexes"] == []
+    assert set(body["plans"]) == {"seat_pick", "route_search", "my_bookings", "hold_reaper"}
@@ -0,0 +1,48 @@
+"""PNRs: derived from booking_id through a keyed permutation, so they never collide."""
+import pytest
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Booking
+
+
+def test_pnrs_are_distinct_and_well_formed():
+    ids = list(range(20_000)) + [36 ** 8 - 1 - i for i in range(1_000)]
+    pnrs = [backend.generate_pnr(i) for i in ids]
+    assert len(set(pnrs)) == len(ids)
+    assert all(len(p) == backend.PNR_LENGTH and set(p) <= set(backend.PNR_ALPHABET) for p in pnrs)
+
+
+def test_pnr_round_trips_to_booking_id():
+    for booking_id in (0, 1, 42, 123_456, 36 ** 8 - 1):
+        assert backend.pnr_to_booking_id(backend.generate_pnr(booking_id)) == booking_id
+    assert backend.pnr_to_booking_id(backend.generate_pnr(77).lower()) == 77
+
+
+def test_pnr_outside_the_space_is_rejected():
+    with pytest.raises(ValueError):
+        backend.generate_pnr(36 ** 8)
+    with pytest.raises(ValueError):
+        backend.generate_pnr(-1)
+
+
+def _pay(booking_id, passenger_id):
+    # one session per call, like one request per call
+    with backend.SessionLocal() as s:
+        return backend._pay_booking(s, booking_id, backend.BookingPayReq(passenger_id=passenger_id))
+
+
+def test_paid_bookings_get_their_own_pnr(db, monkeypatch):
+    monkeypatch.setattr(backend.random, "random", lambda: 0.0)  # payment always succeeds
+    booking_ids = []
+    for pid in (1, 2, 3):
+        with backend.SessionLocal() as s:
+            req = backend.BookingCreateReq(flight_id=2, passenger_id=pid)
+            booking_ids.append(backend._create_booking(s, req).booking_id)
+    paid = [_pay(bid, pid) for bid, pid in zip(booking_ids, (1, 2, 3))]
+    assert [p.status for p in paid] == ["Confirmed"] * 3
+    assert len({p.pnr for p in paid}) == 3
+    assert [backend.pnr_to_booking_id(p.pnr) for p in paid] == booking_ids
+    stored = dict(db.query(Booking.booking_id, Booking.pnr))
+    assert stored == {p.booking_id: p.pnr for p in paid}
+    # paying again is idempotent and keeps the PNR
+    assert _pay(booking_ids[0], 1).pnr == paid[0].pnr
@@ -0,0 +1,37 @@
+"""/dynamic_price: the NDJSON catalogue feed and the per-flight endpoint."""
+import json
+
+
+def feed(client, **params):
+    resp = client.get("/dynamic_price/all", params=params)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    return [json.loads(line) for line in resp.text.splitlines()]
+
+
+def test_all_is_routed_to_the_feed_not_parsed_as_a_flight_id(client):
+    rows = feed(client)
+    assert [r["flight_id"] for r in rows] == [1, 2, 3]
+    assert all(r["dynamic_price"] > 0 and r["total_seats"] >= 1 for r in rows)
+
+
+def test_feed_pages_by_flight_id(client):
+    # pages of one flight each still yield the whole catalogue, in order
+    assert [r["flight_id"] for r in feed(client, page_size=1)] == [1, 2, 3]
+    # keyset cursor: resume after the last flight_id received
+    assert [r["flight_id"] for r in feed(client, after_id=1)] == [2, 3]
+    assert [r["flight_id"] for r in feed(client, after_id=1, limit=1)] == [2]
+    assert feed(client, after_id=3) == []
+
+
+def test_feed_rows_match_the_single_flight_price_fields(client):
+    row = feed(client, limit=1)[0]
+    single = client.get("/dynamic_price/1").json()
+    assert set(single) <= set(row) | {"flight_id"}
+    assert (row["seats_available"], row["total_seats"]) == (single["seats_available"], single["total_seats"]) == (4, 4)
+
+
+def test_single_flight_price(client):
+    assert client.get("/dynamic_price/3").json()["seats_available"] == 0
+    assert client.get("/dynamic_price/99").status_code == 404
+    assert client.get("/dynamic_price/all", params={"page_size": 0}).status_code == 422
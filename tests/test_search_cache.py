@@ -0,0 +1,82 @@
+"""Search result cache: repeated searches are served from memory until a seat change touches them."""
+import pytest
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import SearchResultCache, search_cache
+
+
+def _search(client, **params):
+    resp = client.get("/flights", params=params)
+    assert resp.status_code == 200
+    return {f["flight_id"]: f["seats_available"] for f in resp.json()}
+
+
+def _book(flight_id):
+    with backend.SessionLocal() as s:
+        backend._create_booking(s, backend.BookingCreateReq(flight_id=flight_id, passenger_id=1))
+
+
+def _hits_and_misses():
+    stats = search_cache.stats()  # counters are process-wide, so tests compare before/after
+    return stats["hits"], stats["misses"]
+
+
+def test_repeated_search_is_a_hit(client):
+    hits, misses = _hits_and_misses()
+    assert _search(client, **{"from": "Mumbai", "to": "Goa"}) == {2: 6}
+    assert _search(client, **{"from": "BOM", "to": "goa"}) == {2: 6}  # same cities, same key
+    assert _hits_and_misses() == (hits + 1, misses + 1)
+    assert search_cache.stats()["entries"] == 1
+
+
+def test_committed_booking_invalidates_searches_containing_the_flight(client):
+    _search(client, **{"from": "Mumbai"})
+    _search(client, **{"from": "Delhi"})
+    hits, misses = _hits_and_misses()
+    _book(2)
+    assert search_cache.stats()["entries"] == 1  # the Delhi search does not contain flight 2
+    assert _search(client, **{"from": "Mumbai"}) == {2: 5}
+    assert _search(client, **{"from": "Delhi"}) == {1: 4}
+    assert _hits_and_misses() == (hits + 1, misses + 1)
+
+
+def test_rolled_back_claim_keeps_the_entry(client, db):
+    _search(client, **{"from": "Mumbai"})
+    db.begin()
+    backend._claim_seat(db, 2)
+    db.rollback()
+    assert search_cache.stats()["entries"] == 1
+
+
+def test_flight_above_max_price_is_still_tracked(client):
+    assert _search(client, **{"from": "Mumbai", "max_price": 1}) == {}
+    _book(2)
+    assert search_cache.stats()["entries"] == 0
+
+
+def test_rows_computed_before_an_invalidation_are_not_stored():
+    cache = SearchResultCache()
+    generation = cache.generation
+    cache.invalidate_flights([7])
+    cache.put(("k",), [7], ["stale"], generation)
+    assert cache.get(("k",)) is None
+
+
+def test_lru_eviction_and_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(backend.time, "monotonic", lambda: now[0])
+    cache = SearchResultCache(max_entries=2, ttl_seconds=5)
+    for key in "abc":
+        cache.put((key,), [1], [key], cache.generation)
+    assert cache.get(("a",)) is None and cache.get(("c",)) == ["c"]
+    assert cache.stats()["evictions"] == 1
+    now[0] += 5
+    assert cache.get(("c",)) is None
+    assert cache.stats()["expirations"] == 1
+
+
+@pytest.mark.parametrize("flight_id", [None, 2])
+def test_debug_invalidate_clears_search_entries(client, flight_id):
+    _search(client, **{"from": "Mumbai"})
+    client.post("/debug/inventory/invalidate", params={"flight_id": flight_id} if flight_id else {})
+    assert client.get("/debug/search_cache").json()["entries"] == 0
@@ -0,0 +1,74 @@
+"""Seat inventory cache: commit-time deltas, miss fills racing a commit, and entry expiry."""
+import time
+
+from sqlalchemy import update
+
+import FlightBookingSimulatorBackend as backend
+from FlightBookingSimulatorBackend import Seat, seat_inventory
+from conftest import booked_in_db, cached_booked
+
+
+def test_delta_applied_only_on_commit(db):
+    with db.begin():
+        assert backend._claim_seat(db, 1)[0] == "claimed"
+        # this transaction sees its own reservation; the shared cache does not yet
+        assert backend._count_seats(db, 1)["booked"] == 1
+        assert cached_booked(1) == 0
+    assert cached_booked(1) == booked_in_db(1) == 1
+
+
+def test_rolled_back_delta_is_discarded(db):
+    db.begin()
+    backend._claim_seat(db, 1)
+    db.rollback()
+    assert cached_booked(1) == booked_in_db(1) == 0
+    assert "seat_deltas" not in db.info
+
+
+def test_miss_read_inside_transaction_caches_committed_counts(db):
+    seat_inventory.invalidate([1])
+    with db.begin():
+        backend._claim_seat(db, 1)
+        # the miss is loaded through a connection that already sees the uncommitted claim
+        assert backend._count_seats(db, 1)["booked"] == 1
+    assert cached_booked(1) == booked_in_db(1) == 1
+
+
+def test_miss_not_cached_when_a_delta_lands_during_the_read(db, monkeypatch):
+    seat_inventory.invalidate([2])
+    query = backend._query_seat_counts
+
+    def read_then_commit_elsewhere(session, flight_ids):
+        counts = query(session, flight_ids)
+        seat_inventory.apply({2: 1})  # another session commits a booking while we read
+        return counts
+
+    monkeypatch.setattr(backend, "_query_seat_counts", read_then_commit_elsewhere)
+    seat_inventory.get_many(db, [2])
+    assert 2 not in seat_inventory.snapshot()
+
+
+def test_expired_entry_picks_up_other_workers_writes(db, monkeypatch):
+    monkeypatch.setattr(seat_inventory, "ttl_seconds", 0.2)
+    seat_inventory.invalidate([2])
+    with backend.SessionLocal() as s:
+        assert seat_inventory.get_many(s, [2])[2]["booked"] == 0
+    with backend.engine.begin() as conn:  # a write whose delta never reaches this process's cache
+        conn.execute(update(Seat).where(Seat.flight_id == 2, Seat.seat_number.in_(["1A", "1B"])).values(is_booked=1))
+    with backend.SessionLocal() as s:
+        assert seat_inventory.get_many(s, [2])[2]["booked"] == 0
+    time.sleep(0.25)
+    with backend.SessionLocal() as s:
+        assert seat_inventory.get_many(s, [2])[2]["booked"] == 2
+    assert cached_booked(2) == 2
+
+
+def test_booking_rechecks_a_stale_sold_out_count(db):
+    # flight 3 looks sold out in the cache, but another worker freed its seat
+    with backend.engine.begin() as conn:
+        conn.execute(update(Seat).where(Seat.flight_id == 3).values(is_booked=0))
+    assert seat_inventory.snapshot()[3]["available"] == 0
+    resp = backend._create_booking(db, backend.BookingCreateReq(flight_id=3, passenger_id=1))
+    assert resp.seat_number == "1A"
+    with backend.SessionLocal() as s:
+        assert seat_inventory.get_many(s, [3])[3]["booked"] == booked_in_db(3) == 1